@@ -0,0 +1,179 @@
+"""
+Admission control for provisioning
+
+At most `max_concurrent_demos` requests are provisioned at once, which
+keeps traffic spikes inside the Frappe Cloud quota. Each admitted request
+holds a slot: a member of a Redis sorted set scored by when its lease
+runs out, so a slot lost with a dead worker frees itself. Requests that
+find no free slot wait, in order, in a Redis list. They are admitted when
+a running request finishes, or by the minutely engine kick.
+
+Taking a slot and admitting the next waiting request are Lua scripts, so
+concurrent submits and finishing jobs never overshoot the limit.
+
+The daily submission limit is an atomic counter per day. It is seeded
+from the database only when missing.
+"""
+
+import functools
+import time
+
+import frappe
+from frappe.utils import today
+
+INFLIGHT_KEY = "frappe_kit:provisioning_slots"
+WAITING_KEY = "frappe_kit:provisioning_waiting"
+DAILY_KEY = "frappe_kit:demo_requests_on:{date}"
+DAILY_TTL = 2 * 24 * 60 * 60
+DEFAULT_MAX_CONCURRENT = 50
+
+# a provisioning engine job is killed after an hour, so a slot held for
+# longer than that belongs to a request nobody is working on
+SLOT_LEASE = 60 * 60
+
+# KEYS: slots, waiting  ARGV: now, lease end, limit, demo request
+ACQUIRE_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+if redis.call('zscore', KEYS[1], ARGV[4]) then
+    redis.call('zadd', KEYS[1], ARGV[2], ARGV[4])
+    return 1
+end
+if redis.call('llen', KEYS[2]) > 0
+    or redis.call('zcard', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('zadd', KEYS[1], ARGV[2], ARGV[4])
+return 1
+"""
+
+# KEYS: slots, waiting  ARGV: now, lease end, limit
+ADMIT_NEXT_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+if redis.call('zcard', KEYS[1]) >= tonumber(ARGV[3]) then
+    return false
+end
+local name = redis.call('lpop', KEYS[2])
+if name then
+    redis.call('zadd', KEYS[1], ARGV[2], name)
+end
+return name
+"""
+
+
+def get_max_concurrent():
+    settings = frappe.get_single("Provisioner Settings")
+    return settings.max_concurrent_demos or DEFAULT_MAX_CONCURRENT
+
+
+def _keys(cache):
+    return [cache.make_key(INFLIGHT_KEY), cache.make_key(WAITING_KEY)]
+
+
+def acquire_slot(demo_request):
+    """
+    Take a provisioning slot for `demo_request` if one is free
+
+    A request never jumps the waiting queue. The slot is given back if
+    the current transaction rolls back.
+    """
+    cache = frappe.cache()
+    now = time.time()
+    acquired = cache.register_script(ACQUIRE_SCRIPT)(
+        keys=_keys(cache),
+        args=[now, now + SLOT_LEASE, get_max_concurrent(), demo_request],
+    )
+    if acquired:
+        frappe.db.after_rollback.add(functools.partial(release_slot, demo_request))
+    return bool(acquired)
+
+
+def hold_slot(demo_request):
+    """Renew the lease of a request that is being provisioned"""
+    cache = frappe.cache()
+    cache.zadd(cache.make_key(INFLIGHT_KEY), {demo_request: time.time() + SLOT_LEASE})
+
+
+def release_slot(demo_request):
+    cache = frappe.cache()
+    cache.zrem(cache.make_key(INFLIGHT_KEY), demo_request)
+
+
+def join_waiting_queue(demo_request):
+    """Queue `demo_request` for a slot once the current transaction commits"""
+    frappe.db.after_commit.add(functools.partial(_push_waiting, demo_request))
+
+
+def _push_waiting(demo_request):
+    # RedisWrapper.rpush adds the site prefix itself, giving the key the
+    # scripts and lpos read through make_key
+    frappe.cache().rpush(WAITING_KEY, demo_request)
+
+
+def get_queue_position(demo_request):
+    """1-based place of `demo_request` in the waiting queue, None if absent"""
+    cache = frappe.cache()
+    index = cache.lpos(cache.make_key(WAITING_KEY), demo_request)
+    return None if index is None else index + 1
+
+
+def admit_waiting():
+    """Start waiting requests, oldest first, while slots are free"""
+    cache = frappe.cache()
+    admit_next = cache.register_script(ADMIT_NEXT_SCRIPT)
+    limit = get_max_concurrent()
+
+    while True:
+        now = time.time()
+        name = admit_next(keys=_keys(cache), args=[now, now + SLOT_LEASE, limit])
+        if not name:
+            break
+
+        name = frappe.safe_decode(name)
+        try:
+            doc = frappe.get_doc("Demo Request", name)
+            if doc.status != "Pending":
+                # cancelled or started by hand while it waited
+                release_slot(name)
+                continue
+
+            doc.begin_provisioning()
+            frappe.db.commit()
+        except Exception:
+            # deleted, or could not be started: it stays Pending, out of
+            # the queue, and can be started again by hand
+            frappe.db.rollback()
+            release_slot(name)
+            frappe.log_error(
+                title=f"Could Not Admit Demo Request: {name}",
+                message=frappe.get_traceback(),
+            )
+
+
+def finish_provisioning(demo_request):
+    """Free the slot of a request that succeeded or failed, admit the next"""
+    release_slot(demo_request)
+    admit_waiting()
+
+
+def take_daily_quota(limit):
+    """
+    Count one submission against today's limit, False if it is used up
+
+    The count goes back if the submission's transaction rolls back.
+    """
+    cache = frappe.cache()
+    counter = DAILY_KEY.format(date=today())
+    key = cache.make_key(counter)
+
+    # `exists` adds the site prefix itself; set and incr are raw commands
+    if not cache.exists(counter):
+        count = frappe.db.count("Demo Request", {"creation": [">=", today()]})
+        # nx: if another worker seeded it first, keep its value
+        cache.set(key, count, nx=True, ex=DAILY_TTL)
+
+    if cache.incr(key) > limit:
+        cache.decr(key)
+        return False
+
+    frappe.db.after_rollback.add(functools.partial(cache.decr, key))
+    return True
@@ -0,0 +1,126 @@
+"""
+Dependency-ordered, parallel app installation
+
+Apps are grouped into levels from the `Depends On` column of the Package
+Tier App rows. Every app in a level is installed at once, and each
+install is awaited until Frappe Cloud lists the app on the site. There
+is no fixed sleep between installs.
+"""
+
+import asyncio
+
+import frappe
+
+BASE_APPS = ("frappe", "erpnext")
+APP_INSTALL_TIMEOUT = 600
+
+# polling for an install to land: start quick, back off for slow apps
+POLL_MIN = 2
+POLL_MAX = 15
+POLL_BACKOFF = 1.5
+
+
+def get_app_dependencies(tier):
+    """{app: [apps it depends on]} from a Package Tier's app rows"""
+    dependencies = {}
+
+    for row in tier.get("frappe_apps") or []:
+        depends_on = (row.get("depends_on") or "").split(",")
+        dependencies[row.app_name] = [app.strip() for app in depends_on if app.strip()]
+
+    return dependencies
+
+
+def install_levels(apps, dependencies, installed=BASE_APPS):
+    """
+    Group apps into levels that can each be installed concurrently
+
+    Dependencies on apps that are already installed (or not being
+    installed at all) are ignored. A dependency cycle raises.
+    """
+    pending = [app for app in apps if app not in installed]
+    waiting_on = {
+        app: {dep for dep in dependencies.get(app, ()) if dep in pending} - {app}
+        for app in pending
+    }
+
+    levels = []
+    while waiting_on:
+        level = [app for app in pending if app in waiting_on and not waiting_on[app]]
+        if not level:
+            raise Exception(
+                f"Circular app dependencies between: {', '.join(sorted(waiting_on))}"
+            )
+
+        levels.append(level)
+        for app in level:
+            del waiting_on[app]
+        for deps in waiting_on.values():
+            deps.difference_update(level)
+
+    return levels
+
+
+async def install_apps(cloud, site_name, apps, dependencies=None, log=None):
+    """
+    Install `apps` on a site, independent apps in parallel
+
+    `cloud` is an AsyncCloudClient. Returns {app: seconds taken} for the
+    apps that were installed. Apps already on the site are skipped, so a
+    retried step does not reinstall them.
+    """
+    log = log or (lambda message: None)
+    installed = set(BASE_APPS) | set(await cloud.get_installed_apps(site_name))
+    timings = {}
+
+    for level in install_levels(apps, dependencies or {}, installed):
+        log(f"Installing {', '.join(level)}...")
+        results = await asyncio.gather(
+            *(_install_one(cloud, site_name, app) for app in level)
+        )
+
+        for app, elapsed in zip(level, results):
+            timings[app] = elapsed
+            log(f"Installed {app} in {elapsed:.1f}s")
+
+    return timings
+
+
+async def _install_one(cloud, site_name, app):
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    if not await cloud.install_app(site_name, app):
+        raise Exception(f"Failed to start installation of {app}")
+
+    interval = POLL_MIN
+    while app not in await cloud.get_installed_apps(site_name):
+        if loop.time() - started > APP_INSTALL_TIMEOUT:
+            raise Exception(f"Installation of {app} timed out")
+
+        await asyncio.sleep(interval)
+        interval = min(interval * POLL_BACKOFF, POLL_MAX)
+
+    return loop.time() - started
+
+
+def install_apps_sync(cloud_api, site_name, apps, dependencies=None, log=None):
+    """Blocking wrapper for jobs that do not run on the provisioning engine"""
+    from frappe_kit.frappe_kit.api.engine import AsyncCloudClient
+
+    async def run():
+        cloud = AsyncCloudClient(cloud_api, max(1, len(apps)))
+        try:
+            return await install_apps(cloud, site_name, apps, dependencies, log)
+        finally:
+            cloud.close()
+
+    return asyncio.run(run())
+
+
+def get_tier_dependencies(package_tier):
+    """App dependencies for a Package Tier name, or {} if it is unset"""
+    if not package_tier:
+        return {}
+
+    return get_app_dependencies(frappe.get_doc("Package Tier", package_tier))
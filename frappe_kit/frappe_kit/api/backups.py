@@ -0,0 +1,106 @@
+"""
+Backup tracking
+
+`create_backup` answers with the name of the backup it started. The
+tracker waits for that backup, and no other, to finish uploading, so a
+scheduled backup taken at the same time is never handed out instead.
+If Frappe Cloud does not return a name, the first backup that was not
+there before the request is taken.
+
+A signed site event with `"event": "backup"` (see callbacks) wakes the
+wait at once. Without one the backup list is polled, the interval
+growing from BACKUP_POLL_MIN to BACKUP_POLL_MAX, so a small site is
+picked up within seconds and a large one is not polled every few.
+"""
+
+import time
+
+import frappe
+
+from frappe_kit.frappe_kit.api.callbacks import (
+    CHANNEL,
+    POLL_BACKOFF,
+    wait_for_message,
+)
+
+BACKUP_TIMEOUT = 30 * 60
+BACKUP_POLL_MIN = 5
+BACKUP_POLL_MAX = 60
+
+FAILED_STATUSES = ("failure", "failed")
+
+
+def take_backup(cloud_api, site_name, timeout=BACKUP_TIMEOUT, on_wait=None):
+    """Back a site up with its files and return the backup once it is uploaded"""
+    known = {backup.get("name") for backup in cloud_api.get_backups(site_name)}
+    backup_name = cloud_api.create_backup(site_name)
+    if not isinstance(backup_name, str):
+        backup_name = (backup_name or {}).get("name")
+
+    return wait_for_backup(
+        cloud_api, site_name, backup_name, known, timeout=timeout, on_wait=on_wait
+    )
+
+
+def wait_for_backup(
+    cloud_api,
+    site_name,
+    backup_name=None,
+    known=(),
+    timeout=BACKUP_TIMEOUT,
+    on_wait=None,
+):
+    """Wait for one backup of a site to be ready and return it"""
+    cache = frappe.cache()
+    pubsub = cache.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(cache.make_key(CHANNEL))
+    started = time.monotonic()
+    interval = BACKUP_POLL_MIN
+
+    try:
+        while True:
+            backup = find_backup(cloud_api.get_backups(site_name), backup_name, known)
+            if backup and is_ready(backup):
+                return backup
+
+            remaining = started + timeout - time.monotonic()
+            if remaining <= 0:
+                raise Exception(f"Backup of {site_name} did not finish in time")
+
+            if not wait_for_message(
+                pubsub, site_name, min(interval, remaining), event="backup"
+            ):
+                interval = min(interval * POLL_BACKOFF, BACKUP_POLL_MAX)
+                if on_wait:
+                    on_wait(int(time.monotonic() - started))
+    finally:
+        pubsub.close()
+
+
+def find_backup(backups, backup_name=None, known=()):
+    """The requested backup, or the newest one not in `known` if none was named"""
+    if isinstance(backups, dict):
+        backups = [backups]
+
+    for backup in backups or []:
+        if backup_name:
+            if backup.get("name") == backup_name:
+                return backup
+        elif backup.get("name") not in known:
+            return backup
+
+    return None
+
+
+def is_ready(backup):
+    status = (backup.get("status") or "").lower()
+    if status in FAILED_STATUSES:
+        raise Exception(f"Backup {backup.get('name')} failed")
+
+    return status in ("", "success") and bool(
+        get_download_url(backup) or backup.get("remote_database_file")
+    )
+
+
+def get_download_url(backup):
+    return backup.get("url") or backup.get("remote_file")
@@ -0,0 +1,246 @@
+"""
+Site status callbacks
+
+Frappe Cloud (or any stand-in that knows the shared secret) POSTs a
+signed JSON body to `site_event` when a site changes state. The event is
+published on a Redis channel, and jobs waiting on that site resume at
+once instead of sleeping until their next poll. Polling with
+an adaptive interval remains the fallback when callbacks are missing or
+not configured.
+
+Signature: hex HMAC-SHA256 of "<timestamp>.<raw body>" with the Callback
+Secret from Provisioner Settings. It is sent in the
+X-Frappe-Kit-Signature header, with the unix timestamp in
+X-Frappe-Kit-Timestamp.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+import frappe
+
+from frappe_kit.frappe_kit.api.rate_limit import guest_rate_limit
+
+CHANNEL = "frappe_kit:site_events"
+SIGNATURE_MAX_AGE = 300
+
+# fallback polling: start quick, back off while the site is still building
+POLL_MIN = 3
+POLL_MAX = 20
+POLL_BACKOFF = 1.5
+
+
+def sign(body, timestamp, secret):
+    """Signature a sender must put in X-Frappe-Kit-Signature"""
+    if isinstance(body, str):
+        body = body.encode()
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, timestamp, signature):
+    settings = frappe.get_single("Provisioner Settings")
+    secret = settings.get_password("callback_secret", raise_exception=False)
+
+    if not secret or not timestamp or not signature:
+        return False
+
+    try:
+        age = abs(time.time() - int(timestamp))
+    except ValueError:
+        return False
+
+    if age > SIGNATURE_MAX_AGE:
+        return False
+
+    return hmac.compare_digest(sign(body, timestamp, secret), signature)
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+@guest_rate_limit
+def site_event():
+    """Signed callback for site status changes"""
+    body = frappe.request.get_data()
+
+    if not verify_signature(
+        body,
+        frappe.get_request_header("X-Frappe-Kit-Timestamp"),
+        frappe.get_request_header("X-Frappe-Kit-Signature"),
+    ):
+        frappe.throw("Invalid callback signature", frappe.PermissionError)
+
+    data = frappe.parse_json(body.decode() or "{}")
+    if not data.get("site") or not data.get("status"):
+        frappe.throw("site and status are required")
+
+    publish_site_event(data)
+    return {"status": "received"}
+
+
+def publish_site_event(data):
+    """Wake anything waiting on a site event"""
+    event = {
+        "site": data.get("site"),
+        "event": data.get("event") or "status",
+        "status": data.get("status"),
+        "data": data.get("data") or {},
+    }
+    cache = frappe.cache()
+    cache.publish(cache.make_key(CHANNEL), json.dumps(event))
+
+
+class SiteEventWatcher:
+    """
+    Hands site events to waiting asyncio jobs
+
+    One subscriber thread per engine reads the Redis channel and wakes the
+    job waiting on that site. Jobs call `watch` before they first poll, so
+    an event that lands between the poll and the wait is not lost.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.events = {}
+        self.payloads = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        cache = frappe.cache()
+        pubsub = cache.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(cache.make_key(CHANNEL))
+
+        self._thread = threading.Thread(
+            target=self._listen, args=(pubsub,), daemon=True, name="frappe-kit-events"
+        )
+        self._thread.start()
+
+    def _listen(self, pubsub):
+        try:
+            while not self._stop.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message and message.get("type") == "message":
+                    event = json.loads(message["data"])
+                    try:
+                        self.loop.call_soon_threadsafe(self.notify, event)
+                    except RuntimeError:
+                        # the loop closed after `stop`
+                        break
+        finally:
+            pubsub.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def watch(self, site, event="status"):
+        self.events.setdefault((site, event), asyncio.Event())
+
+    def unwatch(self, site, event="status"):
+        self.events.pop((site, event), None)
+        self.payloads.pop((site, event), None)
+
+    def notify(self, event):
+        key = (event["site"], event.get("event") or "status")
+        if key in self.events:
+            self.payloads[key] = event
+            self.events[key].set()
+
+    async def wait(self, site, timeout, event="status"):
+        """Wait up to `timeout` seconds for an event; returns it or None"""
+        key = (site, event)
+        waiter = self.events.setdefault(key, asyncio.Event())
+
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        waiter.clear()
+        return self.payloads.pop(key, None)
+
+
+async def wait_until_active(cloud, watcher, site_name, timeout, on_wait=None):
+    """
+    Wait for a Frappe Cloud site to become active
+
+    Frappe Cloud stays the source of truth. A callback only cuts the wait
+    short, and the status is always confirmed with a poll. Poll intervals
+    grow from POLL_MIN to POLL_MAX while no callback arrives.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    interval = POLL_MIN
+    watcher.watch(site_name)
+
+    try:
+        while True:
+            status = await cloud.get_site_status(site_name)
+            site_status = (status.get("status") or "").lower()
+
+            if site_status == "active":
+                return loop.time() - started
+            elif site_status in ["broken", "failed"]:
+                raise Exception(f"Site creation failed with status: {site_status}")
+
+            remaining = started + timeout - loop.time()
+            if remaining <= 0:
+                raise Exception("Site creation timed out")
+
+            pushed = await watcher.wait(site_name, min(interval, remaining))
+            if not pushed:
+                interval = min(interval * POLL_BACKOFF, POLL_MAX)
+                if on_wait:
+                    on_wait(int(loop.time() - started))
+    finally:
+        watcher.unwatch(site_name)
+
+
+def wait_until_active_sync(cloud_api, site_name, timeout, on_wait=None):
+    """Blocking variant for jobs that do not run on the engine's event loop"""
+    cache = frappe.cache()
+    pubsub = cache.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(cache.make_key(CHANNEL))
+    started = time.monotonic()
+    interval = POLL_MIN
+
+    try:
+        while True:
+            status = cloud_api.get_site_status(site_name)
+            site_status = (status.get("status") or "").lower()
+
+            if site_status == "active":
+                return time.monotonic() - started
+            elif site_status in ("broken", "failed"):
+                raise Exception(f"Site failed with status: {site_status}")
+
+            remaining = started + timeout - time.monotonic()
+            if remaining <= 0:
+                raise Exception("Site creation timed out")
+
+            if not wait_for_message(pubsub, site_name, min(interval, remaining)):
+                interval = min(interval * POLL_BACKOFF, POLL_MAX)
+                if on_wait:
+                    on_wait(int(time.monotonic() - started))
+    finally:
+        pubsub.close()
+
+
+def wait_for_message(pubsub, site, timeout, event="status"):
+    """Block up to `timeout` seconds for a site event on a subscribed pubsub"""
+    deadline = time.monotonic() + timeout
+
+    while (remaining := deadline - time.monotonic()) > 0:
+        message = pubsub.get_message(timeout=remaining)
+        if not message or message.get("type") != "message":
+            continue
+
+        payload = json.loads(message["data"])
+        if payload.get("site") == site and payload.get("event") == event:
+            return payload
+
+    return None
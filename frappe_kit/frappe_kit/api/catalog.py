@@ -0,0 +1,242 @@
+"""
+Cached public catalog: package tiers, industries and regions
+
+The catalog changes only when an admin edits a Package Tier or Industry
+Template, but it is read on every /demo page load. Each payload is built
+once and kept in Redis under a key that includes the catalog version.
+Saving or deleting a tier or industry sets a new version after commit,
+so stale entries are never read again and simply expire.
+
+Responses carry an ETag derived from the version, so browsers can
+revalidate with a 304. Guests also get a short public Cache-Control that
+lets CDNs share the response; a logged-in user's response is private.
+"""
+
+from bisect import bisect_right
+
+import frappe
+from werkzeug.wrappers import Response
+
+VERSION_KEY = "frappe_kit:catalog_version"
+ENTRY_KEY = "frappe_kit:catalog:{version}:{name}"
+ENTRY_TTL = 24 * 60 * 60
+CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=600"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+# Demo Request region -> (Package Tier price field, currency)
+REGION_PRICING = {
+    "India": ("price_india", "INR"),
+    "Southeast Asia": ("price_sea", "USD"),
+    "Middle East & Africa": ("price_mea", "USD"),
+    "Europe & UK": ("price_europe", "EUR"),
+}
+
+
+def build_package_tiers():
+    return frappe.get_all(
+        "Package Tier",
+        filters=(
+            {"enabled": 1}
+            if frappe.db.has_column("Package Tier", "enabled")
+            else {}
+        ),
+        fields=[
+            "name",
+            "tier_name",
+            "display_name",
+            "description",
+            "employee_range_min",
+            "employee_range_max",
+            "price_india",
+            "price_sea",
+            "price_mea",
+            "price_europe",
+            "include_accounting",
+            "include_inventory",
+            "include_sales",
+            "include_support",
+            "include_hr",
+            "include_manufacturing",
+            "trial_days",
+            "is_popular",
+            "color_theme",
+            "features_html",
+        ],
+        order_by="sort_order asc",
+    )
+
+
+def build_industries():
+    return frappe.get_all(
+        "Industry Template",
+        filters={"enabled": 1},
+        fields=[
+            "name",
+            "industry_code",
+            "industry_name",
+            "icon",
+            "description",
+        ],
+        order_by="industry_name asc",
+    )
+
+
+def build_demo_info():
+    tiers = frappe.get_all(
+        "Package Tier",
+        fields=["name", "display_name", "description", "is_popular", "trial_days"],
+        order_by="sort_order asc",
+    )
+
+    industries = frappe.get_all(
+        "Industry Template",
+        filters={"enabled": 1},
+        fields=["name", "industry_name", "icon", "description"],
+        order_by="industry_name asc",
+    )
+
+    return {
+        "tiers": tiers,
+        "industries": industries,
+    }
+
+
+def build_bootstrap():
+    """Everything the /demo wizard needs, with one price per region"""
+    options = frappe.get_meta("Demo Request").get_field("region").options
+    regions = [region for region in options.split("\n") if region in REGION_PRICING]
+
+    tiers = build_package_tiers()
+    for tier in tiers:
+        tier.prices = {
+            region: tier.pop(REGION_PRICING[region][0], None) for region in regions
+        }
+        for field, currency in REGION_PRICING.values():
+            tier.pop(field, None)
+
+    return {
+        "tiers": tiers,
+        "industries": build_industries(),
+        "regions": [
+            {"region": region, "currency": REGION_PRICING[region][1]}
+            for region in regions
+        ],
+    }
+
+
+BUILDERS = {
+    "package_tiers": build_package_tiers,
+    "industries": build_industries,
+    "demo_info": build_demo_info,
+    "bootstrap": build_bootstrap,
+}
+
+
+def get_catalog_version():
+    version = frappe.cache().get_value(VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=12)
+        frappe.cache().set_value(VERSION_KEY, version)
+    return version
+
+
+def get_catalog(name):
+    """(version, payload) for a catalog entry, built on a cache miss"""
+    version = get_catalog_version()
+    key = ENTRY_KEY.format(version=version, name=name)
+
+    payload = frappe.cache().get_value(key)
+    if payload is None:
+        payload = BUILDERS[name]()
+        frappe.cache().set_value(key, payload, expires_in_sec=ENTRY_TTL)
+
+    return version, payload
+
+
+def catalog_response(name):
+    """
+    Return a catalog entry from a whitelisted method
+
+    Inside an HTTP request this is a full JSON response with ETag and
+    Cache-Control headers, or an empty 304 if the caller already holds the
+    current version. Called from Python, it is just the payload.
+    """
+    version, payload = get_catalog(name)
+
+    request = getattr(frappe.local, "request", None)
+    if not request:
+        return payload
+
+    etag = f'"{version}-{name}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (
+            CACHE_CONTROL if frappe.session.user == "Guest" else PRIVATE_CACHE_CONTROL
+        ),
+    }
+
+    if etag in (request.headers.get("If-None-Match") or ""):
+        return Response(status=304, headers=headers)
+
+    return Response(
+        frappe.as_json({"message": payload}),
+        mimetype="application/json",
+        headers=headers,
+    )
+
+
+# site -> (catalog version, TierIndex), rebuilt when the version moves on
+_tier_indexes = {}
+
+
+class TierIndex:
+    """Package Tier employee ranges sorted by their lower bound"""
+
+    def __init__(self, tiers):
+        tiers = sorted(tiers, key=lambda tier: tier[1])
+        self.starts = [start for name, start, end in tiers]
+        self.tiers = tiers
+
+    def recommend(self, employee_count):
+        """The tier with the highest lower bound whose range holds the count"""
+        for name, start, end in reversed(
+            self.tiers[: bisect_right(self.starts, employee_count)]
+        ):
+            if end is None or employee_count <= end:
+                return name
+
+        return None
+
+
+def get_tier_index():
+    """TierIndex for this site, rebuilt only after a Package Tier change"""
+    version = get_catalog_version()
+    cached = _tier_indexes.get(frappe.local.site)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    tiers = frappe.get_all(
+        "Package Tier",
+        fields=["name", "employee_range_min", "employee_range_max"],
+    )
+    index = TierIndex(
+        [
+            (
+                tier.name,
+                int(tier.employee_range_min or 0),
+                int(tier.employee_range_max) if tier.employee_range_max else None,
+            )
+            for tier in tiers
+        ]
+    )
+    _tier_indexes[frappe.local.site] = (version, index)
+    return index
+
+
+def invalidate_catalog(doc=None, method=None):
+    """Doc event: move the catalog to a new version once the change commits"""
+    frappe.db.after_commit.add(_bump_version)
+
+
+def _bump_version():
+    frappe.cache().set_value(VERSION_KEY, frappe.generate_hash(length=12))
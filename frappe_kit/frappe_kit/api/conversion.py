@@ -1,8 +1,16 @@
 import frappe
 import hashlib
-import time
 from frappe.utils import now_datetime, get_datetime, add_to_date
 
+from frappe_kit.frappe_kit.api.app_installer import (
+    get_tier_dependencies,
+    install_apps_sync,
+)
+from frappe_kit.frappe_kit.api.backups import get_download_url, take_backup
+from frappe_kit.frappe_kit.api.callbacks import wait_until_active_sync
+from frappe_kit.frappe_kit.api.provisioning import get_cluster
+from frappe_kit.frappe_kit.api.rate_limit import guest_rate_limit
+
 
 def generate_conversion_token(demo_site):
     """Generate a signed token for conversion link"""
@@ -46,6 +54,7 @@ def validate_token(token, demo_site):
 
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def get_conversion_options(token, site):
     """Get demo site details and available production plans for the conversion page"""
     if not validate_token(token, site):
@@ -107,6 +116,7 @@ def get_conversion_options(token, site):
 
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def submit_conversion_request(token, site, data):
     """Submit a conversion request from the customer form"""
     if isinstance(data, str):
@@ -149,6 +159,7 @@ def submit_conversion_request(token, site, data):
 
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def check_conversion_status(conversion_request):
     """Check the status of a conversion request"""
     doc = frappe.get_doc("Conversion Request", conversion_request)
@@ -220,17 +231,13 @@ def _convert_new_site(doc, site_doc, cloud_api, site_name):
 
     # step 1: create backup of demo site
     doc.append_log("Creating backup of demo site...")
-    cloud_api.create_backup(site_name)
-    time.sleep(10)
-
-    backups = cloud_api.get_backups(site_name)
-    if backups:
-        latest = backups[0] if isinstance(backups, list) else backups
-        backup_url = latest.get("url") or latest.get("remote_file")
-        doc.backup_url = backup_url
-        doc.backup_created = now_datetime()
-        doc.save(ignore_permissions=True)
-        doc.append_log(f"Backup created")
+    backup = _backup_demo_site(doc, cloud_api, site_name)
+    doc.transition(
+        log="Backup created",
+        backup_name=backup.get("name"),
+        backup_url=get_download_url(backup),
+        backup_created=now_datetime(),
+    )
 
     # step 2: create new production site
     subdomain = doc.production_subdomain
@@ -239,15 +246,8 @@ def _convert_new_site(doc, site_doc, cloud_api, site_name):
     doc.append_log(f"Creating production site: {subdomain}")
 
     settings = frappe.get_single("Provisioner Settings")
-    region_map = {
-        "India": "Mumbai",
-        "Southeast Asia": "Singapore",
-        "Europe & UK": "Frankfurt",
-        "Middle East & Africa": "Frankfurt",
-    }
-
     demo_req = frappe.get_doc("Demo Request", doc.demo_request)
-    cluster = region_map.get(demo_req.region, settings.default_region or "Mumbai")
+    cluster = get_cluster(demo_req.region, settings)
 
     site_result = cloud_api.create_site(
         subdomain=subdomain,
@@ -260,30 +260,17 @@ def _convert_new_site(doc, site_doc, cloud_api, site_name):
 
     # step 3: wait for new site
     doc.append_log("Waiting for production site...")
-    max_wait = 180
-    elapsed = 0
-
-    while elapsed < max_wait:
-        status = cloud_api.get_site_status(new_site_name)
-        site_status = status.get("status", "").lower()
-
-        if site_status == "active":
-            doc.append_log("Production site is active")
-            break
-        elif site_status in ("broken", "failed"):
-            raise Exception(f"Production site failed: {site_status}")
-
-        time.sleep(10)
-        elapsed += 10
-
-    if elapsed >= max_wait:
-        raise Exception("Production site creation timed out")
+    wait_until_active_sync(cloud_api, new_site_name, 180)
+    doc.append_log("Production site is active")
 
     # step 4: install remaining apps
-    for app in apps_list[2:]:
-        doc.append_log(f"Installing {app}...")
-        cloud_api.install_app(new_site_name, app)
-        time.sleep(5)
+    install_apps_sync(
+        cloud_api,
+        new_site_name,
+        apps_list,
+        get_tier_dependencies(site_doc.package_tier),
+        log=doc.append_log,
+    )
 
     production_url = f"https://{new_site_name}"
     doc.append_log(f"Production site ready: {production_url}")
@@ -296,25 +283,33 @@ def _convert_self_hosted(doc, site_doc, cloud_api, site_name):
     doc.append_log("Preparing backup for self-hosted deployment...")
 
     doc.append_log("Triggering backup...")
-    cloud_api.create_backup(site_name)
+    backup = _backup_demo_site(doc, cloud_api, site_name)
 
-    # wait a bit for backup to complete
-    doc.append_log("Waiting for backup to finish...")
-    time.sleep(30)
+    backup_url = get_download_url(backup)
+    if not backup_url:
+        raise Exception(f"Backup {backup.get('name')} has no download URL")
 
-    backups = cloud_api.get_backups(site_name)
-    if not backups:
-        raise Exception("No backups found after creation")
+    doc.transition(
+        log="Backup ready for download",
+        backup_name=backup.get("name"),
+        backup_url=backup_url,
+        backup_created=now_datetime(),
+    )
+    doc.mark_completed()
 
-    latest = backups[0] if isinstance(backups, list) else backups
-    backup_url = latest.get("url") or latest.get("remote_file")
 
-    if not backup_url:
-        raise Exception("Backup URL not available yet. Please try again in a few minutes.")
+def _backup_demo_site(doc, cloud_api, site_name):
+    """Back the demo site up, returning the backup once it can be downloaded"""
 
-    doc.backup_url = backup_url
-    doc.backup_created = now_datetime()
-    doc.save(ignore_permissions=True)
+    def on_wait(elapsed):
+        doc.append_log(f"Waiting for backup... ({elapsed}s)")
+        doc.flush_log()
+        frappe.db.commit()
 
-    doc.append_log(f"Backup ready for download")
-    doc.mark_completed()
+    # the wait can take up to BACKUP_TIMEOUT; hold no transaction or locks
+    doc.flush_log()
+    frappe.db.commit()
+
+    backup = take_backup(cloud_api, site_name, on_wait=on_wait)
+    doc.append_log(f"Backup {backup.get('name')} is ready")
+    return backup
@@ -0,0 +1,555 @@
+"""
+Asyncio provisioning engine
+
+One RQ worker runs many provisioning state machines at once. Every
+Frappe Cloud call goes through a single shared FrappeCloudAPI (and so
+one pooled HTTP session) on a bounded thread pool. All waiting is done
+with `asyncio.sleep`, so a site sitting in "Pending" on Frappe Cloud
+costs nothing but a timer.
+
+Database access stays on the event loop thread. Each job commits right
+after it writes and never awaits with uncommitted changes. A rollback in
+one job therefore cannot discard another job's work.
+"""
+
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.utils import getdate
+from frappe.utils.password import set_encrypted_password
+
+from frappe_kit.frappe_kit.api import (
+    admission,
+    app_installer,
+    sample_data,
+    snapshots,
+    synthetic_data,
+)
+from frappe_kit.frappe_kit.api.callbacks import SiteEventWatcher, wait_until_active
+from frappe_kit.frappe_kit.api.provisioning import (
+    FrappeCloudAPI,
+    generate_password,
+    get_apps_for_tier,
+    get_cluster,
+)
+
+QUEUE_KEY = "frappe_kit:provisioning_queue"
+ENGINE_JOB_ID = "frappe_kit:provisioning_engine"
+ENGINE_TIMEOUT = 3600
+DEFAULT_CONCURRENCY = 25
+# the engine takes no new requests this long before RQ's timeout, so the
+# jobs it is running can finish before the worker is killed
+DRAIN_MARGIN = 15 * 60
+
+# how often the engine checks the queue for new work, and how long it
+# lingers with nothing to do before releasing the worker
+QUEUE_POLL_INTERVAL = 1
+IDLE_TIMEOUT = 30
+
+STEPS = (
+    "create_site",
+    "await_active",
+    "restore_snapshot",
+    "install_apps",
+    "rename_site",
+    "create_user",
+    "import_data",
+    "notify",
+)
+
+SITE_READY_TIMEOUT = 180
+
+
+def enqueue_provisioning(demo_request):
+    """Queue a Demo Request for the engine once the current transaction commits"""
+    frappe.db.after_commit.add(functools.partial(_push_to_queue, demo_request))
+
+
+def _push_to_queue(demo_request):
+    frappe.cache().rpush(QUEUE_KEY, demo_request)
+    start_engine()
+
+
+def start_engine():
+    """Start an engine worker unless one is already queued or running"""
+    frappe.enqueue(
+        "frappe_kit.frappe_kit.api.engine.run_provisioning_engine",
+        queue="long",
+        timeout=ENGINE_TIMEOUT,
+        job_id=ENGINE_JOB_ID,
+        deduplicate=True,
+    )
+
+
+def kick_provisioning_engine():
+    """
+    Scheduled every minute: restart the engine if work is waiting
+
+    Covers the window where a request is queued just as an idle engine
+    decides to exit.
+    """
+    if frappe.cache().llen(QUEUE_KEY):
+        start_engine()
+
+    # slots freed without a finishing job (expired leases, failed requests)
+    admission.admit_waiting()
+
+
+def pop_queued():
+    name = frappe.cache().lpop(QUEUE_KEY)
+    return frappe.safe_decode(name) if name else None
+
+
+def get_concurrency():
+    settings = frappe.get_single("Provisioner Settings")
+    return settings.engine_concurrency or DEFAULT_CONCURRENCY
+
+
+def run_provisioning_engine():
+    """Background job: drain the provisioning queue, many sites at a time"""
+    asyncio.run(ProvisioningEngine(get_concurrency()).run_queue())
+
+
+def provision_many(demo_requests, concurrency=None):
+    """Provision the given Demo Requests concurrently and return their results"""
+    engine = ProvisioningEngine(concurrency or get_concurrency())
+    return asyncio.run(engine.run(demo_requests))
+
+
+class AsyncCloudClient:
+    """Awaitable facade over a shared FrappeCloudAPI"""
+
+    def __init__(self, cloud_api, max_workers):
+        self.api = cloud_api
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="frappe-cloud"
+        )
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(getattr(self.api, method), *args, **kwargs)
+        )
+
+    async def create_site(self, *args, **kwargs):
+        return await self._call("create_site", *args, **kwargs)
+
+    async def get_site_status(self, site_name):
+        return await self._call("get_site_status", site_name)
+
+    async def rename_site(self, site_name, new_name):
+        return await self._call("rename_site", site_name, new_name)
+
+    async def install_app(self, site_name, app_name):
+        return await self._call("install_app", site_name, app_name)
+
+    async def get_installed_apps(self, site_name):
+        return await self._call("get_installed_apps", site_name)
+
+    async def restore_site(self, site_name, files):
+        return await self._call("restore_site", site_name, files)
+
+    async def login_as_administrator(self, site_name):
+        return await self._call("login_as_administrator", site_name)
+
+    async def suspend_site(self, site_name):
+        return await self._call("suspend_site", site_name)
+
+    async def run(self, fn, *args):
+        """Run another blocking call (e.g. to the demo site) on the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class ProvisioningEngine:
+    def __init__(self, concurrency):
+        self.concurrency = max(1, concurrency)
+        self.watcher = SiteEventWatcher()
+        self._cloud = None
+
+    def get_cloud(self):
+        """Shared client, created on first use so bad credentials fail per job"""
+        if not self._cloud:
+            self._cloud = AsyncCloudClient(FrappeCloudAPI(), self.concurrency)
+        return self._cloud
+
+    async def run(self, demo_requests):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(name):
+            async with semaphore:
+                return await ProvisioningJob(name, self).run()
+
+        self.watcher.start()
+        try:
+            return await asyncio.gather(*(bounded(name) for name in demo_requests))
+        finally:
+            self.close()
+
+    async def run_queue(self, time_limit=ENGINE_TIMEOUT - DRAIN_MARGIN):
+        """
+        Run queued requests until the queue stays empty or `time_limit` passes
+
+        Past the limit, running jobs are finished and the rest of the queue
+        is left to the next engine, which the scheduler starts.
+        """
+        loop = asyncio.get_running_loop()
+        running = set()
+        idle_since = loop.time()
+        deadline = loop.time() + time_limit
+
+        self.watcher.start()
+        try:
+            while True:
+                accepting = loop.time() < deadline
+                while accepting and len(running) < self.concurrency:
+                    name = pop_queued()
+                    if not name:
+                        break
+                    running.add(asyncio.create_task(ProvisioningJob(name, self).run()))
+
+                if not running:
+                    if not accepting or loop.time() - idle_since > IDLE_TIMEOUT:
+                        break
+                    await asyncio.sleep(QUEUE_POLL_INTERVAL)
+                    continue
+
+                _done, running = await asyncio.wait(
+                    running,
+                    timeout=QUEUE_POLL_INTERVAL,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                idle_since = loop.time()
+        finally:
+            self.close()
+
+    def close(self):
+        self.watcher.stop()
+        if self._cloud:
+            self._cloud.close()
+
+
+def get_pending_steps(completed_step):
+    """Steps still to run after the last checkpointed one"""
+    if completed_step not in STEPS:
+        return STEPS
+
+    return STEPS[STEPS.index(completed_step) + 1 :]
+
+
+class ProvisioningJob:
+    """
+    Step pipeline for one Demo Request
+
+    Every step is idempotent. Its completion is checkpointed on the Demo
+    Request (`provisioning_step`, and `cloud_site_name` once the remote
+    site exists). A retry resumes after the last good step instead of
+    creating the site again.
+    """
+
+    def __init__(self, demo_request, engine):
+        self.demo_request = demo_request
+        self.engine = engine
+        self.doc = None
+        self.settings = None
+        self.tier = None
+        self.cloud = None
+        self.apps = []
+        self.site_name = None
+
+    def log(self, message):
+        # buffered: written once enough lines pile up and at every checkpoint
+        self.doc.append_log(message)
+        frappe.db.commit()
+
+    def checkpoint(self, step):
+        self.doc.flush_log()
+        self.doc.db_set("provisioning_step", step)
+        frappe.db.commit()
+        self.doc.publish_progress(
+            step=step, progress=int((STEPS.index(step) + 1) * 100 / len(STEPS))
+        )
+
+    async def run(self):
+        result = await self.provision()
+        if result["status"] != "skipped":
+            # done either way: let the next waiting request in
+            admission.finish_provisioning(self.demo_request)
+        return result
+
+    async def provision(self):
+        try:
+            self.doc = frappe.get_doc("Demo Request", self.demo_request)
+            if self.doc.status != "Provisioning":
+                # finished or failed since it was queued (e.g. queued twice)
+                return {"status": "skipped"}
+
+            admission.hold_slot(self.demo_request)
+            self.settings = frappe.get_single("Provisioner Settings")
+            self.tier = frappe.get_doc("Package Tier", self.doc.package_tier)
+            self.cloud = self.engine.get_cloud()
+            self.apps = get_apps_for_tier(self.tier)
+            self.site_name = self.doc.cloud_site_name
+
+            pending = get_pending_steps(self.doc.provisioning_step)
+            if len(pending) < len(STEPS):
+                self.log(
+                    f"Resuming provisioning after step: {self.doc.provisioning_step}"
+                )
+            else:
+                self.log("Starting provisioning...")
+                self.log(f"Apps to install: {', '.join(self.apps)}")
+
+            for step in pending:
+                await getattr(self, step)()
+                self.checkpoint(step)
+
+            return {
+                "status": "success",
+                "site_url": self.doc.site_url,
+                "username": self.doc.demo_username,
+            }
+
+        except Exception as e:
+            frappe.db.rollback()
+            if self.doc:
+                # write lines still in the buffer before reloading the log
+                self.doc.flush_log()
+                self.doc.reload()
+                self.doc.mark_failed(str(e))
+            frappe.log_error(
+                title=f"Demo Provisioning Failed: {self.demo_request}",
+                message=frappe.get_traceback(),
+            )
+            frappe.db.commit()
+            return {"status": "failed", "error": str(e)}
+
+    async def owns_site(self, site_name, saved_name=None):
+        """
+        Whether an existing site may be taken over by this request
+
+        When Frappe Cloud reports the site's team, that decides. Otherwise
+        only the name this request recorded before creating it qualifies.
+        """
+        try:
+            site = await self.cloud.get_site_status(site_name)
+        except Exception:
+            return False
+
+        if not site:
+            return False
+        if site.get("team"):
+            return site["team"] == self.cloud.api.team
+        return site_name == saved_name
+
+    async def create_site(self):
+        expected_name = f"{self.doc.subdomain}.{self.settings.demo_domain}"
+        self.log(f"Creating site: {expected_name}")
+
+        snapshot = snapshots.get_snapshot(self.doc.industry)
+        if snapshot:
+            self.log("Creating the site from the industry snapshot")
+
+        # recorded before the call, so a retry can tell a site it created
+        # from someone else's site under the same name
+        saved_name = self.doc.cloud_site_name
+        self.doc.db_set("cloud_site_name", expected_name)
+        frappe.db.commit()
+
+        try:
+            site_result = await self.cloud.create_site(
+                subdomain=self.doc.subdomain,
+                apps=self.apps[:2],
+                plan=self.tier.frappe_cloud_plan or "Starter",
+                cluster=get_cluster(self.doc.region, self.settings),
+                files=snapshot[1] if snapshot else None,
+            )
+        except Exception:
+            # an earlier attempt may have created the site and died before
+            # its checkpoint was written
+            if not await self.owns_site(expected_name, saved_name):
+                raise
+            self.log("Site already exists on Frappe Cloud, reusing it")
+            site_result = None
+
+        self.site_name = (site_result or {}).get("name") or expected_name
+        self.doc.db_set(
+            {
+                "cloud_site_name": self.site_name,
+                "restored_snapshot": snapshot[0] if snapshot else None,
+            }
+        )
+
+    async def await_active(self):
+        self.log("Waiting for site to be ready...")
+
+        await wait_until_active(
+            self.cloud,
+            self.engine.watcher,
+            self.site_name,
+            SITE_READY_TIMEOUT,
+            on_wait=lambda elapsed: self.log(f"Still waiting... ({elapsed}s)"),
+        )
+        self.log("Site is active")
+
+    async def restore_snapshot(self):
+        """Restore the industry snapshot on a site that was not created from it"""
+        if self.doc.restored_snapshot:
+            return
+
+        # warm pool sites are created before their industry is known
+        snapshot = snapshots.get_snapshot(self.doc.industry)
+        if not snapshot:
+            return
+
+        content_hash, files = snapshot
+        self.log("Restoring the industry snapshot")
+        await self.cloud.restore_site(self.site_name, files)
+        await wait_until_active(
+            self.cloud, self.engine.watcher, self.site_name, SITE_READY_TIMEOUT
+        )
+        self.doc.db_set("restored_snapshot", content_hash)
+
+    async def install_apps(self):
+        await app_installer.install_apps(
+            self.cloud,
+            self.site_name,
+            self.apps,
+            app_installer.get_app_dependencies(self.tier),
+            log=self.log,
+        )
+
+    async def rename_site(self):
+        # only sites claimed from the warm pool carry a placeholder name
+        expected_name = f"{self.doc.subdomain}.{self.settings.demo_domain}"
+        if self.site_name == expected_name:
+            return
+
+        self.log(f"Renaming site to: {expected_name}")
+        try:
+            await self.cloud.rename_site(self.site_name, expected_name)
+        except Exception:
+            # renamed by an earlier attempt, if Frappe Cloud says it is ours
+            if not await self.owns_site(expected_name):
+                raise
+
+        self.site_name = expected_name
+        self.doc.db_set("cloud_site_name", expected_name)
+        frappe.db.commit()
+
+        await wait_until_active(
+            self.cloud, self.engine.watcher, self.site_name, SITE_READY_TIMEOUT
+        )
+
+    async def create_user(self):
+        doc = self.doc
+        if doc.demo_username:
+            return
+
+        site_url = f"https://{self.site_name}"
+        username = doc.contact_email
+        self.log(f"Creating user: {username}")
+
+        site_values = {
+            "subdomain": doc.subdomain,
+            "full_url": site_url,
+            "status": "Active",
+            "demo_request": doc.name,
+            "package_tier": doc.package_tier,
+            "industry": doc.industry,
+            "region": doc.region,
+            "frappe_cloud_site_id": self.site_name,
+            "frappe_cloud_plan": self.tier.frappe_cloud_plan,
+            "apps_installed": ", ".join(self.apps),
+        }
+
+        if doc.demo_site:
+            # claimed from the warm pool
+            frappe.db.set_value("Demo Site", doc.demo_site, site_values)
+            demo_site = doc.demo_site
+        else:
+            demo_site = (
+                frappe.get_doc({"doctype": "Demo Site", **site_values})
+                .insert(ignore_permissions=True)
+                .name
+            )
+
+        password = generate_password()
+        set_encrypted_password(doc.doctype, doc.name, password, "demo_password")
+        doc.db_set(
+            {
+                "demo_site": demo_site,
+                "site_url": site_url,
+                "demo_username": username,
+                "demo_password": "*" * len(password),
+            }
+        )
+
+    async def import_data(self):
+        restored = bool(self.doc.restored_snapshot)
+        path = sample_data.get_sample_data_path(self.doc.industry)
+        plan = synthetic_data.get_plan(self.tier, self.doc.industry) if path else None
+        if restored:
+            # the snapshot holds the records and settings, not the transactions
+            self.log("Sample data came with the industry snapshot")
+            if not plan:
+                return
+
+        settings_json = None
+        if not restored:
+            settings_json = frappe.db.get_value(
+                "Industry Template", self.doc.industry, "default_settings_json"
+            )
+        if not path and not settings_json:
+            self.log("No sample data for this industry")
+            return
+
+        sid = await self.cloud.login_as_administrator(self.site_name)
+        client = sample_data.SiteClient(self.doc.site_url, sid, self.cloud.api.session)
+        if settings_json:
+            await self.cloud.run(
+                sample_data.apply_default_settings, client, settings_json
+            )
+        if not path:
+            return
+
+        company = await self.cloud.run(client.get_default_company)
+        documents = iter(())
+        if not restored:
+            self.log("Importing sample data...")
+            groups = await self.cloud.run(sample_data.import_groups, client, path)
+            if groups:
+                self.log(f"Created {groups} groups")
+            documents = sample_data.iter_documents(path, company)
+
+        if plan:
+            self.log(f"Generating {plan.months} months of transactions")
+            abbr = await self.cloud.run(client.get_company_abbr, company)
+            # dated from the request, so a retry regenerates the same documents
+            generated = synthetic_data.iter_documents(
+                path, plan, getdate(self.doc.creation), company, abbr
+            )
+            documents = itertools.chain(documents, generated)
+
+        # records a previous attempt already imported are skipped
+        cursor = sample_data.get_import_cursor(self.demo_request)
+        doctype = None
+        for batch_doctype, docs in sample_data.batched(documents, cursor):
+            if batch_doctype != doctype:
+                doctype = batch_doctype
+                self.log(f"Importing {doctype} records")
+            await self.cloud.run(client.insert_many, docs)
+            cursor += len(docs)
+            sample_data.set_import_cursor(self.demo_request, cursor)
+
+        sample_data.set_import_cursor(self.demo_request, None)
+        self.log(f"Sample data imported ({cursor} records)")
+
+    async def notify(self):
+        self.doc.mark_completed(self.doc.site_url, self.doc.demo_username)
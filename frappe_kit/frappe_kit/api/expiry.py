@@ -0,0 +1,143 @@
+"""
+Expiry of Demo Sites whose trial has ended
+
+Expired sites are handled in keyset-ordered pages of (expires_at, name),
+read through the (status, expires_at) index on Demo Site.
+For each page the sites are suspended on Frappe Cloud in parallel, then
+the ones that were suspended are marked Suspended (and their Demo
+Requests Expired) with one UPDATE per table. After each page commits, the
+position is saved in Redis, so a run that crashes or hits its time
+budget resumes where it stopped. Sites whose suspension failed stay
+Active and are retried on the next full pass.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.utils import now_datetime
+
+from frappe_kit.frappe_kit.api.provisioning import FrappeCloudAPI
+
+EXPIRY_JOB_ID = "frappe_kit:expire_demo_sites"
+EXPIRY_TIMEOUT = 3600
+CURSOR_KEY = "frappe_kit:expiry_cursor"
+PAGE_SIZE = 500
+SUSPEND_CONCURRENCY = 20
+
+# stop taking new pages with enough of the job timeout left to finish one
+TIME_BUDGET = EXPIRY_TIMEOUT - 600
+
+
+def schedule_expiry():
+    """Scheduled: expire ended trials in a background job"""
+    frappe.enqueue(
+        "frappe_kit.frappe_kit.api.expiry.expire_demo_sites",
+        queue="long",
+        timeout=EXPIRY_TIMEOUT,
+        job_id=EXPIRY_JOB_ID,
+        deduplicate=True,
+    )
+
+
+def expire_demo_sites():
+    """Background job: suspend expired sites page by page"""
+    started = time.monotonic()
+    cursor = frappe.cache().get_value(CURSOR_KEY)
+    expired_before = now_datetime()
+    cloud_api = None
+    total = 0
+
+    with ThreadPoolExecutor(max_workers=SUSPEND_CONCURRENCY) as pool:
+        while time.monotonic() - started < TIME_BUDGET:
+            page = get_expired_page(expired_before, cursor)
+            if not page:
+                # a full pass is done; the next one starts from the beginning
+                frappe.cache().delete_value(CURSOR_KEY)
+                break
+
+            cloud_api = cloud_api or FrappeCloudAPI()
+            suspended = suspend_sites(cloud_api, pool, page)
+            mark_suspended(suspended)
+
+            cursor = (page[-1].expires_at, page[-1].name)
+            frappe.cache().set_value(CURSOR_KEY, cursor)
+            frappe.db.commit()
+            total += len(suspended)
+
+    if total:
+        frappe.logger().info(f"Expired {total} demo sites")
+
+
+def get_expired_page(expired_before, cursor=None):
+    """The next page of Active sites that expired before `expired_before`"""
+    after_cursor = ""
+    values = {"now": expired_before, "limit": PAGE_SIZE}
+    if cursor:
+        after_cursor = """
+            and (expires_at > %(expires_at)s
+                or (expires_at = %(expires_at)s and name > %(name)s))
+        """
+        values.update(expires_at=cursor[0], name=cursor[1])
+
+    return frappe.db.sql(
+        f"""
+        select name, expires_at, frappe_cloud_site_id, demo_request
+        from `tabDemo Site`
+        where status = 'Active' and expires_at < %(now)s {after_cursor}
+        order by expires_at, name
+        limit %(limit)s
+        """,
+        values,
+        as_dict=True,
+    )
+
+
+def suspend_sites(cloud_api, pool, sites):
+    """Suspend `sites` on Frappe Cloud in parallel; return the ones that were"""
+
+    def suspend(site):
+        if not site.frappe_cloud_site_id:
+            return True
+        try:
+            cloud_api.suspend_site(site.frappe_cloud_site_id)
+            return True
+        except Exception:
+            return False
+
+    results = list(pool.map(suspend, sites))
+
+    failed = [site.name for site, ok in zip(sites, results) if not ok]
+    if failed:
+        frappe.log_error(
+            title="Demo Site Suspension Failed",
+            message="Could not suspend on Frappe Cloud:\n" + "\n".join(failed),
+        )
+
+    return [site for site, ok in zip(sites, results) if ok]
+
+
+def mark_suspended(sites):
+    if not sites:
+        return
+
+    now = now_datetime()
+    frappe.db.sql(
+        """
+        update `tabDemo Site`
+        set status = 'Suspended', modified = %s
+        where name in %s and status = 'Active'
+        """,
+        (now, tuple(site.name for site in sites)),
+    )
+
+    demo_requests = tuple(site.demo_request for site in sites if site.demo_request)
+    if demo_requests:
+        frappe.db.sql(
+            """
+            update `tabDemo Request`
+            set status = 'Expired', modified = %s
+            where name in %s and status = 'Active'
+            """,
+            (now, demo_requests),
+        )
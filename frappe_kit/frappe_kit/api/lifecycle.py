@@ -0,0 +1,173 @@
+"""
+Time-ordered trial lifecycle events
+
+When a demo goes live its expiry warning and its expiry are added to a
+Redis sorted set, scored by when they are due. A dispatcher runs every
+minute and claims only the events that are due, so a trial is suspended
+within a minute of `expires_at` instead of at the next daily scan. No
+table is scanned.
+
+The daily expiry and warning jobs stay as a backstop for demos that
+went live before this queue existed, or whose events were lost with the
+cache.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.utils import add_days, get_datetime, now_datetime
+
+from frappe_kit.frappe_kit.api.expiry import (
+    SUSPEND_CONCURRENCY,
+    mark_suspended,
+    suspend_sites,
+)
+from frappe_kit.frappe_kit.api.provisioning import FrappeCloudAPI
+
+EVENTS_KEY = "frappe_kit:lifecycle_events"
+DISPATCH_BATCH = 500
+SUSPEND_RETRY_DELAY = 15 * 60
+
+WARN = "warn"
+EXPIRE = "expire"
+
+
+def schedule_trial_events(demo_request, expires_at, warn_days):
+    """Queue the warning and expiry of a demo once the transaction commits"""
+    expires_at = get_datetime(expires_at)
+    events = {
+        f"{EXPIRE}|{demo_request}": expires_at.timestamp(),
+        f"{WARN}|{demo_request}": add_days(expires_at, -warn_days).timestamp(),
+    }
+    frappe.db.after_commit.add(lambda: _add_events(events))
+
+
+def _add_events(events):
+    cache = frappe.cache()
+    cache.zadd(cache.make_key(EVENTS_KEY), events)
+
+
+def claim_due_events(now=None):
+    """
+    Remove and return the due events as [(event, demo_request)]
+
+    ZREM only succeeds for one caller, so concurrent dispatchers never
+    handle the same event twice.
+    """
+    cache = frappe.cache()
+    key = cache.make_key(EVENTS_KEY)
+    due = cache.zrangebyscore(
+        key, "-inf", now or time.time(), start=0, num=DISPATCH_BATCH
+    )
+    if not due:
+        return []
+
+    pipeline = cache.pipeline()
+    for member in due:
+        pipeline.zrem(key, member)
+    claimed = pipeline.execute()
+
+    return [
+        tuple(frappe.safe_decode(member).split("|", 1))
+        for member, removed in zip(due, claimed)
+        if removed
+    ]
+
+
+def dispatch_lifecycle_events():
+    """Scheduled every minute: send due warnings and suspend due expiries"""
+    events = claim_due_events()
+    if not events:
+        return
+
+    due = {WARN: [], EXPIRE: []}
+    for event, demo_request in events:
+        due.setdefault(event, []).append(demo_request)
+
+    if due[WARN]:
+        warn_demo_requests(due[WARN])
+    if due[EXPIRE]:
+        expire_demo_requests(due[EXPIRE])
+
+    frappe.db.commit()
+
+
+def warn_demo_requests(names):
+    settings = frappe.get_single("Provisioner Settings")
+    if not settings.expiry_warning_template:
+        return
+
+    demos = frappe.get_all(
+        "Demo Request",
+        filters={
+            "name": ["in", names],
+            "status": "Active",
+            "warning_sent_on": ["is", "not set"],
+        },
+        fields=[
+            "name",
+            "contact_email",
+            "contact_name",
+            "company_name",
+            "trial_expires",
+            "site_url",
+        ],
+    )
+    send_warning_emails(demos, settings.expiry_warning_template)
+
+
+def send_warning_emails(demos, template):
+    """Queue expiry warnings and mark the demos warned in one update"""
+    if not demos:
+        return
+
+    # queued, not sent inline: the email queue worker delivers them. Frappe
+    # has no bulk form of sendmail for per-recipient arguments, so this is
+    # one Email Queue insert per demo; the marker update below is one query
+    for demo in demos:
+        frappe.sendmail(
+            recipients=[demo.contact_email],
+            template=template,
+            args=demo,
+            reference_doctype="Demo Request",
+            reference_name=demo.name,
+        )
+
+    frappe.db.sql(
+        """
+        update `tabDemo Request`
+        set warning_sent_on = %s
+        where name in %s
+        """,
+        (now_datetime(), tuple(demo.name for demo in demos)),
+    )
+
+
+def expire_demo_requests(names):
+    sites = frappe.db.sql(
+        """
+        select name, expires_at, frappe_cloud_site_id, demo_request
+        from `tabDemo Site`
+        where demo_request in %s and status = 'Active'
+        """,
+        (tuple(names),),
+        as_dict=True,
+    )
+    if not sites:
+        return
+
+    with ThreadPoolExecutor(max_workers=SUSPEND_CONCURRENCY) as pool:
+        suspended = suspend_sites(FrappeCloudAPI(), pool, sites)
+    mark_suspended(suspended)
+
+    # try the ones Frappe Cloud did not suspend again later
+    retry_at = time.time() + SUSPEND_RETRY_DELAY
+    done = {site.name for site in suspended}
+    retries = {
+        f"{EXPIRE}|{site.demo_request}": retry_at
+        for site in sites
+        if site.name not in done
+    }
+    if retries:
+        frappe.db.after_commit.add(lambda: _add_events(retries))
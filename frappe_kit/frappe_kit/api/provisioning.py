@@ -1,22 +1,107 @@
 import frappe
 import requests
+import os
+import random
+import threading
 import time
 import json
 import secrets
 import string
-from frappe.utils import now_datetime
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from frappe.utils import cint, now_datetime
+
+from frappe_kit.frappe_kit.api.admission import get_queue_position, take_daily_quota
+from frappe_kit.frappe_kit.api.catalog import catalog_response
+from frappe_kit.frappe_kit.api.rate_limit import (
+    EMAIL_DOMAIN,
+    check_rate_limit,
+    get_email_domain,
+    guest_rate_limit,
+)
+from frappe_kit.frappe_kit.doctype.demo_request.demo_request import (
+    get_progress_task_id,
+)
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+
+_session = None
+_session_key = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Return the keep-alive HTTP session shared by this worker process.
+
+    The session is rebuilt after a fork (RQ work horses) or when the
+    configured pool size changes, so connections are never shared across
+    processes.
+    """
+    global _session, _session_key
+
+    key = (os.getpid(), pool_size)
+    if _session_key != key:
+        with _session_lock:
+            if _session_key != key:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=pool_size,
+                    pool_block=True,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_key = session, key
+
+    return _session
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2**attempt)))
 
 
 class FrappeCloudAPI:
     """Wrapper for Frappe Cloud API interactions"""
 
-    BASE_URL = "https://frappecloud.com/api/method"
+    BASE_URL = "https://frappecloud.com"
 
     def __init__(self):
         settings = frappe.get_single("Provisioner Settings")
         self.api_key = settings.frappe_cloud_api_key
         self.api_secret = settings.get_password("frappe_cloud_api_secret")
         self.team = settings.frappe_cloud_team
+        self.base_url = (settings.frappe_cloud_url or self.BASE_URL).rstrip("/")
+        self.max_retries = (
+            DEFAULT_MAX_RETRIES
+            if settings.http_max_retries is None
+            else settings.http_max_retries
+        )
+        self.session = get_session(settings.http_pool_size or DEFAULT_POOL_SIZE)
 
         if not all([self.api_key, self.api_secret, self.team]):
             frappe.throw("Frappe Cloud API credentials not configured")
@@ -27,10 +112,51 @@ class FrappeCloudAPI:
             "Content-Type": "application/json",
         }
 
-    def create_site(self, subdomain, apps, plan="Starter", cluster="Mumbai"):
-        """Create a new site on Frappe Cloud"""
-        endpoint = f"{self.BASE_URL}/press.api.site.new"
+    def _request(self, http_method, method, idempotent=False, timeout=30, **kwargs):
+        """
+        Call a Press API method over the pooled session.
+
+        Idempotent calls are retried on connection errors and 429/5xx
+        responses with jittered exponential backoff. Non-idempotent calls
+        are only retried on 429, where the server has explicitly refused
+        the request. A Retry-After header always takes precedence over the
+        computed backoff.
+        """
+        endpoint = f"{self.base_url}/api/method/{method}"
+        attempt = 0
+
+        while True:
+            try:
+                response = self.session.request(
+                    http_method,
+                    endpoint,
+                    headers=self._get_headers(),
+                    timeout=timeout,
+                    **kwargs,
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+            else:
+                retryable = response.status_code == 429 or (
+                    idempotent and response.status_code in RETRY_STATUS_CODES
+                )
+                if not retryable or attempt >= self.max_retries:
+                    return response
 
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                delay = min(delay, BACKOFF_MAX)
+
+            time.sleep(delay)
+            attempt += 1
+
+    def create_site(
+        self, subdomain, apps, plan="Starter", cluster="Mumbai", files=None
+    ):
+        """Create a new site on Frappe Cloud, restored from backup `files` if given"""
         payload = {
             "site": {
                 "subdomain": subdomain,
@@ -40,12 +166,11 @@ class FrappeCloudAPI:
                 "team": self.team,
             }
         }
+        if files:
+            payload["site"]["files"] = files
 
-        response = requests.post(
-            endpoint,
-            headers=self._get_headers(),
-            json=payload,
-            timeout=60,
+        response = self._request(
+            "POST", "press.api.site.new", json=payload, timeout=60
         )
 
         if response.status_code != 200:
@@ -53,15 +178,26 @@ class FrappeCloudAPI:
 
         return response.json().get("message")
 
+    def rename_site(self, site_name, new_name):
+        """Rename a site, e.g. when a warm pool site is handed to a customer"""
+        payload = {"name": site_name, "new_name": new_name}
+
+        response = self._request(
+            "POST", "press.api.site.rename", json=payload, timeout=60
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Site rename failed: {response.text}")
+
+        return response.json().get("message")
+
     def get_site_status(self, site_name):
         """Check site provisioning status"""
-        endpoint = f"{self.BASE_URL}/press.api.site.get"
-
-        response = requests.get(
-            endpoint,
-            headers=self._get_headers(),
+        response = self._request(
+            "GET",
+            "press.api.site.get",
+            idempotent=True,
             params={"name": site_name},
-            timeout=30,
         )
 
         if response.status_code != 200:
@@ -71,28 +207,39 @@ class FrappeCloudAPI:
 
     def install_app(self, site_name, app_name):
         """Install an app on existing site"""
-        endpoint = f"{self.BASE_URL}/press.api.site.install_app"
-
         payload = {"name": site_name, "app": app_name}
 
-        response = requests.post(
-            endpoint,
-            headers=self._get_headers(),
-            json=payload,
-            timeout=60,
+        response = self._request(
+            "POST", "press.api.site.install_app", json=payload, timeout=60
         )
 
         return response.status_code == 200
 
+    def get_installed_apps(self, site_name):
+        """Names of the apps currently installed on a site"""
+        response = self._request(
+            "GET",
+            "press.api.site.installed_apps",
+            idempotent=True,
+            params={"name": site_name},
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to get installed apps: {response.text}")
+
+        return [
+            app.get("app") if isinstance(app, dict) else app
+            for app in response.json().get("message") or []
+        ]
+
     def change_plan(self, site_name, new_plan):
         """Change a site's subscription plan"""
-        endpoint = f"{self.BASE_URL}/press.api.site.change_plan"
-
         payload = {"name": site_name, "plan": new_plan}
 
-        response = requests.post(
-            endpoint,
-            headers=self._get_headers(),
+        response = self._request(
+            "POST",
+            "press.api.site.change_plan",
+            idempotent=True,
             json=payload,
             timeout=60,
         )
@@ -102,17 +249,53 @@ class FrappeCloudAPI:
 
         return response.json().get("message")
 
+    def suspend_site(self, site_name):
+        """Deactivate a site so it stops running (and billing) on Frappe Cloud"""
+        response = self._request(
+            "POST",
+            "press.api.site.deactivate",
+            idempotent=True,
+            json={"name": site_name},
+            timeout=60,
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to suspend site: {response.text}")
+
+        return response.json().get("message")
+
+    def restore_site(self, site_name, files):
+        """Replace a site's database and files with those of a backup"""
+        payload = {"name": site_name, "files": files}
+
+        response = self._request(
+            "POST", "press.api.site.restore", json=payload, timeout=60
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Site restore failed: {response.text}")
+
+        return response.json().get("message")
+
+    def login_as_administrator(self, site_name):
+        """Session id for calling a site's own API as Administrator"""
+        payload = {"name": site_name, "reason": "Demo sample data import"}
+
+        response = self._request(
+            "POST", "press.api.site.login", json=payload, timeout=60
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Site login failed: {response.text}")
+
+        return (response.json().get("message") or {}).get("sid")
+
     def create_backup(self, site_name):
         """Trigger a backup for a site"""
-        endpoint = f"{self.BASE_URL}/press.api.site.backup"
-
         payload = {"name": site_name, "with_files": True}
 
-        response = requests.post(
-            endpoint,
-            headers=self._get_headers(),
-            json=payload,
-            timeout=60,
+        response = self._request(
+            "POST", "press.api.site.backup", json=payload, timeout=60
         )
 
         if response.status_code != 200:
@@ -122,13 +305,11 @@ class FrappeCloudAPI:
 
     def get_backups(self, site_name):
         """Get list of available backups for a site"""
-        endpoint = f"{self.BASE_URL}/press.api.site.backups"
-
-        response = requests.get(
-            endpoint,
-            headers=self._get_headers(),
+        response = self._request(
+            "GET",
+            "press.api.site.backups",
+            idempotent=True,
             params={"name": site_name},
-            timeout=30,
         )
 
         if response.status_code != 200:
@@ -143,202 +324,77 @@ def generate_password(length=12):
     return "".join(secrets.choice(alphabet) for _ in range(length))
 
 
-def provision_demo_site(demo_request):
-    """
-    Main provisioning function - called via frappe.enqueue
-
-    Steps:
-    1. Create Frappe Cloud site
-    2. Wait for site to be active
-    3. Install additional apps
-    4. Create demo user
-    5. Import sample data
-    6. Send credentials
-    """
-    doc = frappe.get_doc("Demo Request", demo_request)
-
-    try:
-        settings = frappe.get_single("Provisioner Settings")
-        tier = frappe.get_doc("Package Tier", doc.package_tier)
-        industry = (
-            frappe.get_doc("Industry Template", doc.industry) if doc.industry else None
-        )
-
-        cloud_api = FrappeCloudAPI()
+REGION_CLUSTER_MAP = {
+    "India": "Mumbai",
+    "Southeast Asia": "Singapore",
+    "Europe & UK": "Frankfurt",
+    "Middle East & Africa": "Frankfurt",
+}
 
-        doc.append_log("Starting provisioning...")
+MODULE_APP_MAP = {
+    "include_sales": "crm",
+    "include_support": "helpdesk",
+    "include_hr": "hrms",
+}
 
-        apps = ["frappe", "erpnext"]
 
-        for app_row in tier.frappe_apps:
-            if app_row.app_name not in apps:
-                apps.append(app_row.app_name)
+def get_cluster(region, settings):
+    """Frappe Cloud cluster for a customer-facing region"""
+    return REGION_CLUSTER_MAP.get(region, settings.default_region or "Mumbai")
 
-        module_app_map = {
-            "include_sales": "crm",
-            "include_support": "helpdesk",
-            "include_hr": "hrms",
-        }
 
-        for module_field, app_name in module_app_map.items():
-            if tier.get(module_field) and app_name not in apps:
-                apps.append(app_name)
+def get_apps_for_tier(tier):
+    """Apps to install for a package tier; frappe and erpnext always come first"""
+    apps = ["frappe", "erpnext"]
 
-        doc.append_log(f"Apps to install: {', '.join(apps)}")
+    for app_row in tier.frappe_apps:
+        if app_row.app_name not in apps:
+            apps.append(app_row.app_name)
 
-        doc.append_log(
-            f"Creating site: {doc.subdomain}.{settings.demo_domain}"
-        )
+    for module_field, app_name in MODULE_APP_MAP.items():
+        if tier.get(module_field) and app_name not in apps:
+            apps.append(app_name)
 
-        region_map = {
-            "India": "Mumbai",
-            "Southeast Asia": "Singapore",
-            "Europe & UK": "Frankfurt",
-            "Middle East & Africa": "Frankfurt",
-        }
-        cluster = region_map.get(doc.region, settings.default_region or "Mumbai")
+    return apps
 
-        site_result = cloud_api.create_site(
-            subdomain=doc.subdomain,
-            apps=apps[:2],
-            plan=tier.frappe_cloud_plan or "Starter",
-            cluster=cluster,
-        )
 
-        site_name = site_result.get("name") or f"{doc.subdomain}.{settings.demo_domain}"
-
-        doc.append_log("Waiting for site to be ready...")
-
-        max_wait = 180
-        wait_interval = 10
-        elapsed = 0
-
-        while elapsed < max_wait:
-            status = cloud_api.get_site_status(site_name)
-            site_status = status.get("status", "").lower()
-
-            if site_status == "active":
-                doc.append_log("Site is active")
-                break
-            elif site_status in ["broken", "failed"]:
-                raise Exception(
-                    f"Site creation failed with status: {site_status}"
-                )
-
-            time.sleep(wait_interval)
-            elapsed += wait_interval
-            doc.append_log(f"Still waiting... ({elapsed}s)")
-
-        if elapsed >= max_wait:
-            raise Exception("Site creation timed out")
-
-        for app in apps[2:]:
-            doc.append_log(f"Installing {app}...")
-            cloud_api.install_app(site_name, app)
-            time.sleep(5)
-
-        site_url = f"https://{site_name}"
-        username = doc.contact_email
-        password = generate_password()
-
-        doc.append_log(f"Creating user: {username}")
-
-        demo_site = frappe.get_doc(
-            {
-                "doctype": "Demo Site",
-                "subdomain": doc.subdomain,
-                "full_url": site_url,
-                "status": "Active",
-                "demo_request": doc.name,
-                "package_tier": doc.package_tier,
-                "industry": doc.industry,
-                "region": doc.region,
-                "frappe_cloud_site_id": site_name,
-                "frappe_cloud_plan": tier.frappe_cloud_plan,
-                "apps_installed": ", ".join(apps),
-            }
-        ).insert(ignore_permissions=True)
-
-        doc.demo_site = demo_site.name
-
-        doc.mark_completed(site_url, username, password)
+def provision_demo_site(demo_request):
+    """
+    Provision a single demo site in the calling process
 
-        frappe.db.commit()
+    Requests submitted from the website go through the provisioning engine
+    queue instead (see `api/engine.py`); this runs the same state machine
+    for one request and is kept for manual re-runs and tests.
 
-        return {
-            "status": "success",
-            "site_url": site_url,
-            "username": username,
-        }
+    Steps:
+    1. Create Frappe Cloud site
+    2. Wait for site to be active
+    3. Install additional apps
+    4. Create demo user
+    5. Import sample data
+    6. Send credentials
+    """
+    from frappe_kit.frappe_kit.api.engine import provision_many
 
-    except Exception as e:
-        frappe.db.rollback()
-        doc.mark_failed(str(e))
-        frappe.log_error(
-            title=f"Demo Provisioning Failed: {demo_request}",
-            message=frappe.get_traceback(),
-        )
-        return {"status": "failed", "error": str(e)}
+    return provision_many([demo_request])[0]
 
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def get_package_tiers():
     """Public API to get available package tiers"""
-    tiers = frappe.get_all(
-        "Package Tier",
-        filters=(
-            {"enabled": 1}
-            if frappe.db.has_column("Package Tier", "enabled")
-            else {}
-        ),
-        fields=[
-            "name",
-            "tier_name",
-            "display_name",
-            "description",
-            "employee_range_min",
-            "employee_range_max",
-            "price_india",
-            "price_sea",
-            "price_mea",
-            "price_europe",
-            "include_accounting",
-            "include_inventory",
-            "include_sales",
-            "include_support",
-            "include_hr",
-            "include_manufacturing",
-            "trial_days",
-            "is_popular",
-            "color_theme",
-            "features_html",
-        ],
-        order_by="sort_order asc",
-    )
-
-    return tiers
+    return catalog_response("package_tiers")
 
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def get_industries():
     """Public API to get available industries"""
-    industries = frappe.get_all(
-        "Industry Template",
-        filters={"enabled": 1},
-        fields=[
-            "name",
-            "industry_code",
-            "industry_name",
-            "icon",
-            "description",
-        ],
-        order_by="industry_name asc",
-    )
-
-    return industries
+    return catalog_response("industries")
 
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def submit_demo_request(data):
     """
     Public API to submit a new demo request
@@ -354,12 +410,12 @@ def submit_demo_request(data):
     if isinstance(data, str):
         data = frappe.parse_json(data)
 
-    settings = frappe.get_single("Provisioner Settings")
-    today_count = frappe.db.count(
-        "Demo Request", {"creation": [">=", frappe.utils.today()]}
+    check_rate_limit(
+        "submit_demo_request", EMAIL_DOMAIN, get_email_domain(data.get("contact_email"))
     )
 
-    if today_count >= (settings.daily_provisioning_limit or 20):
+    settings = frappe.get_single("Provisioner Settings")
+    if not take_daily_quota(settings.daily_provisioning_limit or 20):
         frappe.throw(
             "Daily limit reached. Please try again tomorrow.",
             frappe.RateLimitExceededError,
@@ -412,25 +468,85 @@ def submit_demo_request(data):
 
     doc.insert(ignore_permissions=True)
 
-    doc.start_provisioning()
+    from frappe_kit.frappe_kit.api.warm_pool import claim_pooled_site
+
+    claim_pooled_site(doc)
+
+    started = doc.start_provisioning()
 
     frappe.db.commit()
 
+    if started["status"] == "queued":
+        message = "You're in line for a demo. We'll start it as soon as we can."
+    else:
+        message = "Your demo is being prepared. You'll receive credentials shortly."
+
     return {
         "status": "success",
         "demo_request": doc.name,
-        "message": "Your demo is being prepared. You'll receive credentials shortly.",
+        "progress_task_id": get_progress_task_id(doc.name),
+        "queue_position": get_queue_position(doc.name),
+        "message": message,
     }
 
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def check_provisioning_status(demo_request):
     """Check the status of a demo request"""
-    doc = frappe.get_doc("Demo Request", demo_request)
+    doc = frappe.db.get_value(
+        "Demo Request",
+        demo_request,
+        ["status", "site_url", "error_message", "provisioning_log"],
+        as_dict=True,
+    )
+    if not doc:
+        frappe.throw("Demo request not found", frappe.DoesNotExistError)
 
     return {
         "status": doc.status,
         "site_url": doc.site_url if doc.status == "Active" else None,
         "error": doc.error_message if doc.status == "Failed" else None,
         "log": doc.provisioning_log,
+        "queue_position": (
+            get_queue_position(demo_request) if doc.status == "Pending" else None
+        ),
+    }
+
+
+@frappe.whitelist(allow_guest=True)
+@guest_rate_limit
+def get_provisioning_log(demo_request, cursor=0):
+    """
+    Status of a demo request and the log written after `cursor`
+
+    The fallback for pages that cannot receive realtime progress events.
+    `cursor` is the log length the caller already has; the response holds
+    only the text after it and the new cursor.
+    """
+    cursor = max(cint(cursor), 0)
+    doc = frappe.db.sql(
+        """
+        select status, site_url, error_message,
+            char_length(coalesce(provisioning_log, '')) as cursor,
+            substring(coalesce(provisioning_log, ''), %s) as log
+        from `tabDemo Request`
+        where name = %s
+        """,
+        (cursor + 1, demo_request),
+        as_dict=True,
+    )
+    if not doc:
+        frappe.throw("Demo request not found", frappe.DoesNotExistError)
+
+    doc = doc[0]
+    return {
+        "status": doc.status,
+        "site_url": doc.site_url if doc.status == "Active" else None,
+        "error": doc.error_message if doc.status == "Failed" else None,
+        "log": doc.log,
+        "cursor": max(doc.cursor, cursor),
+        "queue_position": (
+            get_queue_position(demo_request) if doc.status == "Pending" else None
+        ),
     }
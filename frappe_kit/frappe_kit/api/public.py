@@ -1,23 +1,18 @@
 import frappe
 
+from frappe_kit.frappe_kit.api.catalog import catalog_response
+from frappe_kit.frappe_kit.api.rate_limit import guest_rate_limit
+
 
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
 def get_demo_info():
     """Get general information for the demo landing page"""
-    tiers = frappe.get_all(
-        "Package Tier",
-        fields=["name", "display_name", "description", "is_popular", "trial_days"],
-        order_by="sort_order asc",
-    )
+    return catalog_response("demo_info")
 
-    industries = frappe.get_all(
-        "Industry Template",
-        filters={"enabled": 1},
-        fields=["name", "industry_name", "icon", "description"],
-        order_by="industry_name asc",
-    )
 
-    return {
-        "tiers": tiers,
-        "industries": industries,
-    }
+@frappe.whitelist(allow_guest=True)
+@guest_rate_limit
+def get_demo_bootstrap():
+    """Tiers, industries, regions and regional prices for the /demo wizard"""
+    return catalog_response("bootstrap")
@@ -0,0 +1,112 @@
+"""
+Rate limits for the guest endpoints
+
+Each budget is a GCRA (generic cell rate algorithm) bucket in Redis:
+`limit` requests per `period` seconds, refilled smoothly rather than all
+at once at the end of a window. A key holds a single timestamp (when
+its bucket will be full again), so memory per key is constant and the
+key expires as soon as the bucket is full. The check and the update are
+one Lua script, so concurrent requests cannot both take the last token.
+
+Budgets are per endpoint and per caller: the IP address for every guest
+endpoint, plus the email domain where a request carries one. Rows in
+Provisioner Settings > Guest API Rate Limits override the defaults
+below; a limit of 0 turns a budget off.
+"""
+
+import functools
+import math
+import time
+
+import frappe
+
+RATE_KEY = "frappe_kit:rate_limit:{endpoint}:{key_by}:{key}"
+
+IP_ADDRESS = "IP Address"
+EMAIL_DOMAIN = "Email Domain"
+
+# (endpoint, key by): (limit, period in seconds)
+DEFAULT_BUDGETS = {
+    ("get_package_tiers", IP_ADDRESS): (120, 60),
+    ("get_industries", IP_ADDRESS): (120, 60),
+    ("get_demo_info", IP_ADDRESS): (120, 60),
+    ("get_demo_bootstrap", IP_ADDRESS): (120, 60),
+    ("submit_demo_request", IP_ADDRESS): (10, 60 * 60),
+    ("submit_demo_request", EMAIL_DOMAIN): (20, 60 * 60),
+    # /demo polls every 5 seconds while a site is provisioned
+    ("check_provisioning_status", IP_ADDRESS): (60, 60),
+    ("get_provisioning_log", IP_ADDRESS): (60, 60),
+    ("get_conversion_options", IP_ADDRESS): (30, 60),
+    ("submit_conversion_request", IP_ADDRESS): (10, 60 * 60),
+    ("check_conversion_status", IP_ADDRESS): (60, 60),
+    ("site_event", IP_ADDRESS): (600, 60),
+}
+
+# KEYS: bucket  ARGV: now, seconds per request, period
+# returns 0 if allowed, otherwise the milliseconds until it would be
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('get', KEYS[1]) or now), now)
+local new_tat = tat + interval
+if new_tat - period > now then
+    return math.ceil((new_tat - period - now) * 1000)
+end
+redis.call('set', KEYS[1], tostring(new_tat), 'px', math.ceil((new_tat - now) * 1000))
+return 0
+"""
+
+
+def get_budget(endpoint, key_by):
+    """(limit, period) for an endpoint and key, None if it is unlimited"""
+    settings = frappe.get_cached_doc("Provisioner Settings")
+    for row in settings.guest_rate_limits or []:
+        if row.endpoint == endpoint and row.key_by == key_by:
+            budget = (row.limit, row.period)
+            break
+    else:
+        budget = DEFAULT_BUDGETS.get((endpoint, key_by))
+
+    if not budget or not budget[0] or not budget[1]:
+        return None
+    return budget
+
+
+def check_rate_limit(endpoint, key_by, key):
+    """Take one request from the bucket of `key`, or throw if it is empty"""
+    budget = get_budget(endpoint, key_by)
+    if not budget or not key:
+        return
+
+    limit, period = budget
+    cache = frappe.cache()
+    bucket = cache.make_key(
+        RATE_KEY.format(endpoint=endpoint, key_by=key_by, key=key.lower())
+    )
+    retry_after = cache.register_script(GCRA_SCRIPT)(
+        keys=[bucket], args=[time.time(), period / limit, period]
+    )
+
+    if retry_after:
+        seconds = math.ceil(int(retry_after) / 1000)
+        frappe.throw(
+            f"Too many requests. Please try again in {seconds} seconds.",
+            frappe.TooManyRequestsError,
+        )
+
+
+def guest_rate_limit(fn):
+    """Apply the endpoint's per-IP budget to a whitelisted guest method"""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        ip = getattr(frappe.local, "request_ip", None)
+        check_rate_limit(fn.__name__, IP_ADDRESS, ip)
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def get_email_domain(email):
+    return (email or "").rpartition("@")[2].strip() or None
@@ -0,0 +1,173 @@
+"""
+Reconciliation of stuck provisioning requests
+
+A request can stay in "Provisioning" after its engine job died, or
+while Frappe Cloud is slow. Instead of failing every old request, the
+reconciler asks Frappe Cloud about all of them concurrently and then
+settles each page with bulk updates:
+
+- the site is Active, or was never created and the request is still
+  young: the request is resumed from its last checkpoint
+- the request is older than MAX_AGE and its site is not Active: it fails
+- otherwise (the site is still being built): it is left alone
+"""
+
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+from frappe_kit.frappe_kit.api.admission import release_slot
+from frappe_kit.frappe_kit.api.engine import (
+    ENGINE_TIMEOUT,
+    QUEUE_KEY,
+    enqueue_provisioning,
+)
+from frappe_kit.frappe_kit.api.provisioning import FrappeCloudAPI
+from frappe_kit.frappe_kit.doctype.demo_request.demo_request import (
+    PROGRESS_EVENT,
+    get_progress_task_id,
+)
+
+RECONCILE_JOB_ID = "frappe_kit:reconcile_stuck_requests"
+TIME_BUDGET = 8 * 60
+PAGE_SIZE = 200
+STATUS_CONCURRENCY = 20
+
+# an engine job is killed after ENGINE_TIMEOUT, so a request idle for
+# longer than that is not being worked on
+STUCK_AFTER = timedelta(seconds=ENGINE_TIMEOUT * 1.5)
+MAX_AGE = timedelta(hours=24)
+
+
+def schedule_reconcile():
+    """Scheduled: reconcile stuck requests in a background job"""
+    frappe.enqueue(
+        "frappe_kit.frappe_kit.api.reconciler.reconcile_stuck_requests",
+        queue="long",
+        timeout=TIME_BUDGET + 120,
+        job_id=RECONCILE_JOB_ID,
+        deduplicate=True,
+    )
+
+
+def reconcile_stuck_requests():
+    """Background job: resume or fail stuck requests, page by page"""
+    started = time.monotonic()
+    settings = frappe.get_single("Provisioner Settings")
+    now = now_datetime()
+    # requests waiting in the engine queue are not stuck, just not started
+    queued = {
+        frappe.safe_decode(name) for name in frappe.cache().lrange(QUEUE_KEY, 0, -1)
+    }
+    cloud_api = None
+    last_name = ""
+
+    with ThreadPoolExecutor(max_workers=STATUS_CONCURRENCY) as pool:
+        while time.monotonic() - started < TIME_BUDGET:
+            page = get_stuck_page(now - STUCK_AFTER, last_name)
+            if not page:
+                break
+            last_name = page[-1].name
+
+            page = [request for request in page if request.name not in queued]
+            cloud_api = cloud_api or FrappeCloudAPI()
+            statuses = get_remote_statuses(cloud_api, pool, page, settings)
+
+            resume, fail = [], []
+            for request in page:
+                status = statuses.get(request.name)
+                expired = request.creation <= now - MAX_AGE
+                if status == "Active" or (status is None and not expired):
+                    resume.append(request.name)
+                elif expired:
+                    fail.append(request.name)
+
+            resume_requests(resume, now)
+            fail_requests(fail, now)
+            frappe.db.commit()
+
+
+def get_stuck_page(started_before, after_name):
+    return frappe.db.sql(
+        """
+        select name, creation, subdomain, cloud_site_name
+        from `tabDemo Request`
+        where status = 'Provisioning'
+            and provisioning_started < %s
+            and name > %s
+        order by name
+        limit %s
+        """,
+        (started_before, after_name, PAGE_SIZE),
+        as_dict=True,
+    )
+
+
+def get_remote_statuses(cloud_api, pool, requests, settings):
+    """{request name: site status on Frappe Cloud, None if there is no site}"""
+
+    def fetch(request):
+        site_name = request.cloud_site_name or (
+            f"{request.subdomain}.{settings.demo_domain}"
+        )
+        try:
+            return (cloud_api.get_site_status(site_name) or {}).get("status")
+        except Exception:
+            return None
+
+    return dict(zip((request.name for request in requests), pool.map(fetch, requests)))
+
+
+def resume_requests(names, now):
+    """Restart the stuck clock and hand the requests back to the engine"""
+    if not names:
+        return
+
+    _bulk_update(
+        names,
+        "provisioning_started = %(now)s",
+        now,
+        "Provisioning stalled; resuming from the last completed step",
+    )
+    for name in names:
+        enqueue_provisioning(name)
+
+
+def fail_requests(names, now):
+    if not names:
+        return
+
+    message = "Provisioning timed out after 24 hours"
+    _bulk_update(
+        names,
+        "status = 'Failed', error_message = %(message)s",
+        now,
+        f"Provisioning failed: {message}",
+        message=message,
+    )
+    for name in names:
+        frappe.db.after_commit.add(functools.partial(release_slot, name))
+        frappe.publish_realtime(
+            PROGRESS_EVENT,
+            {"demo_request": name, "status": "Failed", "error": message},
+            task_id=get_progress_task_id(name),
+            after_commit=True,
+        )
+
+
+def _bulk_update(names, assignments, now, log, **values):
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    frappe.db.sql(
+        f"""
+        update `tabDemo Request`
+        set {assignments},
+            modified = %(now)s,
+            provisioning_log = concat(coalesce(provisioning_log, ''), %(log)s)
+        where name in %(names)s and status = 'Provisioning'
+        """,
+        dict(values, now=now, log=f"[{timestamp}] {log}\n", names=tuple(names)),
+    )
@@ -0,0 +1,533 @@
+"""
+Industry sample data import
+
+A sample data file is a JSON object of record lists, one per section
+("items", "customers", "sales_invoices", ...). The file is parsed
+incrementally, one record at a time, so memory stays bounded however
+many transactions it holds. Sections are imported in dependency order
+(groups before the masters that link to them, masters before
+transactions), each streamed in batches through `frappe.client.insert_many`
+on the demo site.
+
+Groups that records link to (item groups, customer groups, ...) are not
+listed in the files. They are collected in a first pass, and those the
+site lacks are created before anything else.
+
+Import is resumable: the number of file records already on the site is
+kept in Redis, and a retried import skips that many.
+
+Everything in a file but its transactions (the masters, the list of
+sections, the content hash) is parsed and checked once per worker
+process and kept in a small LRU cache, keyed by path and checked against
+the file's mtime and size on every use. Masters are held as tuples of
+values under one shared tuple of field names rather than as dicts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from graphlib import TopologicalSorter
+
+import frappe
+
+CHUNK_SIZE = 64 * 1024
+# frappe.client.insert_many refuses more than 200 documents per call
+BATCH_SIZE = 200
+
+TEMPLATE_CACHE_SIZE = 32
+
+CURSOR_KEY = "frappe_kit:sample_data_cursor:{owner}"
+CURSOR_TTL = 24 * 60 * 60
+
+BUNDLED_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "templates", "sample_data"
+)
+
+# section: (doctype, sections it links to, needs a company)
+SECTIONS = {
+    "warehouses": ("Warehouse", (), True),
+    "items": ("Item", (), False),
+    "customers": ("Customer", (), False),
+    "suppliers": ("Supplier", (), False),
+    "stock_entries": ("Stock Entry", ("items", "warehouses"), True),
+    "purchase_invoices": ("Purchase Invoice", ("items", "suppliers"), True),
+    "sales_invoices": ("Sales Invoice", ("items", "customers"), True),
+}
+
+# masters link to nothing; they are few enough to keep parsed
+MASTER_SECTIONS = tuple(
+    section for section, (_, links, _) in SECTIONS.items() if not links
+)
+REQUIRED_FIELDS = {
+    "warehouses": "warehouse_name",
+    "items": "item_code",
+    "customers": "customer_name",
+    "suppliers": "supplier_name",
+}
+
+# section: [(link field, group doctype, name field, defaults)]
+GROUP_LINKS = {
+    "items": [
+        (
+            "item_group",
+            "Item Group",
+            "item_group_name",
+            {"parent_item_group": "All Item Groups"},
+        ),
+    ],
+    "customers": [
+        (
+            "customer_group",
+            "Customer Group",
+            "customer_group_name",
+            {"parent_customer_group": "All Customer Groups"},
+        ),
+        (
+            "territory",
+            "Territory",
+            "territory_name",
+            {"parent_territory": "All Territories"},
+        ),
+    ],
+    "suppliers": [
+        (
+            "supplier_group",
+            "Supplier Group",
+            "supplier_group_name",
+            {"parent_supplier_group": "All Supplier Groups"},
+        ),
+    ],
+    # Warehouse Type is named by prompt, so the name is given directly
+    "warehouses": [("warehouse_type", "Warehouse Type", "name", {})],
+}
+
+
+def get_import_order():
+    """Sections with every section they link to before them"""
+    graph = TopologicalSorter(
+        {section: links for section, (_, links, _) in SECTIONS.items()}
+    )
+    return list(graph.static_order())
+
+
+def get_sample_data_path(industry):
+    """An Industry Template's sample data file: its attachment or the bundled one"""
+    if not industry:
+        return None
+
+    template = frappe.db.get_value(
+        "Industry Template",
+        industry,
+        ["industry_code", "sample_data_file"],
+        as_dict=True,
+    )
+    if not template:
+        return None
+
+    if template.sample_data_file:
+        file = frappe.get_doc("File", {"file_url": template.sample_data_file})
+        return file.get_full_path()
+
+    path = os.path.join(BUNDLED_DIR, f"{template.industry_code.lower()}.json")
+    return path if os.path.exists(path) else None
+
+
+class _JSONStream:
+    """Reads JSON values one at a time from a file, keeping one chunk in memory"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _read(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Next non-whitespace character, without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError("Unexpected end of sample data file")
+            self._read()
+
+    def expect(self, *chars):
+        char = self.peek()
+        if char not in chars:
+            expected = " or ".join(chars)
+            raise ValueError(f"Expected {expected} in sample data, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            self._read()
+
+
+def iter_sections(path, chunk_size=CHUNK_SIZE):
+    """
+    Walk a sample data file, yielding (section, records) per top-level key
+
+    `records` streams that section's records and must be consumed or
+    closed before the walk moves on. Other values are skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        stream = _JSONStream(f, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if stream.peek() == "[":
+                records = _iter_array(stream)
+                yield key, records
+                for _ in records:
+                    pass  # whatever the caller did not read
+            else:
+                stream.value()
+
+            if stream.expect(",", "}") == "}":
+                return
+
+
+def _iter_array(stream):
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+
+    while True:
+        yield stream.value()
+        if stream.expect(",", "]") == "]":
+            return
+
+
+def iter_records(path, section, chunk_size=CHUNK_SIZE):
+    """Stream the records of one section, reading no further than its end"""
+    for key, records in iter_sections(path, chunk_size):
+        if key == section:
+            yield from records
+            return
+
+
+_MISSING = object()
+
+
+class RecordTable:
+    """Records of one section as value tuples sharing one tuple of field names"""
+
+    __slots__ = ("fields", "rows")
+
+    def __init__(self, records):
+        fields = {}
+        for record in records:
+            fields.update(dict.fromkeys(record))
+
+        self.fields = tuple(fields)
+        self.rows = tuple(
+            tuple(record.get(field, _MISSING) for field in self.fields)
+            for record in records
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        """A new dict per record, so callers may change it"""
+        for row in self.rows:
+            yield {
+                field: value
+                for field, value in zip(self.fields, row)
+                if value is not _MISSING
+            }
+
+
+class SampleDataTemplate:
+    """A parsed sample data file, less its transactions"""
+
+    __slots__ = ("content_hash", "sections", "masters")
+
+    def __init__(self, content_hash, sections, masters):
+        self.content_hash = content_hash
+        self.sections = sections
+        self.masters = masters
+
+    def records(self, section):
+        return iter(self.masters.get(section, ()))
+
+
+def parse_template(path):
+    """Read a sample data file's sections and masters, checking the masters"""
+    content = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            content.update(chunk)
+
+    sections, masters = [], {}
+    for section, records in iter_sections(path):
+        sections.append(section)
+        if section not in MASTER_SECTIONS:
+            continue
+
+        records = list(records)
+        required = REQUIRED_FIELDS[section]
+        for index, record in enumerate(records):
+            if not isinstance(record, dict) or not record.get(required):
+                raise ValueError(
+                    f"{os.path.basename(path)}: {section} record {index + 1}"
+                    f" has no {required}"
+                )
+        masters[section] = RecordTable(records)
+
+    return SampleDataTemplate(content.hexdigest(), tuple(sections), masters)
+
+
+class TemplateCache:
+    """Per-process LRU of parsed templates, reparsed when their file changes"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == version:
+                self.entries.move_to_end(path)
+                return entry[1]
+
+        template = parse_template(path)
+        with self.lock:
+            self.entries[path] = (version, template)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return template
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_templates = TemplateCache(TEMPLATE_CACHE_SIZE)
+
+
+def load_template(path):
+    return _templates.get(path)
+
+
+def get_sections(path):
+    """Names of the record lists in a sample data file"""
+    return list(load_template(path).sections)
+
+
+def get_group_docs(path):
+    """{group doctype: {name: document}} for the groups the file links to"""
+    template = load_template(path)
+    groups = {}
+    for section, links in GROUP_LINKS.items():
+        for record in template.records(section):
+            for fieldname, doctype, name_field, defaults in links:
+                name = record.get(fieldname)
+                if name:
+                    groups.setdefault(doctype, {})[name] = {
+                        "doctype": doctype,
+                        name_field: name,
+                        **defaults,
+                    }
+
+    return groups
+
+
+def iter_documents(path, company=None):
+    """Yield (section, document) for the file's records, in dependency order"""
+    template = load_template(path)
+    for section in get_import_order():
+        if section not in template.sections:
+            continue
+
+        if section in template.masters:
+            records = template.records(section)
+        else:
+            records = iter_records(path, section)
+        for record in records:
+            yield section, make_document(section, record, company)
+
+
+def make_document(section, record, company=None):
+    doctype, _, needs_company = SECTIONS[section]
+    record["doctype"] = doctype
+    if needs_company and company:
+        record.setdefault("company", company)
+    return record
+
+
+def batched(documents, skip=0):
+    """
+    Group (section, document) pairs into (doctype, documents) batches
+
+    The first `skip` documents are left out, so an interrupted import can
+    carry on where it stopped.
+    """
+    doctype, batch = None, []
+    for _section, document in documents:
+        if skip:
+            skip -= 1
+            continue
+
+        if batch and (document["doctype"] != doctype or len(batch) == BATCH_SIZE):
+            yield doctype, batch
+            batch = []
+        doctype = document["doctype"]
+        batch.append(document)
+
+    if batch:
+        yield doctype, batch
+
+
+def iter_batches(path, skip=0, company=None):
+    """Yield (doctype, documents) batches of the file's records"""
+    return batched(iter_documents(path, company), skip)
+
+
+def import_groups(client, path):
+    """Create the groups the sample data links to that the site lacks"""
+    created = 0
+    for doctype, docs in get_group_docs(path).items():
+        existing = client.get_existing(doctype, list(docs))
+        missing = [doc for name, doc in docs.items() if name not in existing]
+        for start in range(0, len(missing), BATCH_SIZE):
+            client.insert_many(missing[start : start + BATCH_SIZE])
+        created += len(missing)
+
+    return created
+
+
+def get_import_cursor(owner):
+    """Records of the file already imported for `owner` (a request or a site)"""
+    cache = frappe.cache()
+    key = cache.make_key(CURSOR_KEY.format(owner=owner))
+    return int(cache.get(key) or 0)
+
+
+def set_import_cursor(owner, cursor):
+    cache = frappe.cache()
+    key = cache.make_key(CURSOR_KEY.format(owner=owner))
+    if cursor is None:
+        cache.delete(key)
+    else:
+        cache.set(key, cursor, ex=CURSOR_TTL)
+
+
+def apply_default_settings(client, settings_json):
+    """Set an Industry Template's default settings: {single doctype: {field: value}}"""
+    settings = json.loads(settings_json or "{}") or {}
+    for doctype, values in settings.items():
+        client.set_value(doctype, doctype, values)
+
+
+def import_sample_data(client, path, owner):
+    """Blocking import, for jobs outside the provisioning engine"""
+    import_groups(client, path)
+    company = client.get_default_company()
+    cursor = get_import_cursor(owner)
+    for _doctype, docs in iter_batches(path, cursor, company):
+        client.insert_many(docs)
+        cursor += len(docs)
+        set_import_cursor(owner, cursor)
+
+    set_import_cursor(owner, None)
+    return cursor
+
+
+class SiteClient:
+    """REST calls to a demo site, signed in as Administrator"""
+
+    def __init__(self, site_url, sid, session, timeout=120):
+        self.site_url = site_url.rstrip("/")
+        self.sid = sid
+        self.session = session
+        self.timeout = timeout
+
+    def _call(self, http_method, method, **kwargs):
+        response = self.session.request(
+            http_method,
+            f"{self.site_url}/api/method/{method}",
+            cookies={"sid": self.sid},
+            timeout=self.timeout,
+            **kwargs,
+        )
+        if response.status_code != 200:
+            raise Exception(f"{method} failed on {self.site_url}: {response.text}")
+
+        return response.json().get("message")
+
+    def insert_many(self, docs):
+        return self._call("POST", "frappe.client.insert_many", json={"docs": docs})
+
+    def get_existing(self, doctype, names):
+        """The subset of `names` that exist as `doctype` on the site"""
+        rows = self._call(
+            "GET",
+            "frappe.client.get_list",
+            params={
+                "doctype": doctype,
+                "fields": json.dumps(["name"]),
+                "filters": json.dumps({"name": ["in", names]}),
+                "limit_page_length": 0,
+            },
+        )
+        return {row["name"] for row in rows or []}
+
+    def set_value(self, doctype, name, values):
+        return self._call(
+            "POST",
+            "frappe.client.set_value",
+            json={"doctype": doctype, "name": name, "fieldname": values},
+        )
+
+    def get_company_abbr(self, company):
+        if not company:
+            return None
+        values = self._call(
+            "GET",
+            "frappe.client.get_value",
+            params={"doctype": "Company", "filters": company, "fieldname": "abbr"},
+        )
+        return (values or {}).get("abbr")
+
+    def get_default_company(self):
+        return self._call(
+            "GET",
+            "frappe.client.get_single_value",
+            params={"doctype": "Global Defaults", "field": "default_company"},
+        )
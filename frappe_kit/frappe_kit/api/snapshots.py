@@ -0,0 +1,188 @@
+"""
+Industry snapshots
+
+Importing an industry's sample data into every new demo site repeats
+the same inserts each time. Instead, each Industry Template is built
+once on a snapshot site with the base apps: its default settings are
+applied, its sample data is imported, and the site is backed up. New
+demo sites are then created from that backup, or have it restored, in
+one Frappe Cloud operation. Apps of the tier that the snapshot lacks are
+installed on top by the normal install step.
+
+A snapshot is keyed by a hash over the sample data file and the default
+settings. It is rebuilt only when that hash changes, and provisioning
+only uses a snapshot whose hash matches the template as it is now.
+"""
+
+import hashlib
+import json
+import re
+
+import frappe
+from frappe.utils import now_datetime
+
+from frappe_kit.frappe_kit.api import backups, sample_data
+from frappe_kit.frappe_kit.api.callbacks import wait_until_active_sync
+from frappe_kit.frappe_kit.api.provisioning import FrappeCloudAPI
+
+BUILD_JOB_ID = "frappe_kit:build_snapshot:{industry}"
+BUILD_TIMEOUT = 2 * 60 * 60
+SITE_READY_TIMEOUT = 15 * 60
+
+# bump when the way snapshots are built changes, to rebuild them all
+SNAPSHOT_FORMAT = "1"
+BASE_APPS = ["frappe", "erpnext"]
+BACKUP_FILES = ("database", "public", "private", "config")
+
+
+def get_template_hash(industry):
+    """Content hash of an Industry Template's sample data and default settings"""
+    settings_json = frappe.db.get_value(
+        "Industry Template", industry, "default_settings_json"
+    )
+    content = hashlib.sha256(SNAPSHOT_FORMAT.encode())
+    content.update((settings_json or "").encode())
+
+    path = sample_data.get_sample_data_path(industry)
+    if path:
+        content.update(sample_data.load_template(path).content_hash.encode())
+
+    return content.hexdigest()
+
+
+def get_snapshot(industry):
+    """(hash, backup files) of the industry's current snapshot, or None"""
+    settings = frappe.get_single("Provisioner Settings")
+    if not settings.enable_industry_snapshots or not industry:
+        return None
+
+    snapshot = frappe.db.get_value(
+        "Industry Template",
+        industry,
+        ["snapshot_hash", "snapshot_files"],
+        as_dict=True,
+    )
+    if not snapshot or not snapshot.snapshot_files:
+        return None
+
+    # a snapshot of an older version of the template is not used
+    if snapshot.snapshot_hash != get_template_hash(industry):
+        return None
+
+    return snapshot.snapshot_hash, json.loads(snapshot.snapshot_files)
+
+
+def schedule_snapshot_builds():
+    """Scheduled: rebuild the snapshots of templates that changed"""
+    settings = frappe.get_single("Provisioner Settings")
+    if not settings.enable_industry_snapshots:
+        return
+
+    templates = frappe.get_all(
+        "Industry Template", filters={"enabled": 1}, fields=["name", "snapshot_hash"]
+    )
+    for template in templates:
+        if template.snapshot_hash != get_template_hash(template.name):
+            schedule_snapshot_build(template.name)
+
+
+def schedule_snapshot_build(industry):
+    frappe.enqueue(
+        "frappe_kit.frappe_kit.api.snapshots.build_snapshot",
+        queue="long",
+        timeout=BUILD_TIMEOUT,
+        job_id=BUILD_JOB_ID.format(industry=industry),
+        deduplicate=True,
+        enqueue_after_commit=True,
+        industry=industry,
+    )
+
+
+def on_template_update(doc, method=None):
+    """Industry Template hook: rebuild its snapshot if the content changed"""
+    settings = frappe.get_single("Provisioner Settings")
+    if not doc.enabled or not settings.enable_industry_snapshots:
+        return
+
+    if doc.snapshot_hash != get_template_hash(doc.name):
+        schedule_snapshot_build(doc.name)
+
+
+def get_snapshot_subdomain(industry, content_hash):
+    code = re.sub(r"[^a-z0-9]+", "-", industry.lower()).strip("-")[:20]
+    return f"snapshot-{code}-{content_hash[:10]}"
+
+
+def build_snapshot(industry):
+    """
+    Background job: build the snapshot of one Industry Template
+
+    Each stage can be repeated. A retried build reuses the snapshot site
+    and carries on with the import where it stopped.
+    """
+    content_hash = get_template_hash(industry)
+    template = frappe.get_doc("Industry Template", industry)
+    if template.snapshot_hash == content_hash and template.snapshot_files:
+        return
+
+    settings = frappe.get_single("Provisioner Settings")
+    cloud_api = FrappeCloudAPI()
+    subdomain = get_snapshot_subdomain(industry, content_hash)
+    site_name = f"{subdomain}.{settings.demo_domain}"
+
+    if not site_exists(cloud_api, site_name):
+        cloud_api.create_site(
+            subdomain=subdomain,
+            apps=BASE_APPS,
+            cluster=settings.default_region or "Mumbai",
+        )
+    wait_until_active_sync(cloud_api, site_name, SITE_READY_TIMEOUT)
+
+    client = sample_data.SiteClient(
+        f"https://{site_name}",
+        cloud_api.login_as_administrator(site_name),
+        cloud_api.session,
+    )
+    sample_data.apply_default_settings(client, template.default_settings_json)
+    path = sample_data.get_sample_data_path(industry)
+    if path:
+        sample_data.import_sample_data(client, path, site_name)
+
+    files = take_backup(cloud_api, site_name)
+    # the snapshot lives on in its backup; the site need not keep running
+    cloud_api.suspend_site(site_name)
+
+    template.db_set(
+        {
+            "snapshot_hash": content_hash,
+            "snapshot_site": site_name,
+            "snapshot_built_on": now_datetime(),
+            "snapshot_files": json.dumps(files),
+        }
+    )
+    frappe.db.commit()
+
+
+def site_exists(cloud_api, site_name):
+    try:
+        return bool(cloud_api.get_site_status(site_name))
+    except Exception:
+        return False
+
+
+def take_backup(cloud_api, site_name):
+    """Back a site up and return the backup's files, once they are uploaded"""
+    backup = backups.take_backup(cloud_api, site_name)
+    files = get_backup_files(backup)
+    if not files.get("database"):
+        raise Exception(f"Backup {backup.get('name')} has no offsite database file")
+    return files
+
+
+def get_backup_files(backup):
+    """{kind: remote file} for a Frappe Cloud backup, as site restores take them"""
+    return {
+        kind: backup[f"remote_{kind}_file"]
+        for kind in BACKUP_FILES
+        if backup.get(f"remote_{kind}_file")
+    }
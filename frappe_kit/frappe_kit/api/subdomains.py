@@ -0,0 +1,88 @@
+"""
+Subdomain allocation
+
+Each base name (e.g. "acme") has a counter in Redis holding the last
+suffix handed out. INCR is atomic, so concurrent submissions for the
+same company name get different subdomains without a probe loop. A
+missing counter (first use, expired, or Redis flushed) is seeded with a
+single query over Demo Sites and the Demo Requests that may still create
+one.
+
+Counters of different bases can meet: "acme" counting up reaches
+"acme-1", which may already have been handed out as the base of "Acme 1".
+Each name is checked against the same tables before it is returned, and
+a taken one is skipped.
+"""
+
+import frappe
+
+COUNTER_KEY = "frappe_kit:subdomain_counter:{base}"
+COUNTER_TTL = 24 * 60 * 60
+MAX_ATTEMPTS = 20
+
+# requests in these states hold their subdomain without having a Demo Site
+RESERVING_STATUSES = ("Pending", "Provisioning", "Failed")
+
+
+def allocate_subdomain(base):
+    """Return `base`, or `base-N` with the next free N"""
+    cache = frappe.cache()
+    counter = COUNTER_KEY.format(base=base)
+    key = cache.make_key(counter)
+
+    # `exists` adds the site prefix itself; set and incr are raw commands
+    if not cache.exists(counter):
+        # nx: if another worker seeded it first, keep its value
+        cache.set(key, get_last_suffix(base), nx=True, ex=COUNTER_TTL)
+
+    cache.expire(key, COUNTER_TTL)
+    for _attempt in range(MAX_ATTEMPTS):
+        suffix = cache.incr(key)
+        subdomain = base if suffix == 0 else f"{base}-{suffix}"
+        if not is_taken(subdomain):
+            return subdomain
+
+    frappe.throw("Could not find a free subdomain, please try again")
+
+
+def is_taken(subdomain):
+    """Whether a Demo Site or a reserving Demo Request already has `subdomain`"""
+    return bool(
+        frappe.db.sql(
+            """
+            select name from `tabDemo Site` where subdomain = %(subdomain)s
+            union all
+            select name from `tabDemo Request`
+            where subdomain = %(subdomain)s and status in %(statuses)s
+            limit 1
+            """,
+            {"subdomain": subdomain, "statuses": RESERVING_STATUSES},
+        )
+    )
+
+
+def get_last_suffix(base):
+    """Highest suffix in use for `base`: 0 for the bare name, -1 if unused"""
+    pattern = base.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%")
+    taken = frappe.db.sql(
+        """
+        select subdomain from `tabDemo Site`
+        where subdomain = %(base)s or subdomain like %(pattern)s
+        union
+        select subdomain from `tabDemo Request`
+        where (subdomain = %(base)s or subdomain like %(pattern)s)
+            and status in %(statuses)s
+        """,
+        {"base": base, "pattern": f"{pattern}-%", "statuses": RESERVING_STATUSES},
+        pluck=True,
+    )
+
+    last = -1
+    for subdomain in taken:
+        suffix = subdomain[len(base) + 1 :]
+        if subdomain == base:
+            last = max(last, 0)
+        elif suffix.isdigit():
+            last = max(last, int(suffix))
+
+    return last
@@ -0,0 +1,280 @@
+"""
+Synthetic transactions
+
+The sample data files hold a handful of masters per industry. To give
+reports and stock ledgers a realistic volume, those seed records are
+expanded into `months` months of sales invoices, purchase invoices and
+stock transfers, ending the month before a given date. The Package Tier
+sets the number of months and a volume scale; the Industry Template's
+demo scenarios shift the mix (a "Stock Transfer" scenario means more
+transfers, and so on).
+
+Generation is deterministic: the same template, plan and end date give
+the same documents, so a retried import can skip what it already sent.
+Each month is drawn in one go (every line, quantity and price of the
+month from `Random.choices`) and handed on before the next one is drawn.
+
+Stock never goes negative: each month's purchases are dated the first
+of the month and bring in what that month's sales and transfers take
+out, plus a safety stock.
+"""
+
+import math
+import random
+
+import frappe
+from frappe.utils import add_days, add_months, cint, flt, getdate
+
+from frappe_kit.frappe_kit.api import sample_data
+
+# bump when the generator changes, so demos built before and after differ
+SEED_VERSION = "1"
+
+# documents per month at scale 1
+BASE_VOLUMES = {
+    "purchase_invoices": 4,
+    "stock_entries": 6,
+    "sales_invoices": 40,
+}
+
+# a scenario mentioning the word makes its section busier
+SCENARIO_KEYWORDS = {
+    "sale": ("sales_invoices", 1.5),
+    "billing": ("sales_invoices", 1.5),
+    "order": ("sales_invoices", 1.25),
+    "replenish": ("purchase_invoices", 1.5),
+    "procure": ("purchase_invoices", 1.5),
+    "transfer": ("stock_entries", 2.0),
+}
+
+LINES_PER_INVOICE = (1, 2, 3, 4)
+LINE_WEIGHTS = (4, 3, 2, 1)
+MAX_QTY = 10
+SAFETY_STOCK = 0.5
+PURCHASE_DISCOUNT = 0.7
+PAYMENT_DAYS = 30
+LAST_DAY = 28
+
+
+def get_plan(tier, industry):
+    """Months, seed and monthly volumes for a tier and industry, None for no data"""
+    months = cint(tier.get("sample_data_months"))
+    if months <= 0 or not industry:
+        return None
+
+    scale = flt(tier.get("sample_data_scale")) or 1
+    scenarios = frappe.get_all(
+        "Industry Demo Scenario",
+        filters={"parent": industry, "parenttype": "Industry Template"},
+        fields=["title", "description"],
+    )
+    weights = get_scenario_weights(scenarios)
+
+    return frappe._dict(
+        months=months,
+        seed=f"{industry}:{SEED_VERSION}",
+        volumes={
+            section: max(1, round(volume * scale * weights.get(section, 1)))
+            for section, volume in BASE_VOLUMES.items()
+        },
+    )
+
+
+def get_scenario_weights(scenarios):
+    """{section: volume multiplier} from the template's demo scenarios"""
+    weights = {}
+    for scenario in scenarios:
+        text = f"{scenario.title} {scenario.description or ''}".lower()
+        factors = {}
+        for keyword, (section, factor) in SCENARIO_KEYWORDS.items():
+            if keyword in text:
+                factors[section] = max(factors.get(section, 1), factor)
+        for section, factor in factors.items():
+            weights[section] = weights.get(section, 1) * factor
+
+    return weights
+
+
+def get_month_starts(end_date, months):
+    """First days of the `months` whole months before `end_date`"""
+    first = getdate(end_date).replace(day=1)
+    return [add_months(first, offset) for offset in range(-months, 0)]
+
+
+def load_masters(path):
+    """The seed records transactions are drawn from"""
+    template = sample_data.load_template(path)
+    return frappe._dict(
+        {
+            section: list(template.records(section))
+            for section in ("items", "customers", "suppliers", "warehouses")
+        }
+    )
+
+
+def iter_documents(path, plan, end_date, company=None, abbr=None):
+    """Yield (section, document) for the generated transactions, oldest first"""
+    generator = TransactionGenerator(plan, load_masters(path), abbr)
+    for month_start in get_month_starts(end_date, plan.months):
+        for section, record in generator.generate_month(month_start):
+            yield section, sample_data.make_document(section, record, company)
+
+
+class TransactionGenerator:
+    """Draws a month of transactions at a time, carrying stock between months"""
+
+    def __init__(self, plan, masters, abbr=None):
+        self.rng = random.Random(plan.seed)
+        self.volumes = plan.volumes
+        self.items = masters["items"]
+        self.customers = [c["customer_name"] for c in masters["customers"]]
+        self.suppliers = [s["supplier_name"] for s in masters["suppliers"]]
+        self.warehouses = [
+            f"{w['warehouse_name']} - {abbr}" if abbr else w["warehouse_name"]
+            for w in masters["warehouses"]
+        ]
+        # with no warehouses (services) nothing is stocked
+        self.main_warehouse = self.warehouses[0] if self.warehouses else None
+        self.stock = dict.fromkeys(range(len(self.items)), 0)
+
+        # a few items sell far more than the rest
+        ranks = list(range(1, len(self.items) + 1))
+        self.rng.shuffle(ranks)
+        self.popularity = [1 / rank for rank in ranks]
+
+    def generate_month(self, month_start):
+        """(section, record) for one month: purchases, then transfers, then sales"""
+        if not self.items or not self.customers:
+            return []
+
+        sales = self.draw_sales(month_start)
+        transfers = self.draw_transfers(month_start)
+
+        needed = dict.fromkeys(self.stock, 0)
+        for _customer, _date, lines in sales:
+            for item, qty, _rate in lines:
+                needed[item] += qty
+        for _date, _target, item, qty in transfers:
+            needed[item] += qty
+
+        records = [
+            ("purchase_invoices", record)
+            for record in self.draw_purchases(month_start, needed)
+        ]
+        records += [
+            ("stock_entries", self.make_transfer(*transfer)) for transfer in transfers
+        ]
+        records += [("sales_invoices", self.make_sale(*sale)) for sale in sales]
+        return records
+
+    def draw_days(self, month_start, count):
+        # the 1st is left to the purchases restocking the month
+        days = sorted(self.rng.choices(range(1, LAST_DAY), k=count))
+        return [add_days(month_start, day) for day in days]
+
+    def draw_sales(self, month_start):
+        """[(customer, date, [(item, qty, rate)])] for the month's sales invoices"""
+        rng = self.rng
+        # busier towards the end of the year
+        season = 1 + 0.2 * math.sin(2 * math.pi * (month_start.month - 8) / 12)
+        count = max(1, round(self.volumes["sales_invoices"] * season))
+
+        customers = rng.choices(self.customers, k=count)
+        dates = self.draw_days(month_start, count)
+        line_counts = rng.choices(LINES_PER_INVOICE, weights=LINE_WEIGHTS, k=count)
+        total = sum(line_counts)
+        items = rng.choices(range(len(self.items)), weights=self.popularity, k=total)
+        quantities = rng.choices(range(1, MAX_QTY + 1), k=total)
+        markups = [rng.uniform(0.9, 1.1) for _ in range(total)]
+
+        sales, start = [], 0
+        for customer, date, line_count in zip(customers, dates, line_counts):
+            lines = [
+                (item, qty, round(flt(self.items[item].get("standard_rate")) * m, 2))
+                for item, qty, m in zip(
+                    items[start : start + line_count],
+                    quantities[start : start + line_count],
+                    markups[start : start + line_count],
+                )
+            ]
+            sales.append((customer, date, lines))
+            start += line_count
+
+        return sales
+
+    def draw_transfers(self, month_start):
+        """[(date, target warehouse, item, qty)] from the main warehouse"""
+        if len(self.warehouses) < 2:
+            return []
+
+        rng = self.rng
+        count = self.volumes["stock_entries"]
+        dates = self.draw_days(month_start, count)
+        targets = rng.choices(self.warehouses[1:], k=count)
+        items = rng.choices(range(len(self.items)), weights=self.popularity, k=count)
+        quantities = rng.choices(range(MAX_QTY, MAX_QTY * 5 + 1), k=count)
+        return list(zip(dates, targets, items, quantities))
+
+    def draw_purchases(self, month_start, needed):
+        """Invoices dated the 1st restocking what the month will use"""
+        if not self.suppliers:
+            return []
+
+        lines = []
+        for item, qty in needed.items():
+            if self.main_warehouse:
+                target = math.ceil(qty * (1 + SAFETY_STOCK))
+                purchase = max(0, target - self.stock[item])
+                self.stock[item] += purchase - qty
+            else:
+                purchase = qty
+            if purchase:
+                rate = flt(self.items[item].get("standard_rate")) * PURCHASE_DISCOUNT
+                lines.append((item, purchase, round(rate, 2)))
+
+        count = min(self.volumes["purchase_invoices"], len(lines))
+        suppliers = self.rng.choices(self.suppliers, k=count)
+        return [
+            self.make_invoice("supplier", supplier, month_start, lines[index::count])
+            for index, supplier in enumerate(suppliers)
+        ]
+
+    def make_sale(self, customer, date, lines):
+        return self.make_invoice("customer", customer, date, lines)
+
+    def make_invoice(self, party_field, party, date, lines):
+        invoice = {
+            party_field: party,
+            "posting_date": date.isoformat(),
+            "due_date": add_days(date, PAYMENT_DAYS).isoformat(),
+            "set_posting_time": 1,
+            "docstatus": 1,
+            "items": [
+                {"item_code": self.items[item]["item_code"], "qty": qty, "rate": rate}
+                for item, qty, rate in lines
+            ],
+        }
+        if self.main_warehouse:
+            invoice["update_stock"] = 1
+            invoice["set_warehouse"] = self.main_warehouse
+            for row in invoice["items"]:
+                row["warehouse"] = self.main_warehouse
+        return invoice
+
+    def make_transfer(self, date, target, item, qty):
+        return {
+            "stock_entry_type": "Material Transfer",
+            "posting_date": date.isoformat(),
+            "set_posting_time": 1,
+            "docstatus": 1,
+            "from_warehouse": self.main_warehouse,
+            "to_warehouse": target,
+            "items": [
+                {
+                    "item_code": self.items[item]["item_code"],
+                    "qty": qty,
+                    "s_warehouse": self.main_warehouse,
+                    "t_warehouse": target,
+                }
+            ],
+        }
@@ -0,0 +1,267 @@
+"""
+Warm pool of pre-provisioned demo sites
+
+Provisioner Settings lists how many ready sites to keep per (Package
+Tier, cloud region). A scheduled job tops the pool up. A new Demo
+Request claims a pooled site in the same transaction that inserts it,
+so the provisioning pipeline starts after `await_active`. The remaining
+work is a rename and personalisation, not a full site build.
+
+Pooled sites are Demo Site records in status "Pooled" with no Demo
+Request. Sites still being built for the pool are in "Creating", also
+without a Demo Request. A build that fails suspends its Frappe Cloud
+site before its record is dropped. A build whose job died is expired by
+the next refill once BUILD_TIMEOUT has passed.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+from frappe_kit.frappe_kit.api import app_installer
+from frappe_kit.frappe_kit.api.callbacks import SiteEventWatcher, wait_until_active
+from frappe_kit.frappe_kit.api.expiry import suspend_sites
+from frappe_kit.frappe_kit.api.provisioning import (
+    FrappeCloudAPI,
+    get_apps_for_tier,
+    get_cluster,
+)
+
+REFILL_JOB_ID = "frappe_kit:warm_pool_refill"
+REFILL_TIMEOUT = 3600
+SITE_READY_TIMEOUT = 180
+SUSPEND_CONCURRENCY = 10
+
+# a refill job is killed after REFILL_TIMEOUT, so a build older than
+# that is not being worked on
+BUILD_TIMEOUT = timedelta(seconds=REFILL_TIMEOUT * 1.5)
+
+
+def schedule_refill():
+    """Scheduled: top up the warm pool in a background job"""
+    settings = frappe.get_single("Provisioner Settings")
+    if not settings.enable_warm_pool:
+        return
+
+    frappe.enqueue(
+        "frappe_kit.frappe_kit.api.warm_pool.refill_warm_pool",
+        queue="long",
+        timeout=REFILL_TIMEOUT,
+        job_id=REFILL_JOB_ID,
+        deduplicate=True,
+        enqueue_after_commit=True,
+    )
+
+
+def get_pool_deficits(settings):
+    """[(package_tier, cluster, missing)] for every under-filled pool"""
+    counts = frappe.get_all(
+        "Demo Site",
+        filters={
+            "status": ["in", ["Pooled", "Creating"]],
+            "demo_request": ["is", "not set"],
+        },
+        fields=["package_tier", "cluster", "count(name) as count"],
+        group_by="package_tier, cluster",
+    )
+    available = {(row.package_tier, row.cluster): row.count for row in counts}
+
+    deficits = []
+    for target in settings.warm_pool_targets or []:
+        missing = (target.pool_size or 0) - available.get(
+            (target.package_tier, target.cluster), 0
+        )
+        if missing > 0:
+            deficits.append((target.package_tier, target.cluster, missing))
+
+    return deficits
+
+
+def refill_warm_pool():
+    """Background job: build the sites the pool is short of, concurrently"""
+    settings = frappe.get_single("Provisioner Settings")
+    if not settings.enable_warm_pool:
+        return
+
+    expire_stuck_builds()
+    deficits = get_pool_deficits(settings)
+    if deficits:
+        asyncio.run(_refill(settings, deficits))
+
+
+def expire_stuck_builds():
+    """Drop pool builds whose job died, suspending what they left on Frappe Cloud"""
+    stuck = frappe.get_all(
+        "Demo Site",
+        filters={
+            "status": "Creating",
+            "demo_request": ["is", "not set"],
+            "creation": ["<", now_datetime() - BUILD_TIMEOUT],
+        },
+        fields=["name", "frappe_cloud_site_id"],
+    )
+    if not stuck:
+        return
+
+    with ThreadPoolExecutor(max_workers=SUSPEND_CONCURRENCY) as pool:
+        suspended = suspend_sites(FrappeCloudAPI(), pool, stuck)
+
+    for site in suspended:
+        frappe.delete_doc("Demo Site", site.name, ignore_permissions=True, force=True)
+    frappe.db.commit()
+
+
+async def _refill(settings, deficits):
+    from frappe_kit.frappe_kit.api.engine import AsyncCloudClient
+
+    builds = [
+        (tier, cluster) for tier, cluster, missing in deficits for _ in range(missing)
+    ]
+    cloud = AsyncCloudClient(FrappeCloudAPI(), len(builds))
+    watcher = SiteEventWatcher()
+    watcher.start()
+
+    try:
+        await asyncio.gather(
+            *(
+                build_pool_site(cloud, watcher, settings, tier, cluster)
+                for tier, cluster in builds
+            )
+        )
+    finally:
+        watcher.stop()
+        cloud.close()
+
+
+async def build_pool_site(cloud, watcher, settings, package_tier, cluster):
+    tier = frappe.get_doc("Package Tier", package_tier)
+    apps = get_apps_for_tier(tier)
+    subdomain = f"pool-{frappe.generate_hash(length=10)}"
+
+    site_doc = frappe.get_doc(
+        {
+            "doctype": "Demo Site",
+            "subdomain": subdomain,
+            "status": "Creating",
+            "package_tier": package_tier,
+            "cluster": cluster,
+            "frappe_cloud_plan": tier.frappe_cloud_plan,
+            "apps_installed": ", ".join(apps),
+        }
+    ).insert(ignore_permissions=True)
+    frappe.db.commit()
+    site_name = None
+
+    try:
+        site_result = await cloud.create_site(
+            subdomain=subdomain,
+            apps=apps[:2],
+            plan=tier.frappe_cloud_plan or "Starter",
+            cluster=cluster,
+        )
+        site_name = (site_result or {}).get("name") or (
+            f"{subdomain}.{settings.demo_domain}"
+        )
+        site_doc.db_set(
+            {"frappe_cloud_site_id": site_name, "full_url": f"https://{site_name}"}
+        )
+        frappe.db.commit()
+
+        await wait_until_active(cloud, watcher, site_name, SITE_READY_TIMEOUT)
+        await app_installer.install_apps(
+            cloud, site_name, apps, app_installer.get_app_dependencies(tier)
+        )
+
+        site_doc.db_set("status", "Pooled")
+        frappe.db.commit()
+
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(
+            title=f"Warm Pool Site Failed: {subdomain}",
+            message=frappe.get_traceback(),
+        )
+        if not site_name:
+            # the create call can fail after Frappe Cloud has taken it
+            site_name = await find_remote_site(
+                cloud, f"{subdomain}.{settings.demo_domain}"
+            )
+        await discard_pool_site(cloud, site_doc, site_name)
+
+
+async def find_remote_site(cloud, site_name):
+    try:
+        return site_name if await cloud.get_site_status(site_name) else None
+    except Exception:
+        return None
+
+
+async def discard_pool_site(cloud, site_doc, site_name):
+    """Suspend a failed build's site on Frappe Cloud, then drop its Demo Site"""
+    if site_name:
+        try:
+            await cloud.suspend_site(site_name)
+        except Exception:
+            # kept in "Creating" so that expire_stuck_builds tries again
+            site_doc.db_set("frappe_cloud_site_id", site_name)
+            frappe.db.commit()
+            return
+
+    frappe.delete_doc("Demo Site", site_doc.name, ignore_permissions=True, force=True)
+    frappe.db.commit()
+
+
+def claim_pooled_site(demo_request):
+    """
+    Hand a pooled site to a new Demo Request, if one is ready
+
+    The row is locked with SKIP LOCKED, so concurrent submissions each get
+    a different site (or none) and never wait on each other. The claim is
+    part of the caller's transaction. Returns the Demo Site name or None.
+    """
+    settings = frappe.get_single("Provisioner Settings")
+    if not settings.enable_warm_pool:
+        return None
+
+    cluster = get_cluster(demo_request.region, settings)
+    pooled = frappe.db.sql(
+        """
+        select name, frappe_cloud_site_id
+        from `tabDemo Site`
+        where status = 'Pooled'
+            and package_tier = %s
+            and cluster = %s
+            and ifnull(demo_request, '') = ''
+        order by creation
+        limit 1
+        for update skip locked
+        """,
+        (demo_request.package_tier, cluster),
+        as_dict=True,
+    )
+
+    if not pooled:
+        return None
+
+    site = pooled[0]
+    frappe.db.set_value(
+        "Demo Site",
+        site.name,
+        {"status": "Creating", "demo_request": demo_request.name},
+    )
+    demo_request.db_set(
+        {
+            "demo_site": site.name,
+            "cloud_site_name": site.frappe_cloud_site_id,
+            # the site exists and is active; install_apps only tops up
+            # apps added to the tier since the site was pooled
+            "provisioning_step": "await_active",
+        }
+    )
+    demo_request.append_log(f"Using a ready site from the warm pool ({site.name})")
+
+    schedule_refill()
+    return site.name
@@ -0,0 +1,123 @@
+"""
+Disposable email detection
+
+The blocklist is a plain text file, one domain per line, loaded once per
+process into a frozenset. A lookup hashes the address's domain and each
+parent domain, so it costs the same for a list of ten domains or of
+several hundred thousand, and subdomains of a blocked domain are blocked
+too. The file is checked for changes at most every RELOAD_INTERVAL
+seconds and reloaded when its mtime moves, so a bigger list can be
+dropped in without a restart.
+
+`disposable_domains_file` in site config points at a different list.
+
+MX lookups are optional (Provisioner Settings > Check Email MX), need
+dnspython, and are cached in Redis for MX_CACHE_TTL.
+"""
+
+import os
+import threading
+import time
+
+import frappe
+
+BLOCKLIST_FILE = os.path.join(os.path.dirname(__file__), "disposable_domains.txt")
+RELOAD_INTERVAL = 30
+
+MX_CACHE_KEY = "frappe_kit:email_mx:{domain}"
+MX_CACHE_TTL = 24 * 60 * 60
+MX_TIMEOUT = 3
+
+
+class DomainBlocklist:
+    def __init__(self, path):
+        self.path = path
+        self.domains = frozenset()
+        self.mtime = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if now - self.checked_at < RELOAD_INTERVAL:
+            return
+
+        with self.lock:
+            if now - self.checked_at < RELOAD_INTERVAL:
+                return
+            self.checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                return
+            if mtime != self.mtime:
+                self.domains = load_domains(self.path)
+                self.mtime = mtime
+
+    def __contains__(self, domain):
+        self.reload_if_changed()
+
+        labels = domain.lower().rstrip(".").split(".")
+        # "a.b.example.com" matches example.com, b.example.com and itself
+        return any(
+            ".".join(labels[index:]) in self.domains
+            for index in range(len(labels) - 1)
+        )
+
+    def __len__(self):
+        self.reload_if_changed()
+        return len(self.domains)
+
+
+def load_domains(path):
+    with open(path, encoding="utf-8") as f:
+        return frozenset(
+            line.strip().lower()
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        )
+
+
+_blocklists = {}
+
+
+def get_blocklist():
+    path = frappe.conf.get("disposable_domains_file") or BLOCKLIST_FILE
+    if path not in _blocklists:
+        _blocklists[path] = DomainBlocklist(path)
+    return _blocklists[path]
+
+
+def is_disposable(domain):
+    return domain in get_blocklist()
+
+
+def has_mx_record(domain):
+    """
+    Whether `domain` can receive mail; True when it cannot be determined
+
+    Answers, including "no", are cached. Timeouts and missing dnspython
+    are not, so they never reject an address.
+    """
+    cache = frappe.cache()
+    key = MX_CACHE_KEY.format(domain=domain.lower())
+    cached = cache.get_value(key)
+    if cached is not None:
+        return cached
+
+    try:
+        import dns.exception
+        import dns.resolver
+    except ImportError:
+        return True
+
+    try:
+        dns.resolver.resolve(domain, "MX", lifetime=MX_TIMEOUT)
+        found = True
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        found = False
+    except dns.exception.DNSException:
+        return True
+
+    cache.set_value(key, found, expires_in_sec=MX_CACHE_TTL)
+    return found
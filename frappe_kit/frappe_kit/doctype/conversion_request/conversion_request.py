@@ -2,8 +2,13 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import now_datetime
 
+from frappe_kit.frappe_kit.api.backups import BACKUP_TIMEOUT
+from frappe_kit.frappe_kit.transitions import TransitionMixin
+
+
+class ConversionRequest(TransitionMixin, Document):
+    log_fieldname = "conversion_log"
 
-class ConversionRequest(Document):
     def validate(self):
         if self.demo_site:
             site = frappe.get_doc("Demo Site", self.demo_site)
@@ -53,43 +58,41 @@ class ConversionRequest(Document):
         frappe.enqueue(
             "frappe_kit.frappe_kit.api.conversion.process_conversion",
             queue="long",
-            timeout=600,
+            # waits for a full backup of the demo site
+            timeout=BACKUP_TIMEOUT + 600,
             conversion_request=self.name,
         )
 
         return {"status": "started", "message": "Conversion process initiated"}
 
-    def append_log(self, message):
-        timestamp = now_datetime().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
-        self.conversion_log = (self.conversion_log or "") + log_entry
-        self.save(ignore_permissions=True)
-
     def mark_completed(self, production_url=None):
-        self.status = "Completed"
-        self.conversion_completed = now_datetime()
-
+        values = {"status": "Completed", "conversion_completed": now_datetime()}
         if production_url:
-            self.production_site_url = production_url
+            values["production_site_url"] = production_url
 
-        self.append_log(f"Conversion completed: {production_url or 'Self-hosted backup ready'}")
-        self.save(ignore_permissions=True)
+        self.transition(
+            log=f"Conversion completed: {production_url or 'Self-hosted backup ready'}",
+            **values,
+        )
 
-        site = frappe.get_doc("Demo Site", self.demo_site)
-        site.status = "Converted"
-        site.converted_to_paid = 1
-        site.conversion_request = self.name
+        site_values = {
+            "status": "Converted",
+            "converted_to_paid": 1,
+            "conversion_request": self.name,
+        }
         if production_url:
-            site.production_site_url = production_url
-        site.save(ignore_permissions=True)
+            site_values["production_site_url"] = production_url
+        frappe.db.set_value("Demo Site", self.demo_site, site_values)
 
         self.send_conversion_email()
+        self.flush_log()
 
     def mark_failed(self, error_message):
-        self.status = "Failed"
-        self.error_message = error_message
-        self.append_log(f"Conversion failed: {error_message}")
-        self.save(ignore_permissions=True)
+        self.transition(
+            log=f"Conversion failed: {error_message}",
+            status="Failed",
+            error_message=error_message,
+        )
 
     def send_conversion_email(self):
         settings = frappe.get_single("Provisioner Settings")
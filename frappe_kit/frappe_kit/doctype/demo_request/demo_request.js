@@ -2,10 +2,13 @@ frappe.ui.form.on("Demo Request", {
   refresh: function (frm) {
     if (frm.doc.status === "Pending" || frm.doc.status === "Failed") {
       frm.add_custom_button(__("Start Provisioning"), function () {
-        frm.call("start_provisioning").then(() => {
+        frm.call("start_provisioning").then((r) => {
+          const queued = r.message && r.message.status === "queued";
           frappe.show_alert({
-            message: __("Provisioning started"),
-            indicator: "green",
+            message: queued
+              ? __("Waiting for a free provisioning slot")
+              : __("Provisioning started"),
+            indicator: queued ? "orange" : "green",
           });
           frm.reload_doc();
         });
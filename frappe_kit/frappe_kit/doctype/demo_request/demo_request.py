@@ -1,10 +1,23 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import now_datetime, add_days
+from frappe.utils import now_datetime, add_days, getdate
 import re
 
+from frappe.utils.password import set_encrypted_password
+
+from frappe_kit.frappe_kit.transitions import TransitionMixin
+
+PROGRESS_EVENT = "demo_progress"
+
+
+def get_progress_task_id(demo_request):
+    """Realtime task room the /demo page joins to follow a request"""
+    return f"frappe_kit:demo_request:{demo_request}"
+
+
+class DemoRequest(TransitionMixin, Document):
+    log_fieldname = "provisioning_log"
 
-class DemoRequest(Document):
     def validate(self):
         self.validate_email()
         self.generate_subdomain()
@@ -19,15 +32,20 @@ class DemoRequest(Document):
         if not re.match(email_pattern, self.contact_email):
             frappe.throw("Invalid email format")
 
-        disposable_domains = [
-            "tempmail.com",
-            "throwaway.email",
-            "guerrillamail.com",
-        ]
+        # a changed blocklist must not lock staff out of older requests
+        if not self.is_new() and not self.has_value_changed("contact_email"):
+            return
+
+        from frappe_kit.frappe_kit import disposable_domains
+
         domain = self.contact_email.split("@")[1].lower()
-        if domain in disposable_domains:
+        if disposable_domains.is_disposable(domain):
             frappe.throw("Please use a business email address")
 
+        settings = frappe.get_single("Provisioner Settings")
+        if settings.check_email_mx and not disposable_domains.has_mx_record(domain):
+            frappe.throw("This email domain cannot receive email")
+
     def generate_subdomain(self):
         """Generate subdomain from company name if not provided"""
         if not self.subdomain and self.company_name:
@@ -40,31 +58,23 @@ class DemoRequest(Document):
             if settings.subdomain_prefix:
                 subdomain = f"{settings.subdomain_prefix}{subdomain}"
 
-            original = subdomain
-            counter = 1
-            while frappe.db.exists("Demo Site", {"subdomain": subdomain}):
-                subdomain = f"{original}-{counter}"
-                counter += 1
+            from frappe_kit.frappe_kit.api.subdomains import allocate_subdomain
 
-            self.subdomain = subdomain
+            self.subdomain = allocate_subdomain(subdomain)
 
     def set_recommended_tier(self):
         """Auto-recommend tier based on employee count"""
-        if self.employee_count:
-            emp_count = int(self.employee_count)
-            tiers = frappe.get_all(
-                "Package Tier",
-                filters={"employee_range_min": ["<=", emp_count]},
-                fields=["name", "employee_range_min", "employee_range_max"],
-                order_by="employee_range_min desc",
-            )
+        if not self.employee_count:
+            return
+
+        if self.recommended_tier and not self.has_value_changed("employee_count"):
+            return
 
-            for tier in tiers:
-                if int(tier.employee_range_min) <= emp_count <= (
-                    int(tier.employee_range_max) if tier.employee_range_max else 999999
-                ):
-                    self.recommended_tier = tier.name
-                    break
+        from frappe_kit.frappe_kit.api.catalog import get_tier_index
+
+        tier = get_tier_index().recommend(int(self.employee_count))
+        if tier:
+            self.recommended_tier = tier
 
     @frappe.whitelist()
     def start_provisioning(self):
@@ -72,51 +82,115 @@ class DemoRequest(Document):
         if self.status not in ["Pending", "Failed"]:
             frappe.throw(f"Cannot provision demo with status: {self.status}")
 
+        from frappe_kit.frappe_kit.api import admission
+
+        if not admission.acquire_slot(self.name):
+            position = admission.get_queue_position(self.name)
+            if not position:
+                self.status = "Pending"
+                self.append_log("Waiting for a free provisioning slot")
+                self.save()
+                admission.join_waiting_queue(self.name)
+
+            return {
+                "status": "queued",
+                "message": "Waiting for a free provisioning slot",
+                "queue_position": position,
+            }
+
+        return self.begin_provisioning()
+
+    def begin_provisioning(self):
+        """Hand a request holding a provisioning slot to the engine"""
         self.status = "Provisioning"
         self.provisioning_started = now_datetime()
         self.save()
 
-        frappe.enqueue(
-            "frappe_kit.frappe_kit.api.provisioning.provision_demo_site",
-            queue="long",
-            timeout=600,
-            demo_request=self.name,
-        )
+        from frappe_kit.frappe_kit.api.engine import enqueue_provisioning
+
+        enqueue_provisioning(self.name)
 
         return {"status": "started", "message": "Provisioning initiated"}
 
     def append_log(self, message):
-        """Append message to provisioning log"""
-        timestamp = now_datetime().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
+        """Append message to provisioning log and push it to watchers"""
+        entry = super().append_log(message)
+        if not self.is_new():
+            self.publish_progress(line=entry)
+        return entry
+
+    def publish_progress(self, after_commit=False, **data):
+        """
+        Publish a progress event for this request
+
+        `cursor` is the length of the log including the event, so the page
+        can tell whether it missed lines and fetch them with
+        `get_provisioning_log`.
+        """
+        frappe.publish_realtime(
+            PROGRESS_EVENT,
+            dict(
+                demo_request=self.name,
+                cursor=len(self.provisioning_log or ""),
+                **data,
+            ),
+            task_id=get_progress_task_id(self.name),
+            after_commit=after_commit,
+        )
 
-        self.provisioning_log = (self.provisioning_log or "") + log_entry
-        self.save(ignore_permissions=True)
+    def transition(self, log=None, **values):
+        entry = super().transition(log, **values)
+        if entry:
+            self.publish_progress(line=entry)
+        return entry
 
-    def mark_completed(self, site_url, username, password):
+    def mark_completed(self, site_url, username, password=None):
         """Mark provisioning as completed"""
-        self.status = "Active"
-        self.provisioning_completed = now_datetime()
-        self.site_url = site_url
-        self.demo_username = username
-        self.demo_password = password
-
         settings = frappe.get_single("Provisioner Settings")
-        tier = frappe.get_doc("Package Tier", self.package_tier)
-        trial_days = tier.trial_days or settings.default_trial_days or 14
-        self.trial_expires = add_days(now_datetime(), trial_days)
+        trial_days = (
+            frappe.db.get_value("Package Tier", self.package_tier, "trial_days")
+            or settings.default_trial_days
+            or 14
+        )
 
-        self.append_log(f"Demo site ready: {site_url}")
-        self.save(ignore_permissions=True)
+        expires_at = add_days(now_datetime(), trial_days)
+        values = {
+            "status": "Active",
+            "provisioning_completed": now_datetime(),
+            "site_url": site_url,
+            "demo_username": username,
+            "trial_expires": getdate(expires_at),
+        }
+        if password:
+            set_encrypted_password(self.doctype, self.name, password, "demo_password")
+            values["demo_password"] = "*" * len(password)
+
+        self.transition(log=f"Demo site ready: {site_url}", **values)
+        if self.demo_site:
+            frappe.db.set_value("Demo Site", self.demo_site, "expires_at", expires_at)
+
+        from frappe_kit.frappe_kit.api.lifecycle import schedule_trial_events
+
+        schedule_trial_events(
+            self.name, expires_at, settings.expiry_warning_days or 3
+        )
 
         self.send_welcome_email()
+        self.flush_log()
+        self.publish_progress(
+            status=self.status, site_url=self.site_url, after_commit=True
+        )
 
     def mark_failed(self, error_message):
         """Mark provisioning as failed"""
-        self.status = "Failed"
-        self.error_message = error_message
-        self.append_log(f"Provisioning failed: {error_message}")
-        self.save(ignore_permissions=True)
+        self.transition(
+            log=f"Provisioning failed: {error_message}",
+            status="Failed",
+            error_message=error_message,
+        )
+        self.publish_progress(
+            status=self.status, error=self.error_message, after_commit=True
+        )
 
     def send_welcome_email(self):
         """Send welcome email with credentials"""
@@ -135,16 +209,16 @@ class DemoRequest(Document):
                     "company_name": self.company_name,
                     "site_url": self.site_url,
                     "username": self.demo_username,
-                    "password": self.demo_password,
+                    "password": self.get_password(
+                        "demo_password", raise_exception=False
+                    ),
                     "trial_expires": self.trial_expires,
                     "package_tier": self.package_tier,
                 },
                 now=True,
             )
 
-            self.credentials_sent = 1
-            self.save(ignore_permissions=True)
-            self.append_log("Welcome email sent")
+            self.transition(log="Welcome email sent", credentials_sent=1)
 
         except Exception as e:
             self.append_log(f"Failed to send email: {str(e)}")
@@ -32,3 +32,8 @@ class DemoSite(Document):
 
         frappe.msgprint(f"Conversion link sent to {demo_req.contact_email}")
         return {"status": "sent", "email": demo_req.contact_email}
+
+
+def on_doctype_update():
+    # expiry pages through Active sites in expires_at order
+    frappe.db.add_index("Demo Site", ["status", "expires_at"])
@@ -0,0 +1,93 @@
+import time
+
+import frappe
+from frappe.utils import now_datetime
+
+FLUSH_LINES = 20
+FLUSH_INTERVAL = 2
+
+
+class LogBuffer:
+    """
+    Buffered writer for a document's log field
+
+    Lines are kept in memory and appended to the column in batches with
+    a single `concat` update. Flushing does not load or save the document,
+    run validate, or add a version entry, and the cost of a flush does not
+    grow with the size of the log.
+    """
+
+    def __init__(self, doc, fieldname):
+        self.doc = doc
+        self.fieldname = fieldname
+        self.pending = []
+        self.last_flush = time.monotonic()
+
+    def append(self, message, defer=False):
+        """Buffer a line; `defer` leaves writing it to a later drain/flush"""
+        timestamp = now_datetime().strftime("%Y-%m-%d %H:%M:%S")
+        entry = f"[{timestamp}] {message}\n"
+
+        # keep the in-memory copy current for anything reading the doc
+        self.doc.set(self.fieldname, (self.doc.get(self.fieldname) or "") + entry)
+
+        if self.doc.is_new():
+            return entry
+
+        self.pending.append(entry)
+        if not defer and (
+            len(self.pending) >= FLUSH_LINES
+            or time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+        ):
+            self.flush()
+
+        return entry
+
+    def drain(self):
+        """Pending text, handed to a caller that writes it in its own update"""
+        text = "".join(self.pending)
+        self.pending = []
+        self.last_flush = time.monotonic()
+        return text
+
+    def flush(self):
+        text = self.drain()
+        if not text:
+            return
+
+        frappe.db.sql(
+            f"""
+            update `tab{self.doc.doctype}`
+            set `{self.fieldname}` = concat(coalesce(`{self.fieldname}`, ''), %s)
+            where name = %s
+            """,
+            (text, self.doc.name),
+        )
+
+    def discard(self):
+        """Drop pending lines that a full save of the document has written"""
+        self.pending = []
+
+
+class LogBufferMixin:
+    """Adds `append_log` / `flush_log` backed by a LogBuffer on `log_fieldname`"""
+
+    log_fieldname = None
+
+    def get_log_buffer(self):
+        buffer = getattr(self, "_log_buffer", None)
+        if not buffer:
+            buffer = self._log_buffer = LogBuffer(self, self.log_fieldname)
+        return buffer
+
+    def append_log(self, message):
+        """Append a timestamped line to the log and return it"""
+        return self.get_log_buffer().append(message)
+
+    def flush_log(self):
+        """Write buffered log lines to the database now"""
+        self.get_log_buffer().flush()
+
+    def before_save(self):
+        # save() writes the whole in-memory log, pending lines included
+        self.get_log_buffer().discard()
@@ -1,41 +1,32 @@
 import frappe
-from frappe.utils import now_datetime, add_days, getdate
+from frappe.utils import add_days, getdate
 
 
 def expire_old_demos():
-    """Mark expired demo sites"""
-    expired = frappe.get_all(
-        "Demo Site",
-        filters={
-            "status": "Active",
-            "expires_at": ["<", now_datetime()],
-        },
-        pluck="name",
-    )
+    """Suspend expired demo sites, in pages, from a background job"""
+    from frappe_kit.frappe_kit.api.expiry import schedule_expiry
 
-    for site_name in expired:
-        doc = frappe.get_doc("Demo Site", site_name)
-        doc.status = "Suspended"
-        doc.save(ignore_permissions=True)
-
-    frappe.db.commit()
-
-    if expired:
-        frappe.logger().info(f"Expired {len(expired)} demo sites")
+    schedule_expiry()
 
 
 def send_expiry_warnings():
     """Send warning emails for demos expiring soon"""
+    from frappe_kit.frappe_kit.api.lifecycle import send_warning_emails
+
     settings = frappe.get_single("Provisioner Settings")
-    warn_days = settings.expiry_warning_days or 3
+    if not settings.expiry_warning_template:
+        return
 
+    warn_days = settings.expiry_warning_days or 3
     warn_date = add_days(getdate(), warn_days)
 
+    # warning_sent_on marks demos already warned, so one query finds the rest
     expiring = frappe.get_all(
         "Demo Request",
         filters={
             "status": "Active",
             "trial_expires": ["between", [getdate(), warn_date]],
+            "warning_sent_on": ["is", "not set"],
         },
         fields=[
             "name",
@@ -46,40 +37,11 @@ def send_expiry_warnings():
             "site_url",
         ],
     )
-
-    for demo in expiring:
-        if frappe.db.exists(
-            "Communication",
-            {
-                "reference_doctype": "Demo Request",
-                "reference_name": demo.name,
-                "subject": ["like", "%expiring%"],
-            },
-        ):
-            continue
-
-        if settings.expiry_warning_template:
-            frappe.sendmail(
-                recipients=[demo.contact_email],
-                template=settings.expiry_warning_template,
-                args=demo,
-                now=True,
-            )
+    send_warning_emails(expiring, settings.expiry_warning_template)
 
 
 def cleanup_failed_requests():
-    """Clean up stuck provisioning requests"""
-    stuck = frappe.get_all(
-        "Demo Request",
-        filters={
-            "status": "Provisioning",
-            "provisioning_started": ["<", add_days(now_datetime(), -1)],
-        },
-        pluck="name",
-    )
-
-    for req_name in stuck:
-        doc = frappe.get_doc("Demo Request", req_name)
-        doc.mark_failed("Provisioning timed out after 24 hours")
+    """Resume or fail stuck provisioning requests, from a background job"""
+    from frappe_kit.frappe_kit.api.reconciler import schedule_reconcile
 
-    frappe.db.commit()
+    schedule_reconcile()
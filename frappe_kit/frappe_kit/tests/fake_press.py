@@ -0,0 +1,255 @@
+"""A local stand-in for the Frappe Cloud (Press) API, used by the tests"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import frappe
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.press.on_connect()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self._dispatch({key: values[0] for key, values in query.items()})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self._dispatch(json.loads(body) if body else {})
+
+    def _dispatch(self, params):
+        method = urlparse(self.path).path.rsplit("/", 1)[-1]
+        status, headers, body = self.server.press.handle(method, params)
+        payload = json.dumps(body).encode()
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # the default backlog of 5 resets connections when many clients open at once
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakePressServer:
+    """
+    Serves the subset of `press.api.site.*` used by FrappeCloudAPI.
+
+    `handshake_delay` is paid once per new TCP connection to model the
+    TCP+TLS setup cost of talking to frappecloud.com. `ready_after` is how
+    long a new site stays in "Pending" before turning "Active". It is
+    either seconds or a callable taking the subdomain. `on_ready`, if
+    set, is called with the site name as soon as a site turns active,
+    standing in for Frappe Cloud's status callback. `install_after` is how
+    long an app install job runs before the app shows up on the site, and
+    `backup_after` how long a backup takes to be listed; `on_backup` is
+    called with the site and backup name when it is.
+    """
+
+    def __init__(
+        self,
+        handshake_delay=0,
+        ready_after=0,
+        on_ready=None,
+        install_after=0,
+        backup_after=0,
+        on_backup=None,
+    ):
+        self.handshake_delay = handshake_delay
+        self.ready_after = ready_after
+        self.on_ready = on_ready
+        self.install_after = install_after
+        self.backup_after = backup_after
+        self.on_backup = on_backup
+        self.install_log = []
+        self.sites = {}
+        self.calls = []
+        self.connections = 0
+        self.scripted = {}
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.press = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def on_connect(self):
+        with self.lock:
+            self.connections += 1
+        if self.handshake_delay:
+            time.sleep(self.handshake_delay)
+
+    def script(self, method, *responses):
+        """Queue canned `(status, headers)` replies for the next calls to `method`"""
+        with self.lock:
+            self.scripted.setdefault(method, []).extend(responses)
+
+    def count(self, method):
+        return sum(1 for call in self.calls if call == method)
+
+    def handle(self, method, params):
+        with self.lock:
+            self.calls.append(method)
+            canned = self.scripted.get(method)
+            if canned:
+                status, headers = canned.pop(0)
+                return status, headers, {"exc": f"scripted {status}"}
+
+        handler = getattr(self, method.replace(".", "_"), None)
+        if not handler:
+            return 404, {}, {"exc": f"Unknown method {method}"}
+
+        with self.lock:
+            try:
+                return 200, {}, {"message": handler(params)}
+            except KeyError as e:
+                return 404, {}, {"exc": f"Not found: {e}"}
+
+    def press_api_site_new(self, params):
+        site = params["site"]
+        name = f"{site['subdomain']}.frappe.cloud"
+        ready_after = self.ready_after
+        if callable(ready_after):
+            ready_after = ready_after(site["subdomain"])
+
+        self.sites[name] = {
+            "name": name,
+            "active": False,
+            "apps": list(site.get("apps") or []),
+            "plan": site.get("plan"),
+            "team": site.get("team"),
+            "backups": [],
+            "restored_from": site.get("files"),
+        }
+        timer = threading.Timer(ready_after, self._activate, args=(name,))
+        timer.daemon = True
+        timer.start()
+        return {"name": name}
+
+    def _activate(self, name):
+        with self.lock:
+            self.sites[name]["active"] = True
+        if self.on_ready:
+            self.on_ready(name)
+
+    def press_api_site_get(self, params):
+        site = self.sites[params["name"]]
+        return {
+            "name": site["name"],
+            "status": "Active" if site["active"] else "Pending",
+            "team": site.get("team"),
+        }
+
+    def press_api_site_install_app(self, params):
+        self.install_log.append(("start", params["app"], time.monotonic()))
+        timer = threading.Timer(
+            self.install_after,
+            self._finish_install,
+            args=(params["name"], params["app"]),
+        )
+        timer.daemon = True
+        timer.start()
+        return f"install-{params['app']}"
+
+    def _finish_install(self, name, app):
+        with self.lock:
+            self.sites[name]["apps"].append(app)
+            self.install_log.append(("done", app, time.monotonic()))
+
+    def press_api_site_installed_apps(self, params):
+        return [{"app": app} for app in self.sites[params["name"]]["apps"]]
+
+    def press_api_site_change_plan(self, params):
+        self.sites[params["name"]]["plan"] = params["plan"]
+        return None
+
+    def press_api_site_deactivate(self, params):
+        self.sites[params["name"]]["active"] = False
+        return None
+
+    def press_api_site_backup(self, params):
+        site = self.sites[params["name"]]
+        number = site.get("backups_started", 0) + 1
+        backup = {
+            "name": f"backup-{number}",
+            "url": f"{self.url}/backups/{site['name']}-{number}.sql.gz",
+            "remote_database_file": f"{site['name']}-database-{number}",
+            "remote_public_file": f"{site['name']}-public-{number}",
+        }
+        site["backups_started"] = number
+        timer = threading.Timer(
+            self.backup_after, self._finish_backup, args=(site["name"], backup)
+        )
+        timer.daemon = True
+        timer.start()
+        return backup["name"]
+
+    def _finish_backup(self, name, backup):
+        with self.lock:
+            self.sites[name]["backups"].insert(0, backup)
+        if self.on_backup:
+            self.on_backup(name, backup["name"])
+
+    def press_api_site_backups(self, params):
+        return self.sites[params["name"]]["backups"]
+
+    def press_api_site_restore(self, params):
+        self.sites[params["name"]]["restored_from"] = params["files"]
+        return None
+
+    def press_api_site_login(self, params):
+        return {"sid": f"sid-{params['name']}"}
+
+
+def make_cloud_api(press, pool_size=10, max_retries=3):
+    """A FrappeCloudAPI pointed at a FakePressServer"""
+    from frappe_kit.frappe_kit.api.provisioning import FrappeCloudAPI
+
+    settings = frappe._dict(
+        frappe_cloud_api_key="key",
+        frappe_cloud_team="team",
+        frappe_cloud_url=press.url,
+        http_pool_size=pool_size,
+        http_max_retries=max_retries,
+    )
+    settings.get_password = lambda fieldname, raise_exception=True: "secret"
+
+    with patch.object(frappe, "get_single", return_value=settings):
+        return FrappeCloudAPI()
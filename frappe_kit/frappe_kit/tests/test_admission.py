@@ -0,0 +1,197 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import admission
+
+
+class _Redis:
+    """
+    The commands admission control uses
+
+    The Lua scripts run as their Python equivalents under one lock, which
+    is the atomicity Redis gives a script.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.RLock()
+        self.scripts = {
+            admission.ACQUIRE_SCRIPT: self._acquire,
+            admission.ADMIT_NEXT_SCRIPT: self._admit_next,
+        }
+
+    def make_key(self, key):
+        return f"site|{key}"
+
+    def register_script(self, script):
+        def run(keys, args):
+            with self.lock:
+                return self.scripts[script](keys, args)
+
+        return run
+
+    def _slots(self, key, now):
+        slots = self.data.setdefault(key, {})
+        for name, lease_end in list(slots.items()):
+            if lease_end <= now:
+                del slots[name]
+        return slots
+
+    def _acquire(self, keys, args):
+        now, lease_end, limit, name = args
+        slots = self._slots(keys[0], now)
+        if name not in slots and (self.data.get(keys[1]) or len(slots) >= limit):
+            return 0
+        slots[name] = lease_end
+        return 1
+
+    def _admit_next(self, keys, args):
+        now, lease_end, limit = args
+        slots = self._slots(keys[0], now)
+        waiting = self.data.get(keys[1])
+        if len(slots) >= limit or not waiting:
+            return None
+        name = waiting.pop(0)
+        slots[name] = lease_end
+        return name.encode()
+
+    def zadd(self, key, mapping):
+        with self.lock:
+            self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        with self.lock:
+            self.data.get(key, {}).pop(member, None)
+
+    def rpush(self, key, value):
+        # like RedisWrapper.rpush, which prefixes the key it is given
+        with self.lock:
+            self.data.setdefault(self.make_key(key), []).append(value)
+
+    def lpos(self, key, value):
+        waiting = self.data.get(key, [])
+        return waiting.index(value) if value in waiting else None
+
+    def exists(self, key):
+        # like RedisWrapper.exists, which prefixes the key it is given
+        return self.make_key(key) in self.data
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if not (nx and key in self.data):
+                self.data[key] = int(value)
+
+    def incr(self, key):
+        with self.lock:
+            self.data[key] += 1
+            return self.data[key]
+
+    def decr(self, key):
+        with self.lock:
+            self.data[key] -= 1
+            return self.data[key]
+
+
+class TestAdmission(unittest.TestCase):
+    def setUp(self):
+        self.redis = _Redis()
+        self.settings = frappe._dict(max_concurrent_demos=3)
+        self.docs = {}
+        for patcher in (
+            patch.object(frappe, "cache", return_value=self.redis),
+            patch.object(frappe, "db"),
+            patch.object(frappe, "get_single", return_value=self.settings),
+            patch.object(frappe, "get_doc", create=True, side_effect=self.get_doc),
+            patch.object(frappe, "log_error", create=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        frappe.db.after_commit.add.side_effect = lambda callback: callback()
+
+    def get_doc(self, doctype, name):
+        if name not in self.docs:
+            raise frappe.DoesNotExistError(name)
+        return self.docs[name]
+
+    def slots(self):
+        return set(self.redis.data.get(self.redis.make_key(admission.INFLIGHT_KEY), {}))
+
+    def wait(self, name):
+        self.docs[name] = MagicMock(status="Pending")
+        admission.join_waiting_queue(name)
+
+    def test_concurrent_requests_never_exceed_the_limit(self):
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            acquired = list(
+                pool.map(lambda i: admission.acquire_slot(f"DR-{i}"), range(50))
+            )
+
+        self.assertEqual(sum(acquired), 3)
+        self.assertEqual(len(self.slots()), 3)
+
+    def test_waiting_requests_are_admitted_in_order(self):
+        for name in ("DR-1", "DR-2", "DR-3"):
+            self.assertTrue(admission.acquire_slot(name))
+        for name in ("DR-4", "DR-5"):
+            self.assertFalse(admission.acquire_slot(name))
+            self.wait(name)
+
+        self.assertEqual(admission.get_queue_position("DR-5"), 2)
+
+        # a free slot does not let a newcomer jump the queue
+        admission.release_slot("DR-1")
+        self.assertFalse(admission.acquire_slot("DR-6"))
+
+        admission.finish_provisioning("DR-2")
+
+        self.docs["DR-4"].begin_provisioning.assert_called_once()
+        self.docs["DR-5"].begin_provisioning.assert_called_once()
+        self.assertEqual(self.slots(), {"DR-3", "DR-4", "DR-5"})
+        self.assertIsNone(admission.get_queue_position("DR-5"))
+
+    def test_requests_no_longer_pending_give_their_slot_back(self):
+        self.settings.max_concurrent_demos = 1
+        self.wait("DR-1")
+        self.wait("DR-2")
+        self.docs["DR-1"].status = "Cancelled"
+
+        admission.admit_waiting()
+
+        self.docs["DR-1"].begin_provisioning.assert_not_called()
+        self.docs["DR-2"].begin_provisioning.assert_called_once()
+        self.assertEqual(self.slots(), {"DR-2"})
+
+    def test_requests_that_cannot_start_give_their_slot_back(self):
+        self.settings.max_concurrent_demos = 1
+        for name in ("DR-1", "DR-2", "DR-3"):
+            self.wait(name)
+        # DR-1 was deleted while it waited, DR-2 cannot be enqueued
+        del self.docs["DR-1"]
+        self.docs["DR-2"].begin_provisioning.side_effect = ConnectionError
+
+        admission.admit_waiting()
+
+        self.docs["DR-3"].begin_provisioning.assert_called_once()
+        self.assertEqual(self.slots(), {"DR-3"})
+        self.assertEqual(frappe.log_error.call_count, 2)
+        self.assertEqual(frappe.db.rollback.call_count, 2)
+
+    def test_expired_leases_free_their_slots(self):
+        for name in ("DR-1", "DR-2", "DR-3"):
+            admission.acquire_slot(name)
+
+        with patch.object(admission.time, "time", return_value=10**12):
+            self.assertTrue(admission.acquire_slot("DR-4"))
+
+    def test_daily_quota_is_counted_without_a_query_per_submission(self):
+        frappe.db.count.return_value = 18
+
+        results = [admission.take_daily_quota(20) for _ in range(4)]
+
+        self.assertEqual(results, [True, True, False, False])
+        frappe.db.count.assert_called_once()
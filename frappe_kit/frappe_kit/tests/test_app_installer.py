@@ -0,0 +1,63 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from frappe_kit.frappe_kit.api import app_installer
+from frappe_kit.frappe_kit.api.app_installer import install_apps, install_levels
+from frappe_kit.frappe_kit.api.engine import AsyncCloudClient
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+APPS = ["frappe", "erpnext", "crm", "helpdesk", "hrms", "insights"]
+DEPENDENCIES = {"insights": ["crm"], "hrms": ["erpnext"]}
+INSTALL_TIME = 0.3
+
+
+class TestInstallLevels(unittest.TestCase):
+    def test_independent_apps_share_a_level(self):
+        self.assertEqual(
+            install_levels(APPS, DEPENDENCIES),
+            [["crm", "helpdesk", "hrms"], ["insights"]],
+        )
+
+    def test_already_installed_apps_are_skipped(self):
+        installed = {"frappe", "erpnext", "crm"}
+        levels = install_levels(APPS, DEPENDENCIES, installed)
+        self.assertEqual(levels, [["helpdesk", "hrms", "insights"]])
+
+    def test_cycle_raises(self):
+        with self.assertRaises(Exception):
+            install_levels(["a", "b"], {"a": ["b"], "b": ["a"]})
+
+
+class TestParallelInstall(unittest.TestCase):
+    def test_installs_levels_concurrently_in_dependency_order(self):
+        press = FakePressServer(install_after=INSTALL_TIME).start()
+        api = make_cloud_api(press)
+        site = api.create_site("parallel", APPS[:2])["name"]
+        logged = []
+
+        async def run():
+            cloud = AsyncCloudClient(api, 5)
+            try:
+                return await install_apps(
+                    cloud, site, APPS, DEPENDENCIES, log=logged.append
+                )
+            finally:
+                cloud.close()
+
+        started = time.monotonic()
+        with patch.object(app_installer, "POLL_MIN", 0.05), patch.object(
+            app_installer, "POLL_MAX", 0.05
+        ):
+            timings = asyncio.run(run())
+        elapsed = time.monotonic() - started
+        press.stop()
+
+        self.assertEqual(set(timings), {"crm", "helpdesk", "hrms", "insights"})
+        # two levels of installs, not four sequential ones
+        self.assertLess(elapsed, INSTALL_TIME * 3)
+
+        events = {(kind, app): at for kind, app, at in press.install_log}
+        self.assertGreaterEqual(events[("start", "insights")], events[("done", "crm")])
+        self.assertTrue(any(line.startswith("Installed crm in") for line in logged))
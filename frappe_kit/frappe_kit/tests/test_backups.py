@@ -0,0 +1,94 @@
+import json
+import queue
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import backups
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+SITE = "acme.frappe.cloud"
+
+
+class _PubSub:
+    """Site events as the callback endpoint would publish them"""
+
+    def __init__(self):
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        pass
+
+    def publish(self, site, backup):
+        event = {"site": site, "event": "backup", "data": {"backup": backup}}
+        self.messages.put({"type": "message", "data": json.dumps(event)})
+
+    def get_message(self, timeout):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class TestBackupTracking(unittest.TestCase):
+    def setUp(self):
+        self.pubsub = _PubSub()
+        cache = MagicMock()
+        cache.pubsub.return_value = self.pubsub
+        patcher = patch.object(frappe, "cache", return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def press(self, **kwargs):
+        press = FakePressServer(**kwargs).start()
+        self.addCleanup(press.stop)
+        press.sites[SITE] = {"name": SITE, "active": True, "apps": [], "backups": []}
+        return press, make_cloud_api(press)
+
+    def test_returns_the_requested_backup_as_soon_as_it_is_announced(self):
+        press, cloud_api = self.press(backup_after=0.3, on_backup=self.pubsub.publish)
+
+        started = time.monotonic()
+        backup = backups.take_backup(cloud_api, SITE)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(backup["name"], "backup-1")
+        # well inside the first poll interval
+        self.assertLess(elapsed, backups.BACKUP_POLL_MIN / 2)
+        self.assertEqual(press.count("press.api.site.backups"), 3)
+
+    def test_a_backup_finishing_first_is_not_mistaken_for_ours(self):
+        press, cloud_api = self.press(backup_after=0.2, on_backup=self.pubsub.publish)
+        # e.g. a scheduled backup, listed before the one we asked for
+        cloud_api.create_backup(SITE)
+        press.backup_after = 0.5
+
+        backup = backups.take_backup(cloud_api, SITE)
+
+        self.assertEqual(backup["name"], "backup-2")
+
+    def test_polls_back_off_without_callbacks(self):
+        _press, cloud_api = self.press(backup_after=1)
+
+        with (
+            patch.object(backups, "BACKUP_POLL_MIN", 0.05),
+            patch.object(backups, "BACKUP_POLL_MAX", 0.4),
+        ):
+            waits = []
+            backups.take_backup(cloud_api, SITE, on_wait=waits.append)
+
+        # a fixed 0.05s poll would have woken about 20 times
+        self.assertLess(len(waits), 10)
+
+    def test_failed_and_late_backups_raise(self):
+        with self.assertRaisesRegex(Exception, "backup-1 failed"):
+            backups.is_ready({"name": "backup-1", "status": "Failure"})
+
+        _press, cloud_api = self.press(backup_after=5)
+        with self.assertRaisesRegex(Exception, "did not finish in time"):
+            backups.take_backup(cloud_api, SITE, timeout=0.2)
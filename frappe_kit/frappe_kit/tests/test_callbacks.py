@@ -0,0 +1,179 @@
+import asyncio
+import frappe
+import json
+import queue
+import statistics
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from frappe_kit.frappe_kit.api import rate_limit
+from frappe_kit.frappe_kit.api.callbacks import (
+    CHANNEL,
+    SiteEventWatcher,
+    sign,
+    site_event,
+    verify_signature,
+    wait_until_active,
+)
+from frappe_kit.frappe_kit.api.engine import AsyncCloudClient
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+# seconds until each fake site turns active; with a fixed 1s poll (the old
+# 10s loop scaled down) each one is only noticed on the next whole second
+READY_AFTER = {"a": 0.15, "b": 0.3, "c": 0.45, "d": 1.15, "e": 1.3}
+FIXED_POLL_INTERVAL = 1
+
+
+def callback_settings(secret="s3cret"):
+    settings = frappe._dict()
+    settings.get_password = lambda fieldname, raise_exception=True: secret
+    return settings
+
+
+class TestCallbackSignature(unittest.TestCase):
+    def verify(self, body, timestamp, signature):
+        with patch.object(frappe, "get_single", return_value=callback_settings()):
+            return verify_signature(body, timestamp, signature)
+
+    def test_accepts_valid_signature(self):
+        body = b'{"site": "acme.frappe.cloud", "status": "Active"}'
+        timestamp = str(int(time.time()))
+        self.assertTrue(self.verify(body, timestamp, sign(body, timestamp, "s3cret")))
+
+    def test_rejects_tampered_body(self):
+        timestamp = str(int(time.time()))
+        signature = sign(b'{"status": "Pending"}', timestamp, "s3cret")
+        self.assertFalse(self.verify(b'{"status": "Active"}', timestamp, signature))
+
+    def test_rejects_replayed_timestamp(self):
+        body = b"{}"
+        timestamp = str(int(time.time()) - 3600)
+        self.assertFalse(self.verify(body, timestamp, sign(body, timestamp, "s3cret")))
+
+
+class _Redis:
+    """Publish/subscribe on one in-memory channel"""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def make_key(self, key):
+        return f"site|{key}"
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        subscriber = _PubSub()
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def publish(self, channel, message):
+        for subscriber in self.subscribers:
+            if channel in subscriber.channels:
+                subscriber.messages.put({"type": "message", "data": message})
+
+
+class _PubSub:
+    def __init__(self):
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+
+    def get_message(self, timeout):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class TestSiteEventEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.redis = _Redis()
+        self.request = MagicMock()
+        self.headers = {}
+        # the endpoint reads the request from module globals
+        self.request_lock = threading.Lock()
+        for patcher in (
+            patch.object(frappe, "cache", return_value=self.redis),
+            patch.object(frappe, "get_single", return_value=callback_settings()),
+            patch.object(frappe, "request", self.request, create=True),
+            patch.object(
+                frappe, "get_request_header", create=True, side_effect=self.headers.get
+            ),
+            patch.object(frappe, "parse_json", create=True, side_effect=json.loads),
+            patch.object(rate_limit, "check_rate_limit"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post_event(self, site, status="Active", secret="s3cret"):
+        """POST a signed event to `site_event`, as Frappe Cloud would"""
+        body = json.dumps({"site": site, "status": status}).encode()
+        timestamp = str(int(time.time()))
+        with self.request_lock:
+            self.request.get_data.return_value = body
+            self.headers["X-Frappe-Kit-Timestamp"] = timestamp
+            self.headers["X-Frappe-Kit-Signature"] = sign(body, timestamp, secret)
+            return site_event()
+
+    def time_to_ready(self, use_callbacks):
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            watcher = SiteEventWatcher()
+            watcher.start()
+
+            def on_ready(site):
+                if use_callbacks:
+                    self.assertEqual(self.post_event(site), {"status": "received"})
+
+            press = FakePressServer(ready_after=READY_AFTER.get, on_ready=on_ready)
+            press.start()
+            cloud = AsyncCloudClient(make_cloud_api(press), len(READY_AFTER))
+
+            async def provision(subdomain):
+                started = loop.time()
+                site = (await cloud.create_site(subdomain, ["frappe"]))["name"]
+
+                if use_callbacks:
+                    await wait_until_active(cloud, watcher, site, timeout=10)
+                else:
+                    while (await cloud.get_site_status(site))["status"] != "Active":
+                        await asyncio.sleep(FIXED_POLL_INTERVAL)
+
+                return loop.time() - started
+
+            try:
+                return await asyncio.gather(*(provision(s) for s in READY_AFTER))
+            finally:
+                watcher.stop()
+                cloud.close()
+                press.stop()
+
+        return statistics.median(asyncio.run(scenario()))
+
+    def test_signed_events_wake_waiting_jobs(self):
+        polled = self.time_to_ready(use_callbacks=False)
+        pushed = self.time_to_ready(use_callbacks=True)
+
+        self.assertLess(pushed, polled)
+        self.assertLess(pushed, statistics.median(READY_AFTER.values()) + 0.25)
+
+    def test_unsigned_events_are_rejected_and_not_published(self):
+        subscriber = self.redis.pubsub()
+        subscriber.subscribe(self.redis.make_key(CHANNEL))
+
+        with self.assertRaises(frappe.PermissionError):
+            self.post_event("acme.frappe.cloud", secret="wrong")
+        self.assertIsNone(subscriber.get_message(timeout=0))
+
+        self.post_event("acme.frappe.cloud")
+        event = json.loads(subscriber.get_message(timeout=0)["data"])
+        self.assertEqual(
+            (event["site"], event["event"], event["status"]),
+            ("acme.frappe.cloud", "status", "Active"),
+        )
@@ -0,0 +1,153 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import catalog
+
+
+class _Cache:
+    def __init__(self):
+        self.data = {}
+
+    def get_value(self, key):
+        return self.data.get(key)
+
+    def set_value(self, key, value, expires_in_sec=None):
+        self.data[key] = value
+
+
+class TestCatalogCache(unittest.TestCase):
+    def setUp(self):
+        self.builds = 0
+        self.after_commit = []
+        self.session = frappe._dict(user="Guest")
+
+        def build():
+            self.builds += 1
+            return [{"name": "Retail"}]
+
+        for patcher in (
+            patch.object(frappe, "cache", return_value=_Cache()),
+            patch.object(frappe, "db"),
+            patch.object(frappe, "session", self.session, create=True),
+            patch.dict(catalog.BUILDERS, {"industries": build}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        frappe.db.after_commit.add.side_effect = self.after_commit.append
+
+    def test_payload_is_built_once_per_version(self):
+        version, payload = catalog.get_catalog("industries")
+        self.assertEqual(catalog.get_catalog("industries"), (version, payload))
+        self.assertEqual(self.builds, 1)
+
+        catalog.invalidate_catalog()
+        self.assertEqual(catalog.get_catalog("industries")[0], version)
+
+        for callback in self.after_commit:
+            callback()
+        self.assertNotEqual(catalog.get_catalog("industries")[0], version)
+        self.assertEqual(self.builds, 2)
+
+    def test_matching_etag_is_not_modified(self):
+        request = frappe._dict(headers={})
+        with patch.object(frappe.local, "request", request, create=True):
+            response = catalog.catalog_response("industries")
+            etag = response.headers["ETag"]
+
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("max-age", response.headers["Cache-Control"])
+            self.assertEqual(
+                json.loads(response.get_data())["message"], [{"name": "Retail"}]
+            )
+
+            request.headers["If-None-Match"] = etag
+            response = catalog.catalog_response("industries")
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.builds, 1)
+
+    def test_only_guest_responses_are_shared(self):
+        request = frappe._dict(headers={})
+        with patch.object(frappe.local, "request", request, create=True):
+            guest = catalog.catalog_response("industries")
+            self.session.user = "jane@acme.com"
+            user = catalog.catalog_response("industries")
+
+        self.assertTrue(guest.headers["Cache-Control"].startswith("public"))
+        self.assertEqual(user.headers["Cache-Control"], "private, no-cache")
+        self.assertEqual(user.headers["ETag"], guest.headers["ETag"])
+
+
+class TestBootstrap(unittest.TestCase):
+    def test_tiers_carry_one_price_per_region(self):
+        tier = frappe._dict(
+            name="Growth", price_india=4999, price_sea=99, price_europe=89
+        )
+        meta = frappe._dict(
+            get_field=lambda fieldname: frappe._dict(
+                options="India\nSoutheast Asia\nMiddle East & Africa\nEurope & UK"
+            )
+        )
+
+        with (
+            patch.object(frappe, "get_meta", return_value=meta, create=True),
+            patch.object(catalog, "build_package_tiers", return_value=[tier]),
+            patch.object(catalog, "build_industries", return_value=[]),
+        ):
+            bootstrap = catalog.build_bootstrap()
+
+        self.assertEqual(
+            bootstrap["tiers"][0].prices,
+            {
+                "India": 4999,
+                "Southeast Asia": 99,
+                "Middle East & Africa": None,
+                "Europe & UK": 89,
+            },
+        )
+        self.assertNotIn("price_india", bootstrap["tiers"][0])
+        self.assertEqual(
+            [row["currency"] for row in bootstrap["regions"]],
+            ["INR", "USD", "USD", "EUR"],
+        )
+
+
+class TestTierIndex(unittest.TestCase):
+    def test_recommends_highest_tier_whose_range_holds_the_count(self):
+        index = catalog.TierIndex(
+            [
+                ("Enterprise", 201, None),
+                ("Starter", 1, 10),
+                ("Growth", 11, 200),
+                ("Nonprofit", 5, 50),
+            ]
+        )
+
+        self.assertEqual(index.recommend(3), "Starter")
+        self.assertEqual(index.recommend(8), "Nonprofit")
+        self.assertEqual(index.recommend(60), "Growth")
+        self.assertEqual(index.recommend(5000), "Enterprise")
+        self.assertIsNone(index.recommend(0))
+
+    def test_index_is_rebuilt_only_when_the_catalog_version_changes(self):
+        tiers = [
+            frappe._dict(name="Starter", employee_range_min=1, employee_range_max=10)
+        ]
+        version = "v1"
+
+        with (
+            patch.object(catalog, "get_catalog_version", lambda: version),
+            patch.object(frappe, "get_all", return_value=tiers) as get_all,
+            patch.object(frappe.local, "site", "demo.localhost", create=True),
+        ):
+            catalog.get_tier_index()
+            self.assertEqual(catalog.get_tier_index().recommend(4), "Starter")
+            self.assertEqual(get_all.call_count, 1)
+
+            version = "v2"
+            catalog.get_tier_index()
+            self.assertEqual(get_all.call_count, 2)
@@ -0,0 +1,88 @@
+import requests
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+
+CONCURRENT_JOBS = 100
+
+
+class TestFrappeCloudAPI(unittest.TestCase):
+    def setUp(self):
+        # 20ms per new connection stands in for the TCP+TLS handshake
+        self.press = FakePressServer(handshake_delay=0.02).start()
+
+    def tearDown(self):
+        self.press.stop()
+
+    def get_api(self):
+        return make_cloud_api(self.press, pool_size=CONCURRENT_JOBS)
+
+    def run_jobs(self, job):
+        timings = []
+
+        def timed(index):
+            for call in job(index):
+                started = time.perf_counter()
+                call()
+                timings.append(time.perf_counter() - started)
+
+        with ThreadPoolExecutor(max_workers=CONCURRENT_JOBS) as pool:
+            list(pool.map(timed, range(CONCURRENT_JOBS)))
+
+        return sum(timings) / len(timings)
+
+    def test_pooled_session_reduces_per_call_latency(self):
+        api = self.get_api()
+        headers = api._get_headers()
+        url = f"{self.press.url}/api/method/press.api.site.get"
+
+        # provisioning-shaped traffic: one create followed by status polls
+        def pooled_job(index):
+            site = f"pooled-{index}"
+            yield lambda: api.create_site(site, ["frappe", "erpnext"])
+            for _ in range(4):
+                yield lambda: api.get_site_status(f"{site}.frappe.cloud")
+
+        def unpooled_job(index):
+            for _ in range(5):
+                yield lambda: requests.get(
+                    url, headers=headers, params={"name": "pooled-0.frappe.cloud"}
+                )
+
+        pooled_latency = self.run_jobs(pooled_job)
+        pooled_connections = self.press.connections
+
+        self.press.connections = 0
+        unpooled_latency = self.run_jobs(unpooled_job)
+        unpooled_connections = self.press.connections
+
+        # five calls per job over one kept-alive connection, against one
+        # handshake per call without the pool
+        self.assertLessEqual(pooled_connections, CONCURRENT_JOBS)
+        self.assertEqual(unpooled_connections, CONCURRENT_JOBS * 5)
+        self.assertLess(pooled_latency, unpooled_latency)
+
+    def test_idempotent_call_retries_and_honours_retry_after(self):
+        api = self.get_api()
+        api.create_site("retry", ["frappe"])
+        self.press.script("press.api.site.get", (503, {"Retry-After": "2"}), (502, {}))
+
+        with patch("frappe_kit.frappe_kit.api.provisioning.time.sleep") as sleep:
+            status = api.get_site_status("retry.frappe.cloud")
+
+        self.assertEqual(status.get("name"), "retry.frappe.cloud")
+        self.assertEqual(self.press.count("press.api.site.get"), 3)
+        self.assertEqual(sleep.call_args_list[0].args[0], 2.0)
+
+    def test_site_creation_is_not_retried_on_server_error(self):
+        api = self.get_api()
+        self.press.script("press.api.site.new", (500, {}))
+
+        with self.assertRaises(Exception):
+            api.create_site("once", ["frappe"])
+
+        self.assertEqual(self.press.count("press.api.site.new"), 1)
@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import conversion
+
+
+class TestConversionBackup(unittest.TestCase):
+    def test_nothing_is_left_uncommitted_while_the_backup_runs(self):
+        doc = MagicMock()
+        events = []
+        doc.flush_log.side_effect = lambda: events.append("flush")
+
+        def take_backup(cloud_api, site_name, on_wait):
+            events.append("wait")
+            on_wait(5)
+            events.append("wait")
+            return {"name": "backup-1"}
+
+        with (
+            patch.object(frappe, "db") as db,
+            patch.object(conversion, "take_backup", side_effect=take_backup),
+        ):
+            db.commit.side_effect = lambda: events.append("commit")
+            backup = conversion._backup_demo_site(doc, MagicMock(), "acme.frappe.cloud")
+
+        self.assertEqual(backup, {"name": "backup-1"})
+        self.assertEqual(
+            events, ["flush", "commit", "wait", "flush", "commit", "wait"]
+        )
+
+    def test_new_site_goes_to_the_demo_regions_cluster(self):
+        settings = frappe._dict(demo_domain="frappe.cloud", default_region="Mumbai")
+        doc = MagicMock(production_subdomain="acme", production_apps="frappe")
+        cloud_api = MagicMock()
+        cloud_api.create_site.return_value = {"name": "acme.frappe.cloud"}
+
+        with (
+            patch.object(frappe, "get_single", return_value=settings),
+            patch.object(
+                frappe,
+                "get_doc",
+                create=True,
+                return_value=frappe._dict(region="Europe & UK"),
+            ),
+            patch.object(conversion, "_backup_demo_site", return_value={}),
+            patch.object(conversion, "wait_until_active_sync"),
+            patch.object(conversion, "install_apps_sync"),
+            patch.object(conversion, "get_tier_dependencies"),
+        ):
+            conversion._convert_new_site(
+                doc, frappe._dict(package_tier="Growth"), cloud_api, "demo"
+            )
+
+        self.assertEqual(cloud_api.create_site.call_args.kwargs["cluster"], "Frankfurt")
+        doc.mark_completed.assert_called_once_with("https://acme.frappe.cloud")
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import timeit
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit import disposable_domains
+from frappe_kit.frappe_kit.disposable_domains import DomainBlocklist
+
+
+class TestDomainBlocklist(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.write(["# comment", "tempmail.com", "", "Mailinator.com"])
+        self.blocklist = DomainBlocklist(self.path)
+
+    def write(self, lines, mtime=None):
+        with open(self.path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        if mtime:
+            os.utime(self.path, ns=(mtime, mtime))
+
+    def test_subdomains_of_blocked_domains_are_blocked(self):
+        self.assertIn("tempmail.com", self.blocklist)
+        self.assertIn("eu.mx.TEMPMAIL.com", self.blocklist)
+        self.assertIn("mailinator.com", self.blocklist)
+        self.assertNotIn("acme.com", self.blocklist)
+        self.assertNotIn("nottempmail.com", self.blocklist)
+        self.assertNotIn("com", self.blocklist)
+
+    def test_list_is_reloaded_when_the_file_changes(self):
+        self.assertNotIn("yopmail.com", self.blocklist)
+
+        self.write(["yopmail.com"], mtime=10**18)
+        self.assertNotIn("yopmail.com", self.blocklist)  # not checked again yet
+
+        self.blocklist.checked_at = 0
+        self.assertIn("yopmail.com", self.blocklist)
+        self.assertNotIn("tempmail.com", self.blocklist)
+
+    def test_lookup_cost_does_not_grow_with_the_list(self):
+        def lookup_time():
+            runs = timeit.repeat(lambda: "a.b.acme.com" in self.blocklist, number=2000)
+            return min(runs)
+
+        self.assertIn("tempmail.com", self.blocklist)
+        small = lookup_time()
+
+        self.write([f"disposable-{index}.com" for index in range(200_000)], 10**18)
+        self.blocklist.checked_at = 0
+        self.assertEqual(len(self.blocklist), 200_000)
+        large = lookup_time()
+
+        self.assertLess(large, small * 3)
+
+
+class TestMXCheck(unittest.TestCase):
+    def test_cached_answers_skip_the_dns_lookup(self):
+        cache = MagicMock()
+        cache.get_value.return_value = False
+
+        with patch.object(frappe, "cache", return_value=cache):
+            self.assertFalse(disposable_domains.has_mx_record("no-mail.example"))
+
+        cache.set_value.assert_not_called()
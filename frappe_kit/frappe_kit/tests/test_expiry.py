@@ -0,0 +1,64 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api.expiry import suspend_sites
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+
+class TestSiteSuspension(unittest.TestCase):
+    def setUp(self):
+        self.press = FakePressServer().start()
+        self.addCleanup(self.press.stop)
+        self.api = make_cloud_api(self.press)
+
+    def test_sites_are_suspended_in_parallel_and_failures_kept_back(self):
+        sites = []
+        for index in range(40):
+            name = self.api.create_site(f"expired-{index}", ["frappe"])["name"]
+            sites.append(frappe._dict(name=f"DS-{index}", frappe_cloud_site_id=name))
+        sites.append(frappe._dict(name="DS-local", frappe_cloud_site_id=None))
+
+        # a client error is not retried, so exactly one site fails
+        self.press.script("press.api.site.deactivate", (400, {}))
+
+        with (
+            patch.object(frappe, "log_error", create=True) as log_error,
+            ThreadPoolExecutor(max_workers=10) as pool,
+        ):
+            suspended = suspend_sites(self.api, pool, sites)
+
+        self.assertEqual(len(suspended), len(sites) - 1)
+        self.assertIn("DS-local", [site.name for site in suspended])
+        self.assertEqual(self.press.count("press.api.site.deactivate"), 40)
+        log_error.assert_called_once()
+
+
+class TestExpiryWarnings(unittest.TestCase):
+    def test_queries_stay_constant_however_many_demos_expire(self):
+        from frappe_kit.frappe_kit.tasks import send_expiry_warnings
+
+        settings = frappe._dict(expiry_warning_template="Trial Expiring")
+        expiring = [
+            frappe._dict(name=f"DR-{index}", contact_email=f"user{index}@acme.com")
+            for index in range(250)
+        ]
+
+        with (
+            patch.object(frappe, "get_single", return_value=settings),
+            patch.object(frappe, "get_all", return_value=expiring) as get_all,
+            patch.object(frappe, "sendmail", create=True) as sendmail,
+            patch.object(frappe, "db") as db,
+        ):
+            send_expiry_warnings()
+
+        get_all.assert_called_once()
+        self.assertEqual(
+            get_all.call_args.kwargs["filters"]["warning_sent_on"], ["is", "not set"]
+        )
+        db.sql.assert_called_once()
+        self.assertEqual(len(db.sql.call_args.args[1][1]), 250)
+        self.assertEqual(sendmail.call_count, 250)
+        self.assertNotIn("now", sendmail.call_args.kwargs)
@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import lifecycle
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def zrem(self, key, member):
+        self.commands.append((key, member))
+
+    def execute(self):
+        return [self.redis.zrem(key, member) for key, member in self.commands]
+
+
+class _Redis:
+    """A sorted set with the commands the lifecycle queue uses"""
+
+    def __init__(self):
+        self.zsets = {}
+        self.lock = threading.Lock()
+
+    def make_key(self, key):
+        return f"site|{key}"
+
+    def zadd(self, key, mapping):
+        with self.lock:
+            self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        with self.lock:
+            members = sorted(
+                (score, member)
+                for member, score in self.zsets.get(key, {}).items()
+                if score <= high
+            )
+        return [member.encode() for _, member in members[start : start + num]]
+
+    def zrem(self, key, member):
+        with self.lock:
+            removed = self.zsets.get(key, {}).pop(frappe.safe_decode(member), None)
+            return int(removed is not None)
+
+    def pipeline(self):
+        return _Pipeline(self)
+
+
+class TestLifecycleEvents(unittest.TestCase):
+    def setUp(self):
+        self.redis = _Redis()
+        for patcher in (
+            patch.object(frappe, "cache", return_value=self.redis),
+            patch.object(frappe, "db"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # run after-commit callbacks straight away
+        frappe.db.after_commit.add.side_effect = lambda callback: callback()
+
+    def test_only_due_events_are_claimed(self):
+        now = datetime.now()
+        lifecycle.schedule_trial_events("DR-1", now - timedelta(minutes=1), 3)
+        lifecycle.schedule_trial_events("DR-2", now + timedelta(days=2), 3)
+        lifecycle.schedule_trial_events("DR-3", now + timedelta(days=10), 3)
+
+        claimed = lifecycle.claim_due_events()
+
+        self.assertEqual(
+            sorted(claimed),
+            [("expire", "DR-1"), ("warn", "DR-1"), ("warn", "DR-2")],
+        )
+        self.assertEqual(lifecycle.claim_due_events(), [])
+        pending = self.redis.zsets[self.redis.make_key(lifecycle.EVENTS_KEY)]
+        self.assertEqual(sorted(pending), ["expire|DR-2", "expire|DR-3", "warn|DR-3"])
+
+    def test_concurrent_dispatchers_claim_each_event_once(self):
+        key = self.redis.make_key(lifecycle.EVENTS_KEY)
+        self.redis.zadd(key, {f"expire|DR-{i}": time.time() - i for i in range(200)})
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            batches = list(pool.map(lambda _: lifecycle.claim_due_events(), range(8)))
+
+        claimed = [event for batch in batches for event in batch]
+        self.assertEqual(len(claimed), 200)
+        self.assertEqual(len(set(claimed)), 200)
+
+    def test_unsuspended_sites_are_retried_later(self):
+        sites = [
+            frappe._dict(name="DS-1", demo_request="DR-1", frappe_cloud_site_id="a"),
+            frappe._dict(name="DS-2", demo_request="DR-2", frappe_cloud_site_id="b"),
+        ]
+        frappe.db.sql.return_value = sites
+
+        with (
+            patch.object(lifecycle, "FrappeCloudAPI"),
+            patch.object(lifecycle, "suspend_sites", return_value=sites[:1]),
+            patch.object(lifecycle, "mark_suspended") as mark_suspended,
+        ):
+            lifecycle.expire_demo_requests(["DR-1", "DR-2"])
+
+        mark_suspended.assert_called_once_with(sites[:1])
+        pending = self.redis.zsets[self.redis.make_key(lifecycle.EVENTS_KEY)]
+        self.assertEqual(list(pending), ["expire|DR-2"])
+        self.assertGreater(pending["expire|DR-2"], time.time())
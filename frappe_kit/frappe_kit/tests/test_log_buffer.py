@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.log_buffer import FLUSH_LINES, LogBuffer
+from frappe_kit.frappe_kit.transitions import TransitionMixin
+
+
+class _Doc(frappe._dict):
+    def set(self, key, value):
+        self[key] = value
+
+    def is_new(self):
+        return not self.name
+
+
+class TestLogBuffer(unittest.TestCase):
+    def get_buffer(self, name="DR-0001"):
+        doc = _Doc(doctype="Demo Request", name=name, provisioning_log="")
+        return doc, LogBuffer(doc, "provisioning_log")
+
+    def test_lines_are_written_in_batches(self):
+        doc, buffer = self.get_buffer()
+
+        with patch.object(frappe, "db") as db:
+            for index in range(FLUSH_LINES * 3):
+                buffer.append(f"line {index}")
+
+        self.assertEqual(db.sql.call_count, 3)
+        query, (text, name) = db.sql.call_args.args
+        self.assertIn("concat(coalesce(`provisioning_log`", query)
+        self.assertEqual(name, "DR-0001")
+        self.assertEqual(text.count("\n"), FLUSH_LINES)
+        self.assertEqual(doc.provisioning_log.count("\n"), FLUSH_LINES * 3)
+
+    def test_flush_writes_pending_lines_once(self):
+        doc, buffer = self.get_buffer()
+
+        with patch.object(frappe, "db") as db:
+            buffer.append("one")
+            buffer.append("two")
+            buffer.flush()
+            buffer.flush()
+
+        self.assertEqual(db.sql.call_count, 1)
+        self.assertTrue(db.sql.call_args.args[1][0].endswith("two\n"))
+
+    def test_unsaved_document_is_not_written(self):
+        doc, buffer = self.get_buffer(name=None)
+
+        with patch.object(frappe, "db") as db:
+            buffer.append("queued")
+            buffer.flush()
+
+        db.sql.assert_not_called()
+        self.assertIn("queued", doc.provisioning_log)
+
+
+class _Request(TransitionMixin, _Doc):
+    log_fieldname = "provisioning_log"
+
+
+class TestTransition(unittest.TestCase):
+    def test_values_and_log_lines_are_written_in_one_statement(self):
+        doc = _Request(doctype="Demo Request", name="DR-0001", provisioning_log="")
+        session = frappe._dict(user="Administrator")
+
+        with (
+            patch.object(frappe, "db") as db,
+            patch.object(frappe, "session", session, create=True),
+        ):
+            doc.append_log("Installing apps...")
+            doc.transition(log="Provisioning failed: boom", status="Failed")
+
+        self.assertEqual(db.sql.call_count, 1)
+        query, params = db.sql.call_args.args
+        self.assertIn("`status` = %(status)s", query)
+        self.assertIn("concat(coalesce(`provisioning_log`", query)
+        self.assertIn("Installing apps...", params["log_text"])
+        self.assertIn("Provisioning failed: boom", params["log_text"])
+        self.assertEqual(doc.status, "Failed")
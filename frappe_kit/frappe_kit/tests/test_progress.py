@@ -0,0 +1,121 @@
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import provisioning, rate_limit
+from frappe_kit.frappe_kit.doctype.demo_request.demo_request import (
+    PROGRESS_EVENT,
+    DemoRequest,
+    get_progress_task_id,
+)
+from frappe_kit.frappe_kit.tests.test_log_buffer import _Doc
+from frappe_kit.frappe_kit.transitions import TransitionMixin
+
+
+class TestProvisioningLog(unittest.TestCase):
+    def setUp(self):
+        # the query runs as written, on an in-memory table
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.create_function("char_length", 1, len)
+        self.conn.execute(
+            """
+            create table `tabDemo Request` (
+                name text, status text, site_url text,
+                error_message text, provisioning_log text
+            )
+            """
+        )
+        self.addCleanup(self.conn.close)
+
+        def sql(query, values, as_dict=False):
+            cursor = self.conn.execute(query.replace("%s", "?"), values)
+            columns = [column[0] for column in cursor.description]
+            return [frappe._dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        for patcher in (
+            patch.object(frappe, "db"),
+            patch.object(rate_limit, "check_rate_limit"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        frappe.db.sql.side_effect = sql
+
+    def add_request(self, log, status="Provisioning"):
+        self.conn.execute(
+            "insert into `tabDemo Request` values (?, ?, ?, ?, ?)",
+            ("DR-1", status, "https://acme.frappe.cloud", None, log),
+        )
+
+    def write_log(self, log):
+        self.conn.execute(
+            "update `tabDemo Request` set provisioning_log = ? where name = 'DR-1'",
+            (log,),
+        )
+
+    def test_returns_only_the_lines_after_the_cursor(self):
+        self.add_request("Creating site\n")
+
+        first = provisioning.get_provisioning_log("DR-1")
+        self.assertEqual(first["log"], "Creating site\n")
+        self.assertEqual(first["cursor"], len("Creating site\n"))
+
+        self.write_log("Creating site\nInstalling apps\nSite ready\n")
+        second = provisioning.get_provisioning_log("DR-1", cursor=first["cursor"])
+        self.assertEqual(second["log"], "Installing apps\nSite ready\n")
+        self.assertEqual(
+            second["cursor"], len("Creating site\nInstalling apps\nSite ready\n")
+        )
+
+        # nothing new: an empty log and the same cursor
+        third = provisioning.get_provisioning_log("DR-1", cursor=second["cursor"])
+        self.assertEqual((third["log"], third["cursor"]), ("", second["cursor"]))
+
+    def test_a_cursor_past_the_log_is_kept(self):
+        self.add_request(None, status="Active")
+
+        response = provisioning.get_provisioning_log("DR-1", cursor="40")
+
+        self.assertEqual((response["log"], response["cursor"]), ("", 40))
+        self.assertEqual(response["site_url"], "https://acme.frappe.cloud")
+
+    def test_unknown_request_is_not_found(self):
+        with patch.object(frappe, "throw", side_effect=frappe.DoesNotExistError):
+            with self.assertRaises(frappe.DoesNotExistError):
+                provisioning.get_provisioning_log("DR-missing")
+
+
+class _Request(TransitionMixin, _Doc):
+    log_fieldname = "provisioning_log"
+    publish_progress = DemoRequest.publish_progress
+    mark_failed = DemoRequest.mark_failed
+
+
+class TestProgressEvents(unittest.TestCase):
+    def test_failure_is_published_once_the_transaction_commits(self):
+        doc = _Request(
+            doctype="Demo Request", name="DR-1", provisioning_log="Creating site\n"
+        )
+        session = frappe._dict(user="Administrator")
+
+        with (
+            patch.object(frappe, "db"),
+            patch.object(frappe, "session", session, create=True),
+            patch.object(frappe, "publish_realtime", create=True) as publish_realtime,
+        ):
+            doc.mark_failed("Site did not become active")
+
+        publish_realtime.assert_called_once()
+        event, data = publish_realtime.call_args.args
+        self.assertEqual(event, PROGRESS_EVENT)
+        self.assertEqual(
+            publish_realtime.call_args.kwargs,
+            {"task_id": get_progress_task_id("DR-1"), "after_commit": True},
+        )
+        self.assertEqual(data["status"], "Failed")
+        self.assertEqual(data["error"], "Site did not become active")
+        # the cursor covers the failure line, so the page need not refetch it
+        self.assertEqual(data["cursor"], len(doc.provisioning_log))
+        self.assertIn("Provisioning failed", doc.provisioning_log)
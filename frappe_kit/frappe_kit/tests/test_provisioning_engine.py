@@ -0,0 +1,217 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import (
+    admission,
+    callbacks,
+    engine,
+    sample_data,
+    snapshots,
+)
+from frappe_kit.frappe_kit.api.callbacks import SiteEventWatcher
+from frappe_kit.frappe_kit.api.engine import STEPS, get_pending_steps
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+
+class TestProvisioningSteps(unittest.TestCase):
+    def test_fresh_request_runs_every_step(self):
+        self.assertEqual(get_pending_steps(None), STEPS)
+        self.assertEqual(get_pending_steps(""), STEPS)
+
+    def test_retry_resumes_after_last_checkpoint(self):
+        self.assertEqual(
+            get_pending_steps("await_active"),
+            (
+                "restore_snapshot",
+                "install_apps",
+                "rename_site",
+                "create_user",
+                "import_data",
+                "notify",
+            ),
+        )
+        self.assertNotIn("create_site", get_pending_steps("create_site"))
+
+    def test_completed_request_has_nothing_left(self):
+        self.assertEqual(get_pending_steps("notify"), ())
+
+
+class _DemoRequest:
+    """The parts of a Demo Request the engine touches, kept in memory"""
+
+    def __init__(self, name, **values):
+        self.name = name
+        self.doctype = "Demo Request"
+        self.status = "Provisioning"
+        self.subdomain = name
+        self.package_tier = "Growth"
+        self.region = "India"
+        self.industry = None
+        self.contact_email = f"{name}@example.com"
+        self.provisioning_step = None
+        self.cloud_site_name = None
+        self.restored_snapshot = None
+        self.demo_site = None
+        self.site_url = None
+        self.demo_username = None
+        self.log = []
+        self.__dict__.update(values)
+
+    def db_set(self, fieldname, value=None):
+        values = fieldname if isinstance(fieldname, dict) else {fieldname: value}
+        self.__dict__.update(values)
+
+    def append_log(self, message):
+        self.log.append(message)
+
+    def flush_log(self):
+        pass
+
+    def reload(self):
+        pass
+
+    def publish_progress(self, **kwargs):
+        pass
+
+    def mark_failed(self, error):
+        self.status = "Failed"
+        self.error = error
+
+    def mark_completed(self, site_url, username):
+        self.status = "Completed"
+
+
+class _Watcher(SiteEventWatcher):
+    """No Redis subscriber: the tests rely on polling"""
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+
+
+class TestProvisioningEngine(unittest.TestCase):
+    def setUp(self):
+        self.docs = {}
+        self.tier = frappe._dict(frappe_apps=[frappe._dict(app_name="hrms")])
+        settings = frappe._dict(demo_domain="frappe.cloud", default_region="Mumbai")
+
+        def get_doc(doctype, name=None):
+            if isinstance(doctype, dict):
+                return MagicMock(name=doctype["doctype"])
+            return self.tier if doctype == "Package Tier" else self.docs[name]
+
+        for patcher in (
+            patch.object(frappe, "db"),
+            patch.object(frappe, "get_single", return_value=settings),
+            patch.object(frappe, "get_doc", create=True, side_effect=get_doc),
+            patch.object(frappe, "log_error", create=True),
+            patch.object(admission, "hold_slot"),
+            patch.object(admission, "finish_provisioning"),
+            patch.object(snapshots, "get_snapshot", return_value=None),
+            patch.object(sample_data, "get_sample_data_path", return_value=None),
+            patch.object(engine, "set_encrypted_password"),
+            patch.object(engine, "SiteEventWatcher", _Watcher),
+            patch.object(callbacks, "POLL_MIN", 0.05),
+            patch.object(callbacks, "POLL_MAX", 0.1),
+            patch.object(engine.app_installer, "POLL_MIN", 0.05),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        frappe.db.get_value.return_value = None
+
+    def start_press(self, **kwargs):
+        press = FakePressServer(install_after=0.3, **kwargs).start()
+        self.addCleanup(press.stop)
+        patcher = patch.object(
+            engine, "FrappeCloudAPI", return_value=make_cloud_api(press)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return press
+
+    def add_requests(self, *names, **values):
+        for name in names:
+            self.docs[name] = _DemoRequest(name, **values)
+        return list(names)
+
+    def test_jobs_wait_for_their_sites_at_the_same_time(self):
+        self.start_press(ready_after=1)
+        names = self.add_requests("a", "b", "c", "d")
+
+        started = time.monotonic()
+        results = engine.provision_many(names, concurrency=4)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([r["status"] for r in results], ["success"] * 4)
+        self.assertTrue(all(self.docs[n].status == "Completed" for n in names))
+        # one after the other: 4 x (1s to be ready + 0.3s to install)
+        self.assertLess(elapsed, 3)
+
+    def test_a_failing_job_does_not_stop_the_others(self):
+        self.start_press(ready_after=lambda name: 60 if name == "bad" else 0.2)
+        names = self.add_requests("a", "bad", "c")
+
+        with patch.object(engine, "SITE_READY_TIMEOUT", 1):
+            results = engine.provision_many(names, concurrency=3)
+
+        self.assertEqual(
+            [r["status"] for r in results], ["success", "failed", "success"]
+        )
+        self.assertEqual(self.docs["bad"].status, "Failed")
+        self.assertIn("timed out", self.docs["bad"].error)
+
+    def test_no_new_requests_are_taken_past_the_time_limit(self):
+        self.start_press(ready_after=0.6)
+        queue = self.add_requests("a", "b", "c", "d")
+
+        def pop_queued():
+            return queue.pop(0) if queue else None
+
+        with patch.object(engine, "pop_queued", pop_queued):
+            asyncio.run(engine.ProvisioningEngine(2).run_queue(time_limit=0.3))
+
+        # the two running jobs finished; the rest wait for the next engine
+        self.assertEqual(self.docs["a"].status, "Completed")
+        self.assertEqual(self.docs["b"].status, "Completed")
+        self.assertEqual(queue, ["c", "d"])
+
+    def add_remote_site(self, press, name, team):
+        press.sites[name] = {
+            "name": name,
+            "active": True,
+            "apps": ["frappe", "erpnext"],
+            "team": team,
+            "backups": [],
+        }
+
+    def test_a_retried_job_continues_after_its_last_step(self):
+        press = self.start_press()
+        self.add_remote_site(press, "a.frappe.cloud", "team")
+        self.add_requests(
+            "a", provisioning_step="create_site", cloud_site_name="a.frappe.cloud"
+        )
+
+        (result,) = engine.provision_many(["a"])
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(press.count("press.api.site.new"), 0)
+        self.assertIn(
+            "Resuming provisioning after step: create_site", self.docs["a"].log
+        )
+        self.assertEqual(self.docs["a"].provisioning_step, "notify")
+
+    def test_only_our_own_sites_are_reused_when_creation_fails(self):
+        press = self.start_press()
+        self.add_remote_site(press, "theirs.frappe.cloud", "another-team")
+        self.add_remote_site(press, "ours.frappe.cloud", "team")
+        press.script("press.api.site.new", (409, {}), (409, {}))
+        names = self.add_requests("theirs", "ours")
+
+        results = engine.provision_many(names, concurrency=1)
+
+        self.assertEqual([r["status"] for r in results], ["failed", "success"])
+        self.assertIn("Site already exists", " ".join(self.docs["ours"].log))
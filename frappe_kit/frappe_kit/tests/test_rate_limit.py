@@ -0,0 +1,115 @@
+import math
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import rate_limit
+
+
+class _Redis:
+    """GCRA buckets; the Lua script runs as its Python equivalent under a lock"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def make_key(self, key):
+        return f"site|{key}"
+
+    def register_script(self, script):
+        assert script == rate_limit.GCRA_SCRIPT
+
+        def run(keys, args):
+            now, interval, period = args
+            with self.lock:
+                tat = max(self.data.get(keys[0], now), now)
+                new_tat = tat + interval
+                if new_tat - period > now:
+                    return math.ceil((new_tat - period - now) * 1000)
+                self.data[keys[0]] = new_tat
+                return 0
+
+        return run
+
+
+class TestGuestRateLimit(unittest.TestCase):
+    def setUp(self):
+        self.redis = _Redis()
+        self.settings = frappe._dict(guest_rate_limits=[])
+        self.now = 1_000_000.0
+        for patcher in (
+            patch.object(frappe, "cache", return_value=self.redis),
+            patch.object(frappe, "get_cached_doc", return_value=self.settings),
+            patch.object(frappe.local, "request_ip", "203.0.113.7", create=True),
+            patch.object(rate_limit.time, "time", side_effect=lambda: self.now),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        @rate_limit.guest_rate_limit
+        def check_provisioning_status(demo_request):
+            return demo_request
+
+        self.endpoint = check_provisioning_status
+        self.settings.guest_rate_limits = [
+            frappe._dict(
+                endpoint="check_provisioning_status",
+                key_by=rate_limit.IP_ADDRESS,
+                limit=5,
+                period=10,
+            )
+        ]
+
+    def test_budget_from_settings_refills_smoothly(self):
+        for _ in range(5):
+            self.assertEqual(self.endpoint(demo_request="DR-1"), "DR-1")
+        with self.assertRaises(frappe.TooManyRequestsError):
+            self.endpoint(demo_request="DR-1")
+
+        # one request's worth of time frees exactly one request
+        self.now += 2
+        self.endpoint(demo_request="DR-1")
+        with self.assertRaises(frappe.TooManyRequestsError):
+            self.endpoint(demo_request="DR-1")
+
+    def test_each_ip_has_its_own_bucket_of_one_key(self):
+        for _ in range(5):
+            self.endpoint(demo_request="DR-1")
+
+        with patch.object(frappe.local, "request_ip", "198.51.100.1"):
+            self.endpoint(demo_request="DR-1")
+
+        self.assertEqual(len(self.redis.data), 2)
+
+    def test_concurrent_requests_cannot_overdraw_a_bucket(self):
+        def call(_):
+            try:
+                return self.endpoint(demo_request="DR-1")
+            except frappe.TooManyRequestsError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            allowed = [result for result in pool.map(call, range(50)) if result]
+
+        self.assertEqual(len(allowed), 5)
+
+    def test_a_zero_limit_turns_the_budget_off(self):
+        self.settings.guest_rate_limits[0].limit = 0
+
+        for _ in range(100):
+            self.endpoint(demo_request="DR-1")
+
+        self.assertEqual(self.redis.data, {})
+
+    def test_email_domains_share_a_budget(self):
+        domain = rate_limit.get_email_domain("ceo@Acme.com")
+        for _ in range(20):
+            rate_limit.check_rate_limit("submit_demo_request", "Email Domain", domain)
+
+        with self.assertRaises(frappe.TooManyRequestsError):
+            rate_limit.check_rate_limit(
+                "submit_demo_request", "Email Domain", "acme.com"
+            )
@@ -0,0 +1,52 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import reconciler
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+
+class TestReconciler(unittest.TestCase):
+    def setUp(self):
+        self.press = FakePressServer(
+            ready_after=lambda subdomain: 0 if subdomain == "up" else 60
+        ).start()
+        self.addCleanup(self.press.stop)
+
+    def test_active_sites_are_resumed_and_old_ones_failed(self):
+        api = make_cloud_api(self.press)
+        api.create_site("up", ["frappe"])
+        api.create_site("building", ["frappe"])
+
+        now = datetime.now()
+        young, old = now - timedelta(hours=3), now - timedelta(hours=30)
+        page = [
+            # (name, created, subdomain): site active / building / never created
+            frappe._dict(name=name, creation=creation, subdomain=subdomain)
+            for name, creation, subdomain in (
+                ("DR-1", old, "up"),
+                ("DR-2", young, "building"),
+                ("DR-3", young, "never"),
+                ("DR-4", old, "gone"),
+                ("DR-5", young, "waiting"),
+            )
+        ]
+        settings = frappe._dict(demo_domain="frappe.cloud")
+        cache = MagicMock()
+        cache.lrange.return_value = [b"DR-5"]
+
+        with (
+            patch.object(frappe, "get_single", return_value=settings),
+            patch.object(frappe, "cache", return_value=cache),
+            patch.object(frappe, "db"),
+            patch.object(reconciler, "FrappeCloudAPI", return_value=api),
+            patch.object(reconciler, "get_stuck_page", side_effect=[page, []]),
+            patch.object(reconciler, "resume_requests") as resume,
+            patch.object(reconciler, "fail_requests") as fail,
+        ):
+            reconciler.reconcile_stuck_requests()
+
+        self.assertEqual(resume.call_args.args[0], ["DR-1", "DR-3"])
+        self.assertEqual(fail.call_args.args[0], ["DR-4"])
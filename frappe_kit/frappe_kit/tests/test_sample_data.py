@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from frappe_kit.frappe_kit.api import sample_data
+
+
+class _Site:
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+        self.inserted = []
+
+    def get_existing(self, doctype, names):
+        return self.existing & set(names)
+
+    def insert_many(self, docs):
+        self.inserted.extend(docs)
+
+
+class TestSampleDataImport(unittest.TestCase):
+    def write(self, data):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_bundled_templates_stream_like_json_load(self):
+        for name in ("retail", "manufacturing", "services", "distribution"):
+            path = os.path.join(sample_data.BUNDLED_DIR, f"{name}.json")
+            with open(path) as f:
+                data = json.load(f)
+
+            for section, records in data.items():
+                streamed = list(sample_data.iter_records(path, section, chunk_size=7))
+                self.assertEqual(streamed, records if isinstance(records, list) else [])
+
+    def test_masters_are_imported_before_the_transactions_linking_them(self):
+        order = sample_data.get_import_order()
+
+        self.assertLess(order.index("items"), order.index("sales_invoices"))
+        self.assertLess(order.index("customers"), order.index("sales_invoices"))
+        self.assertLess(order.index("warehouses"), order.index("stock_entries"))
+
+    def test_only_groups_missing_on_the_site_are_created(self):
+        path = sample_data.BUNDLED_DIR + "/manufacturing.json"
+        site = _Site(existing={"Raw Material", "Commercial", "All Territories"})
+
+        sample_data.import_groups(site, path)
+
+        created = {
+            (doc["doctype"], doc.get("name") or doc.get("item_group_name"))
+            for doc in site.inserted
+        }
+        self.assertIn(("Item Group", "Finished Goods"), created)
+        self.assertNotIn(("Item Group", "Raw Material"), created)
+        self.assertEqual(
+            {doc["doctype"] for doc in site.inserted},
+            {"Item Group", "Warehouse Type"},
+        )
+
+    def test_large_files_import_in_batches_within_bounded_memory(self):
+        path = self.write(
+            {
+                "sales_invoices": [
+                    {
+                        "customer": f"C-{index}",
+                        "items": [{"qty": index, "rate": 1.5}],
+                        "remarks": "x" * 500,
+                    }
+                    for index in range(10_000)
+                ],
+                "items": [{"item_code": "ITEM-1", "item_group": "Products"}],
+            }
+        )
+
+        tracemalloc.start()
+        batches = [
+            (doctype, len(docs), docs[0])
+            for doctype, docs in sample_data.iter_batches(path, company="Acme")
+        ]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(batches[0][:2], ("Item", 1))
+        self.assertEqual(len(batches), 1 + 10_000 // sample_data.BATCH_SIZE)
+        self.assertEqual(batches[1][2]["company"], "Acme")
+        self.assertNotIn("company", batches[0][2])
+        self.assertLess(peak, os.path.getsize(path) / 5)
+
+    def test_resumed_import_skips_records_already_on_the_site(self):
+        path = self.write(
+            {
+                "customers": [{"customer_name": f"C-{index}"} for index in range(5)],
+                "items": [{"item_code": f"I-{index}"} for index in range(3)],
+            }
+        )
+
+        batches = sample_data.iter_batches(path, skip=4)
+        docs = [doc for _, batch in batches for doc in batch]
+
+        self.assertEqual(
+            [doc.get("item_code") or doc.get("customer_name") for doc in docs],
+            ["C-1", "C-2", "C-3", "C-4"],
+        )
+
+    def test_templates_are_parsed_once_until_the_file_changes(self):
+        path = self.write({"items": [{"item_code": "I-1", "item_group": "Products"}]})
+        cache = sample_data.TemplateCache(maxsize=2)
+
+        with patch.object(
+            sample_data, "parse_template", wraps=sample_data.parse_template
+        ) as parse:
+            template = cache.get(path)
+            self.assertIs(cache.get(path), template)
+            self.assertEqual(parse.call_count, 1)
+
+            with open(path, "w") as f:
+                json.dump({"items": [{"item_code": "I-2"}]}, f)
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+
+            changed = cache.get(path)
+            self.assertEqual(parse.call_count, 2)
+            self.assertEqual(list(changed.records("items")), [{"item_code": "I-2"}])
+            self.assertNotEqual(changed.content_hash, template.content_hash)
+
+            for name in ("retail", "services"):
+                cache.get(f"{sample_data.BUNDLED_DIR}/{name}.json")
+            self.assertEqual(len(cache.entries), 2)
+            self.assertNotIn(path, cache.entries)
+
+    def test_masters_missing_their_name_are_rejected(self):
+        path = self.write({"customers": [{"customer_name": "A"}, {"territory": "X"}]})
+
+        with self.assertRaisesRegex(ValueError, "record 2 has no customer_name"):
+            sample_data.parse_template(path)
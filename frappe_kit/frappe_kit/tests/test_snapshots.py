@@ -0,0 +1,82 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import backups, sample_data, snapshots
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+
+RETAIL = sample_data.BUNDLED_DIR + "/retail.json"
+
+
+class TestIndustrySnapshots(unittest.TestCase):
+    def setUp(self):
+        self.template = MagicMock(
+            default_settings_json='{"Stock Settings": {"valuation_method": "FIFO"}}',
+            snapshot_hash=None,
+            snapshot_files=None,
+        )
+        self.settings = frappe._dict(
+            enable_industry_snapshots=1, demo_domain="frappe.cloud"
+        )
+        for patcher in (
+            patch.object(frappe, "db"),
+            patch.object(frappe, "get_single", return_value=self.settings),
+            patch.object(frappe, "get_doc", create=True, return_value=self.template),
+            patch.object(sample_data, "get_sample_data_path", return_value=RETAIL),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        frappe.db.get_value.side_effect = lambda *args, **kwargs: (
+            self.template.default_settings_json
+        )
+
+    def test_hash_changes_with_the_template_content(self):
+        before = snapshots.get_template_hash("Retail")
+        self.assertEqual(snapshots.get_template_hash("Retail"), before)
+
+        self.template.default_settings_json = "{}"
+        self.assertNotEqual(snapshots.get_template_hash("Retail"), before)
+
+    def test_build_imports_once_and_records_the_backup(self):
+        site = MagicMock()
+        with (
+            FakePressServer() as press,
+            patch.object(
+                snapshots, "FrappeCloudAPI", return_value=make_cloud_api(press)
+            ),
+            patch.object(snapshots, "wait_until_active_sync"),
+            patch.object(frappe, "cache"),
+            patch.object(backups, "wait_for_message"),
+            patch.object(backups, "BACKUP_POLL_MIN", 0),
+            patch.object(sample_data, "SiteClient", return_value=site),
+            patch.object(sample_data, "import_sample_data") as import_sample_data,
+        ):
+            snapshots.build_snapshot("Retail")
+
+            site.set_value.assert_called_once_with(
+                "Stock Settings", "Stock Settings", {"valuation_method": "FIFO"}
+            )
+            import_sample_data.assert_called_once()
+            (site_name,) = press.sites
+            self.assertFalse(press.sites[site_name]["active"])
+
+            values = self.template.db_set.call_args.args[0]
+            content_hash = snapshots.get_template_hash("Retail")
+            self.assertEqual(values["snapshot_hash"], content_hash)
+            self.assertEqual(
+                json.loads(values["snapshot_files"]),
+                {
+                    "database": f"{site_name}-database-1",
+                    "public": f"{site_name}-public-1",
+                },
+            )
+
+            # an unchanged template is not built again
+            self.template.snapshot_hash = values["snapshot_hash"]
+            self.template.snapshot_files = values["snapshot_files"]
+            snapshots.build_snapshot("Retail")
+            self.assertEqual(press.count("press.api.site.new"), 1)
+            import_sample_data.assert_called_once()
@@ -0,0 +1,94 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api.subdomains import allocate_subdomain
+
+
+class _Redis:
+    """The handful of atomic commands the allocator uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def make_key(self, key):
+        return f"site|{key}"
+
+    def exists(self, key):
+        # like RedisWrapper.exists, which prefixes the key it is given
+        return self.make_key(key) in self.data
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return False
+            self.data[key] = int(value)
+            return True
+
+    def incr(self, key):
+        with self.lock:
+            self.data[key] = self.data.get(key, 0) + 1
+            return self.data[key]
+
+    def expire(self, key, seconds):
+        pass
+
+
+class TestSubdomainAllocation(unittest.TestCase):
+    def setUp(self):
+        self.taken = []
+        self.redis = _Redis()
+        for patcher in (
+            patch.object(frappe, "cache", return_value=self.redis),
+            patch.object(frappe, "db"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        def sql(query, values, **kwargs):
+            if "limit 1" in query:
+                return [["DS-1"]] if values["subdomain"] in self.taken else []
+            return list(self.taken)
+
+        frappe.db.sql.side_effect = sql
+
+    def seed_queries(self):
+        calls = frappe.db.sql.call_args_list
+        return [call for call in calls if "limit 1" not in call.args[0]]
+
+    def test_unused_base_is_taken_as_is(self):
+        self.assertEqual(allocate_subdomain("globex"), "globex")
+        self.assertEqual(allocate_subdomain("globex"), "globex-1")
+
+    def test_counter_is_seeded_from_existing_subdomains_in_one_query(self):
+        self.taken = ["acme", "acme-3", "acme-corp"]
+
+        self.assertEqual(allocate_subdomain("acme"), "acme-4")
+        self.assertEqual(allocate_subdomain("acme"), "acme-5")
+        self.assertEqual(len(self.seed_queries()), 1)
+
+    def test_an_existing_counter_is_not_seeded_again(self):
+        self.redis.data["site|frappe_kit:subdomain_counter:acme"] = 6
+
+        self.assertEqual(allocate_subdomain("acme"), "acme-7")
+        self.assertEqual(self.seed_queries(), [])
+
+    def test_names_taken_under_another_base_are_skipped(self):
+        self.assertEqual(allocate_subdomain("acme"), "acme")
+        # "Acme 1" signed up and got its base name
+        self.taken = ["acme-1"]
+
+        self.assertEqual(allocate_subdomain("acme"), "acme-2")
+
+    def test_concurrent_submissions_get_distinct_subdomains(self):
+        self.taken = ["test"]
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            allocated = list(pool.map(lambda _: allocate_subdomain("test"), range(100)))
+
+        self.assertEqual(len(set(allocated)), 100)
+        self.assertNotIn("test", allocated)
@@ -0,0 +1,105 @@
+import datetime
+import unittest
+from collections import Counter, defaultdict
+from unittest.mock import patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import sample_data, synthetic_data
+
+END_DATE = datetime.date(2026, 10, 17)
+
+
+def sample_path(industry):
+    return f"{sample_data.BUNDLED_DIR}/{industry}.json"
+
+
+def generate(industry, months=12, scale=1):
+    with patch.object(
+        frappe,
+        "get_all",
+        return_value=[
+            frappe._dict(scenario)
+            for scenario in sample_data.iter_records(
+                sample_path(industry), "demo_scenarios"
+            )
+        ],
+    ):
+        plan = synthetic_data.get_plan(
+            frappe._dict(sample_data_months=months, sample_data_scale=scale),
+            industry.title(),
+        )
+
+    return list(
+        synthetic_data.iter_documents(
+            sample_path(industry), plan, END_DATE, company="Acme", abbr="AC"
+        )
+    )
+
+
+class TestSyntheticData(unittest.TestCase):
+    def test_same_plan_gives_the_same_documents(self):
+        self.assertEqual(generate("retail"), generate("retail"))
+
+    def test_months_end_before_the_end_date(self):
+        dates = sorted(doc["posting_date"] for _, doc in generate("retail", months=3))
+
+        self.assertEqual(dates[0][:7], "2026-07")
+        self.assertEqual(dates[-1][:7], "2026-09")
+
+    def test_stock_never_goes_negative(self):
+        documents = [doc for _, doc in generate("distribution")]
+        # ledger order: by date, with the day's receipts first
+        documents.sort(
+            key=lambda doc: (doc["posting_date"], doc["doctype"] != "Purchase Invoice")
+        )
+
+        stock = defaultdict(int)
+        for doc in documents:
+            for row in doc["items"]:
+                if doc["doctype"] == "Purchase Invoice":
+                    stock[row["item_code"], row["warehouse"]] += row["qty"]
+                elif doc["doctype"] == "Sales Invoice":
+                    stock[row["item_code"], row["warehouse"]] -= row["qty"]
+                else:
+                    stock[row["item_code"], row["s_warehouse"]] -= row["qty"]
+                    stock[row["item_code"], row["t_warehouse"]] += row["qty"]
+                self.assertGreaterEqual(min(stock.values()), 0, doc)
+
+        warehouses = {warehouse for _, warehouse in stock}
+        self.assertIn("Central Warehouse - AC", warehouses)
+        self.assertTrue(all(doc["company"] == "Acme" for doc in documents))
+
+    def test_scale_and_scenarios_set_the_volume(self):
+        retail = Counter(doc["doctype"] for _, doc in generate("retail"))
+        doubled = Counter(doc["doctype"] for _, doc in generate("retail", scale=2))
+        services = Counter(doc["doctype"] for _, doc in generate("services"))
+
+        self.assertAlmostEqual(
+            doubled["Sales Invoice"] / retail["Sales Invoice"], 2, delta=0.1
+        )
+        # a "Stock Transfer" scenario, and no transfers without warehouses
+        self.assertEqual(
+            synthetic_data.get_scenario_weights(
+                [frappe._dict(title="Stock Transfer", description=None)]
+            ),
+            {"stock_entries": 2.0},
+        )
+        self.assertNotIn("Stock Entry", services)
+        self.assertGreater(services["Sales Invoice"], 0)
+
+    def test_a_resumed_import_sends_the_remaining_documents(self):
+        documents = generate("manufacturing", months=2)
+        sent = [doc for _, batch in sample_data.batched(documents) for doc in batch]
+
+        resumed = [
+            doc for _, batch in sample_data.batched(documents, skip=50) for doc in batch
+        ]
+
+        self.assertEqual(resumed, sent[50:])
+        self.assertEqual(len(sent), len(documents))
+
+    def test_no_months_means_no_generated_data(self):
+        self.assertIsNone(
+            synthetic_data.get_plan(frappe._dict(sample_data_months=0), "Retail")
+        )
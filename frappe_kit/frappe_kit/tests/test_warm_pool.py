@@ -0,0 +1,157 @@
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from frappe_kit.frappe_kit.api import callbacks, warm_pool
+from frappe_kit.frappe_kit.tests.fake_press import FakePressServer, make_cloud_api
+from frappe_kit.frappe_kit.tests.test_provisioning_engine import _Watcher
+
+
+class TestClaimPooledSite(unittest.TestCase):
+    def setUp(self):
+        self.settings = frappe._dict(enable_warm_pool=1, default_region="Mumbai")
+        self.request = MagicMock(package_tier="Growth", region="India")
+        self.request.name = "DR-1"
+        for patcher in (
+            patch.object(frappe, "db"),
+            patch.object(frappe, "get_single", return_value=self.settings),
+            patch.object(frappe, "enqueue", create=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_claims_a_site_without_waiting_on_other_claims(self):
+        frappe.db.sql.return_value = [
+            frappe._dict(name="DS-1", frappe_cloud_site_id="pool-1.frappe.cloud")
+        ]
+
+        self.assertEqual(warm_pool.claim_pooled_site(self.request), "DS-1")
+
+        query, values = frappe.db.sql.call_args.args
+        self.assertIn("for update skip locked", query)
+        self.assertEqual(values, ("Growth", "Mumbai"))
+        frappe.db.set_value.assert_called_once_with(
+            "Demo Site", "DS-1", {"status": "Creating", "demo_request": "DR-1"}
+        )
+        claimed = self.request.db_set.call_args.args[0]
+        self.assertEqual(claimed["cloud_site_name"], "pool-1.frappe.cloud")
+        self.assertEqual(claimed["provisioning_step"], "await_active")
+        # the pool is topped up again
+        frappe.enqueue.assert_called_once()
+
+    def test_an_empty_or_disabled_pool_claims_nothing(self):
+        frappe.db.sql.return_value = []
+        self.assertIsNone(warm_pool.claim_pooled_site(self.request))
+        frappe.db.set_value.assert_not_called()
+        self.request.db_set.assert_not_called()
+
+        self.settings.enable_warm_pool = 0
+        frappe.db.sql.reset_mock()
+        self.assertIsNone(warm_pool.claim_pooled_site(self.request))
+        frappe.db.sql.assert_not_called()
+
+
+class TestRefillWarmPool(unittest.TestCase):
+    def setUp(self):
+        self.settings = frappe._dict(
+            enable_warm_pool=1,
+            demo_domain="frappe.cloud",
+            warm_pool_targets=[
+                frappe._dict(package_tier="Growth", cluster="Mumbai", pool_size=2)
+            ],
+        )
+        self.tier = frappe._dict(frappe_apps=[], frappe_cloud_plan="Starter")
+        self.sites = []
+        self.stuck = []
+
+        def get_doc(doctype, name=None):
+            if isinstance(doctype, dict):
+                site = MagicMock(**doctype)
+                site.name = f"DS-{len(self.sites) + 1}"
+                site.insert.return_value = site
+                site.db_set.side_effect = lambda field, value=None: (
+                    site.configure_mock(**{field: value})
+                    if isinstance(field, str)
+                    else site.configure_mock(**field)
+                )
+                self.sites.append(site)
+                return site
+            return self.tier
+
+        def get_all(doctype, filters=None, **kwargs):
+            return self.stuck if "creation" in filters else []
+
+        for patcher in (
+            patch.object(frappe, "db"),
+            patch.object(frappe, "get_single", return_value=self.settings),
+            patch.object(frappe, "get_doc", create=True, side_effect=get_doc),
+            patch.object(frappe, "get_all", create=True, side_effect=get_all),
+            patch.object(frappe, "delete_doc", create=True),
+            patch.object(frappe, "log_error", create=True),
+            patch.object(warm_pool, "SiteEventWatcher", _Watcher),
+            patch.object(callbacks, "POLL_MIN", 0.05),
+            patch.object(callbacks, "POLL_MAX", 0.1),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.press = FakePressServer(ready_after=0.1).start()
+        self.addCleanup(self.press.stop)
+        patcher = patch.object(
+            warm_pool, "FrappeCloudAPI", return_value=make_cloud_api(self.press)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def deleted(self):
+        return [call.args[1] for call in frappe.delete_doc.call_args_list]
+
+    def test_builds_the_missing_sites(self):
+        warm_pool.refill_warm_pool()
+
+        self.assertEqual([site.status for site in self.sites], ["Pooled"] * 2)
+        self.assertEqual(len(self.press.sites), 2)
+        self.assertTrue(all(site["active"] for site in self.press.sites.values()))
+        frappe.delete_doc.assert_not_called()
+
+    def test_a_failed_build_is_suspended_before_its_record_goes(self):
+        # neither site turns active
+        self.press.ready_after = 60
+        with patch.object(warm_pool, "SITE_READY_TIMEOUT", 0.3):
+            warm_pool.refill_warm_pool()
+
+        self.assertEqual(self.press.count("press.api.site.deactivate"), 2)
+        self.assertEqual(sorted(self.deleted()), ["DS-1", "DS-2"])
+
+    def test_a_build_that_cannot_be_suspended_is_kept_for_later(self):
+        self.press.ready_after = 60
+        self.press.script("press.api.site.deactivate", (400, {}), (400, {}))
+        with patch.object(warm_pool, "SITE_READY_TIMEOUT", 0.3):
+            warm_pool.refill_warm_pool()
+
+        frappe.delete_doc.assert_not_called()
+        self.assertEqual(
+            sorted(site.frappe_cloud_site_id for site in self.sites),
+            sorted(self.press.sites),
+        )
+
+    def test_stuck_builds_expire_before_the_pool_is_counted(self):
+        self.press.ready_after = 0
+        name = make_cloud_api(self.press).create_site("pool-stuck", ["frappe"])["name"]
+        self.stuck = [
+            frappe._dict(name="DS-stuck", frappe_cloud_site_id=name),
+            frappe._dict(name="DS-no-site", frappe_cloud_site_id=None),
+        ]
+        self.settings.warm_pool_targets = []
+
+        warm_pool.refill_warm_pool()
+
+        self.assertFalse(self.press.sites[name]["active"])
+        self.assertEqual(self.deleted(), ["DS-stuck", "DS-no-site"])
+        cutoff = frappe.get_all.call_args_list[0].kwargs["filters"]["creation"][1]
+        self.assertLess(
+            cutoff,
+            frappe.utils.now_datetime() - timedelta(seconds=warm_pool.REFILL_TIMEOUT),
+        )
@@ -0,0 +1,45 @@
+import frappe
+from frappe.utils import now_datetime
+
+from frappe_kit.frappe_kit.log_buffer import LogBufferMixin
+
+
+class TransitionMixin(LogBufferMixin):
+    """Adds `transition`, for state changes made by workers and jobs"""
+
+    def transition(self, log=None, **values):
+        """
+        Record a state change with a single UPDATE
+
+        Sets `values` and appends `log` (with any buffered log lines) in one
+        statement. Validate, save hooks and versioning are skipped, so this
+        is for changes the system makes. Edits made by a user still go
+        through save(). Returns the log line written, if any.
+        """
+        buffer = self.get_log_buffer()
+        entry = buffer.append(log, defer=True) if log else None
+
+        values.update(modified=now_datetime(), modified_by=frappe.session.user)
+        self.update(values)
+
+        assignments = [f"`{fieldname}` = %({fieldname})s" for fieldname in values]
+        params = dict(values, name=self.name)
+
+        text = buffer.drain()
+        if text:
+            assignments.append(
+                f"`{self.log_fieldname}` = "
+                f"concat(coalesce(`{self.log_fieldname}`, ''), %(log_text)s)"
+            )
+            params["log_text"] = text
+
+        frappe.db.sql(
+            f"""
+            update `tab{self.doctype}`
+            set {", ".join(assignments)}
+            where name = %(name)s
+            """,
+            params,
+        )
+
+        return entry
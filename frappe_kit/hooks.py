@@ -19,29 +19,56 @@ website_route_rules = [
 guest_methods = [
     "frappe_kit.frappe_kit.api.provisioning.get_package_tiers",
     "frappe_kit.frappe_kit.api.provisioning.get_industries",
+    "frappe_kit.frappe_kit.api.public.get_demo_bootstrap",
     "frappe_kit.frappe_kit.api.provisioning.submit_demo_request",
     "frappe_kit.frappe_kit.api.provisioning.check_provisioning_status",
+    "frappe_kit.frappe_kit.api.provisioning.get_provisioning_log",
     "frappe_kit.frappe_kit.api.conversion.get_conversion_options",
     "frappe_kit.frappe_kit.api.conversion.submit_conversion_request",
     "frappe_kit.frappe_kit.api.conversion.check_conversion_status",
+    "frappe_kit.frappe_kit.api.callbacks.site_event",
 ]
 
 # Scheduled Tasks
 scheduler_events = {
+    # backstops; trial events normally fire from the lifecycle dispatcher
     "daily": [
         "frappe_kit.frappe_kit.tasks.expire_old_demos",
         "frappe_kit.frappe_kit.tasks.send_expiry_warnings",
+        "frappe_kit.frappe_kit.api.snapshots.schedule_snapshot_builds",
     ],
-    "hourly": [
-        "frappe_kit.frappe_kit.tasks.cleanup_failed_requests",
-    ],
+    "cron": {
+        "* * * * *": [
+            "frappe_kit.frappe_kit.api.engine.kick_provisioning_engine",
+            "frappe_kit.frappe_kit.api.lifecycle.dispatch_lifecycle_events",
+        ],
+        "*/5 * * * *": [
+            "frappe_kit.frappe_kit.api.warm_pool.schedule_refill",
+        ],
+        "*/10 * * * *": [
+            "frappe_kit.frappe_kit.tasks.cleanup_failed_requests",
+        ],
+    },
 }
 
 # Document Events
 doc_events = {
     "Demo Request": {
         "after_insert": "frappe_kit.frappe_kit.events.on_demo_request_created",
-    }
+    },
+    "Package Tier": {
+        "on_update": "frappe_kit.frappe_kit.api.catalog.invalidate_catalog",
+        "on_trash": "frappe_kit.frappe_kit.api.catalog.invalidate_catalog",
+        "after_rename": "frappe_kit.frappe_kit.api.catalog.invalidate_catalog",
+    },
+    "Industry Template": {
+        "on_update": [
+            "frappe_kit.frappe_kit.api.catalog.invalidate_catalog",
+            "frappe_kit.frappe_kit.api.snapshots.on_template_update",
+        ],
+        "on_trash": "frappe_kit.frappe_kit.api.catalog.invalidate_catalog",
+        "after_rename": "frappe_kit.frappe_kit.api.catalog.invalidate_catalog",
+    },
 }
 
 # Fixtures (initial data)
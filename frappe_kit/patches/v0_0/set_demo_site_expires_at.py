@@ -0,0 +1,15 @@
+import frappe
+
+
+def execute():
+    """Demo Site.expires_at was never set; copy it from the Demo Request's trial"""
+    frappe.db.sql(
+        """
+        update `tabDemo Site`
+        set expires_at = (
+            select trial_expires from `tabDemo Request`
+            where `tabDemo Request`.name = `tabDemo Site`.demo_request
+        )
+        where expires_at is null and ifnull(demo_request, '') != ''
+        """
+    )
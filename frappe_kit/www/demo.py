@@ -1,2 +1,13 @@
+import frappe
+
+from frappe_kit.frappe_kit.api.catalog import get_catalog
+
 no_cache = 1
 sitemap = 1
+
+
+def get_context(context):
+    # the wizard renders from this payload, no extra requests on load
+    context.bootstrap = get_catalog("bootstrap")[1]
+    # realtime progress connects to the socket.io namespace of this site
+    context.sitename = frappe.local.site